@@ -0,0 +1,23 @@
+#!/bin/sh
+# Réplica de leitura (streaming) de um Postgres do docker-compose, para testar
+# `DATABASE_REPLICA_URLS` localmente (profile `replicas`).
+#
+# Na primeira subida o volume está vazio: copia o primário com
+# `pg_basebackup -R` (que grava `primary_conninfo` e `standby.signal`) e então
+# sobe em hot standby, aplicando o WAL do primário continuamente. Nas
+# seguintes, só sobe. Para recomeçar do zero, remova o volume da réplica.
+#
+# Variáveis: PRIMARIO_HOST, PRIMARIO_USUARIO e PGPASSWORD (senha dele).
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+  until pg_basebackup -h "$PRIMARIO_HOST" -U "$PRIMARIO_USUARIO" -D "$PGDATA" -R -X stream -c fast; do
+    echo "replica: aguardando o primário $PRIMARIO_HOST..."
+    rm -rf "${PGDATA:?}"/*
+    sleep 2
+  done
+  # A imagem cria o diretório com 1777; o Postgres exige 0700.
+  chmod 0700 "$PGDATA"
+fi
+
+exec postgres
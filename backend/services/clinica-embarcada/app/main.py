@@ -0,0 +1,161 @@
+# Modo embarcado: Pacientes + Consultas num único processo ASGI.
+#
+# Para clínicas pequenas, dispensa dois containers de API e dois Postgres: as
+# rotas dos dois serviços (pacientes, alergias, medicações, cirurgias,
+# consultas, séries e eventos da agenda) ficam numa só aplicação FastAPI, com
+# um único engine/pool de conexões. O banco pode ser um Postgres ou um arquivo
+# SQLite em modo WAL (padrão: `sqlite:///./clinica.db`).
+#
+# Os serviços não são alterados: os pacotes `app` de cada um são carregados
+# como `pacientes` e `consultas` (ver `_carregar`), e o `db` de Consultas
+# passa a ser o mesmo módulo de Pacientes (mesmo engine, pool e sessão por
+# request). Consultas entre domínios viram chamadas em processo: criar uma
+# consulta ou série exige paciente cadastrado (404 caso contrário).
+#
+# A trilha de auditoria dos dois domínios vai para uma única tabela
+# `auditoria` (cada domínio com o seu gravador em segundo plano).
+#
+# Fora do modo embarcado: busca textual e jobs (rotas homônimas nos dois
+# serviços); os eventos da agenda em tempo real só chegam com Postgres.
+#
+# Execução (a partir de `backend/services/clinica-embarcada`):
+#     uvicorn app.main:app --port 8000
+
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
+
+# Diretórios dos serviços (padrão: vizinhos deste, como no repositório e na imagem).
+SERVICOS = Path(__file__).resolve().parents[2]
+PACIENTES_DIR = os.getenv("EMBARCADO_PACIENTES_DIR", str(SERVICOS / "pacientes-service" / "app"))
+CONSULTAS_DIR = os.getenv("EMBARCADO_CONSULTAS_DIR", str(SERVICOS / "consultas-service" / "app"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./clinica.db")
+
+
+def _carregar(nome: str, diretorio: str) -> None:
+    """Registra o pacote `app` de um serviço sob outro nome (`pacientes.db`...)."""
+    spec = importlib.machinery.ModuleSpec(nome, None, is_package=True)
+    spec.submodule_search_locations = [diretorio]
+    sys.modules[nome] = importlib.util.module_from_spec(spec)
+
+
+_carregar("pacientes", PACIENTES_DIR)
+_carregar("consultas", CONSULTAS_DIR)
+
+# Um engine e um pool para os dois domínios: os imports relativos
+# `from .db import ...` de Consultas resolvem para o módulo de Pacientes.
+db = importlib.import_module("pacientes.db")
+sys.modules["consultas.db"] = db
+
+from pacientes.models import Base as BasePacientes, Paciente  # noqa: E402
+from pacientes.auditoria import gravador as gravador_pacientes, instalar_auditoria  # noqa: E402
+from pacientes.duplicidade import instalar_duplicidade  # noqa: E402
+from pacientes.nascimento import instalar_data_nascimento  # noqa: E402
+from pacientes.idempotencia import IdempotenciaMiddleware  # noqa: E402
+from pacientes.routers import alergias, auditoria, cirurgias, duplicidades, medicacoes, pacientes  # noqa: E402
+from consultas.admissao import AdmissaoMiddleware, metricas as metricas_admissao  # noqa: E402
+from consultas.auditoria import gravador as gravador_consultas  # noqa: E402
+from consultas.compressao import CompressaoMiddleware  # noqa: E402
+from consultas.eventos import corretor as corretor_eventos, instalar_eventos  # noqa: E402
+from consultas.historico import instalar_historico  # noqa: E402
+from consultas.models import Base as BaseConsultas  # noqa: E402
+from consultas.particoes import instalar_particionamento, manutencao as manutencao_particoes  # noqa: E402
+from consultas.recorrencia import instalar_recorrencia  # noqa: E402
+from consultas.routers import consultas, eventos, series  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    gravador_pacientes.iniciar()
+    gravador_consultas.iniciar()
+    manutencao_particoes.iniciar(*db.engines_das_clinicas().values())
+    yield
+    manutencao_particoes.encerrar()
+    corretor_eventos.encerrar()
+    gravador_pacientes.encerrar()
+    gravador_consultas.encerrar()
+
+
+app = FastAPI(title="clinica-embarcada", version="0.1.0", lifespan=lifespan)
+
+# Mesma pilha de middlewares dos serviços (a admissão de Consultas já isenta
+# o stream de eventos).
+app.add_middleware(AdmissaoMiddleware)
+app.add_middleware(IdempotenciaMiddleware)
+app.add_middleware(CompressaoMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Tabelas dos dois domínios no mesmo banco (nomes não se repetem) e o DDL
+# exclusivo do Postgres de Consultas (ignorado no SQLite); com multi-clínica,
+# no schema de cada clínica.
+for clinica, eng in db.engines_das_clinicas().items():
+    db.criar_esquema(clinica)
+    BasePacientes.metadata.create_all(bind=eng)
+    BaseConsultas.metadata.create_all(bind=eng)
+    instalar_data_nascimento(eng)
+    instalar_duplicidade(eng)
+    instalar_recorrencia(eng)
+    instalar_particionamento(eng)
+    instalar_historico(eng)
+    instalar_eventos(eng)
+    instalar_auditoria(eng)
+
+
+def _paciente_cadastrado(request: Request, sessao: Session = Depends(db.get_sessao)) -> None:
+    # Criação em `/pacientes/{cpf}/...` (consultas, séries): o paciente precisa
+    # existir. Mesma sessão da rota (dependência em cache no request).
+    cpf = request.path_params.get("cpf")
+    if request.method == "POST" and cpf and sessao.get(Paciente, cpf) is None:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+
+
+app.include_router(duplicidades.router)  # antes de `/pacientes/{cpf}`
+app.include_router(pacientes.router)
+app.include_router(alergias.router)
+app.include_router(medicacoes.router)
+app.include_router(cirurgias.router)
+# Eventos antes de `/consultas/{id}`
+app.include_router(eventos.router)
+app.include_router(consultas.router, dependencies=[Depends(_paciente_cadastrado)])
+app.include_router(series.router, dependencies=[Depends(_paciente_cadastrado)])
+# Mesma tabela `auditoria` para os dois domínios: uma rota lê ambos.
+app.include_router(auditoria.router)
+
+
+@app.get("/health")
+def health():
+    """Endpoint de verificação simples de saúde da aplicação."""
+    return {"status": "ok", "banco": db.engine.dialect.name}
+
+
+@app.get("/metrics/admissao")
+def admissao():
+    """Contadores do controle de admissão por shard e classe de rota."""
+    return metricas_admissao()
+
+
+@app.get("/metrics/eventos")
+def eventos_metricas():
+    """Conexões SSE abertas neste processo."""
+    return corretor_eventos.metricas()
+
+
+@app.get("/metrics/auditoria")
+def auditoria_metricas():
+    """Buffers da trilha de auditoria, por domínio e shard."""
+    return {"pacientes": gravador_pacientes.metricas(), "consultas": gravador_consultas.metricas()}
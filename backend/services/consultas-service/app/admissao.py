@@ -0,0 +1,206 @@
+"""Controle de admissão (load shedding) do serviço de Consultas.
+
+Middleware ASGI que limita quantos requests de cada classe de rota executam
+ao mesmo tempo, protegendo o pool de conexões do banco em picos:
+
+- `escrita`: métodos que alteram dados (POST, PATCH, PUT, DELETE)
+- `busca`: rotas de busca textual (`.../busca`)
+- `leitura`: demais GET/HEAD
+
+Cada classe tem um limite de execução simultânea, uma fila de espera limitada
+e um tempo máximo de espera. Quem não cabe na fila, ou espera demais, recebe
+503 com `Retry-After` imediatamente, em vez de ocupar uma thread aguardando
+conexão. Os contadores ficam em `GET /metrics/admissao`.
+
+Multi-clínica (ver `app/db.py`): cada shard tem as suas classes (o pool é do
+shard), e uma clínica ocupa no máximo `ADMISSAO_CLINICA_FRACAO` do limite de
+cada classe: uma clínica em pico recebe 503 sem tirar as vagas das outras do
+mesmo shard. Clínica desconhecida ou não informada: 400/404 aqui mesmo.
+
+Configuração por ambiente, por classe (ex.: `ADMISSAO_LEITURA_LIMITE`,
+`ADMISSAO_LEITURA_FILA`, `ADMISSAO_LEITURA_ESPERA_S`), `ADMISSAO_CLINICA_FRACAO`
+e `ADMISSAO_RETRY_AFTER_S`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .db import clinica_do_request, shard_da_clinica, shards
+
+__all__ = ["ClasseAdmissao", "AdmissaoMiddleware", "CLASSES", "classificar", "metricas"]
+
+RETRY_AFTER_S = int(os.getenv("ADMISSAO_RETRY_AFTER_S", "1"))
+# Fração do limite de cada classe que uma única clínica pode ocupar (1: sem teto).
+CLINICA_FRACAO = float(os.getenv("ADMISSAO_CLINICA_FRACAO", "1"))
+
+# Rotas fora do controle de admissão (sondas e métricas não podem ser barradas;
+# o stream de eventos fica aberto e não usa conexão do banco).
+ROTAS_ISENTAS = ("/health", "/metrics", "/api/v1/consultas/eventos")
+
+_METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+
+
+@dataclass
+class ClasseAdmissao:
+    """Limite de concorrência + fila limitada de uma classe de rotas."""
+
+    nome: str
+    limite: int
+    fila_max: int
+    espera_max_s: float
+    limite_clinica: int | None = None  # `None`: o próprio `limite`
+    em_execucao: int = 0
+    na_fila: int = 0
+    admitidos: int = 0
+    rejeitados_fila_cheia: int = 0
+    rejeitados_espera: int = 0
+    _livre: asyncio.Condition | None = field(default=None, repr=False)
+    _por_clinica: dict[str | None, int] = field(default_factory=dict, repr=False)
+    _fila_clinica: dict[str | None, int] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def do_ambiente(cls, nome: str, limite: int, fila_max: int, espera_max_s: float) -> "ClasseAdmissao":
+        prefixo = f"ADMISSAO_{nome.upper()}_"
+        limite = int(os.getenv(prefixo + "LIMITE", limite))
+        return cls(
+            nome=nome,
+            limite=limite,
+            fila_max=int(os.getenv(prefixo + "FILA", fila_max)),
+            espera_max_s=float(os.getenv(prefixo + "ESPERA_S", espera_max_s)),
+            limite_clinica=max(1, math.ceil(limite * CLINICA_FRACAO)) if CLINICA_FRACAO < 1 else None,
+        )
+
+    def _cabe(self, clinica: str | None) -> bool:
+        if self.em_execucao >= self.limite:
+            return False
+        return self.limite_clinica is None or self._por_clinica.get(clinica, 0) < self.limite_clinica
+
+    def _ocupar(self, clinica: str | None) -> None:
+        self.em_execucao += 1
+        self._por_clinica[clinica] = self._por_clinica.get(clinica, 0) + 1
+
+    async def entrar(self, clinica: str | None = None) -> bool:
+        """Ocupa uma vaga; `False` se a fila está cheia ou a espera estourou."""
+        if self._livre is None:
+            self._livre = asyncio.Condition()
+        # A fila é por clínica: a de uma clínica no teto não segura as outras.
+        if self._cabe(clinica) and self._fila_clinica.get(clinica, 0) == 0:
+            self._ocupar(clinica)
+            self.admitidos += 1
+            return True
+        if self.na_fila >= self.fila_max:
+            self.rejeitados_fila_cheia += 1
+            return False
+
+        self.na_fila += 1
+        self._fila_clinica[clinica] = self._fila_clinica.get(clinica, 0) + 1
+        try:
+            async with self._livre:
+                await asyncio.wait_for(
+                    self._livre.wait_for(lambda: self._cabe(clinica)),
+                    timeout=self.espera_max_s,
+                )
+                self._ocupar(clinica)
+        except asyncio.TimeoutError:
+            self.rejeitados_espera += 1
+            return False
+        finally:
+            self.na_fila -= 1
+            self._fila_clinica[clinica] -= 1
+            if not self._fila_clinica[clinica]:
+                del self._fila_clinica[clinica]
+        self.admitidos += 1
+        return True
+
+    async def sair(self, clinica: str | None = None) -> None:
+        self.em_execucao -= 1
+        self._por_clinica[clinica] -= 1
+        if not self._por_clinica[clinica]:
+            del self._por_clinica[clinica]
+        if self._livre is not None:
+            async with self._livre:
+                # Com teto por clínica, o primeiro da fila pode ser de uma
+                # clínica ainda no teto: todos reavaliam.
+                if self.limite_clinica is None:
+                    self._livre.notify()
+                else:
+                    self._livre.notify_all()
+
+    def metricas(self) -> dict[str, int | float]:
+        return {
+            "limite": self.limite,
+            "fila_max": self.fila_max,
+            "em_execucao": self.em_execucao,
+            "na_fila": self.na_fila,
+            "admitidos": self.admitidos,
+            "rejeitados_fila_cheia": self.rejeitados_fila_cheia,
+            "rejeitados_espera": self.rejeitados_espera,
+        }
+
+
+def _classes() -> dict[str, ClasseAdmissao]:
+    # Padrões pensados para o pool padrão do SQLAlchemy (5 conexões + 10 overflow):
+    # a soma dos limites não ultrapassa o total de conexões disponíveis.
+    return {
+        "escrita": ClasseAdmissao.do_ambiente("escrita", limite=4, fila_max=32, espera_max_s=2.0),
+        "leitura": ClasseAdmissao.do_ambiente("leitura", limite=8, fila_max=64, espera_max_s=2.0),
+        "busca": ClasseAdmissao.do_ambiente("busca", limite=2, fila_max=8, espera_max_s=1.0),
+    }
+
+
+# Classes de cada shard (um pool de conexões por shard).
+CLASSES: dict[str, dict[str, ClasseAdmissao]] = {shard: _classes() for shard in shards}
+
+
+def classificar(metodo: str, caminho: str) -> str:
+    if metodo not in _METODOS_LEITURA:
+        return "escrita"
+    if caminho.rstrip("/").endswith("/busca"):
+        return "busca"
+    return "leitura"
+
+
+def metricas() -> dict[str, dict[str, dict[str, int | float]]]:
+    return {shard: {nome: c.metricas() for nome, c in classes.items()} for shard, classes in CLASSES.items()}
+
+
+class AdmissaoMiddleware:
+    """Aplica `CLASSES` (do shard da clínica) a cada request HTTP; excedentes recebem 503."""
+
+    def __init__(self, app: ASGIApp, classes: dict[str, dict[str, ClasseAdmissao]] | None = None) -> None:
+        self.app = app
+        self.classes = classes if classes is not None else CLASSES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(ROTAS_ISENTAS):
+            await self.app(scope, receive, send)
+            return
+        try:
+            clinica = clinica_do_request(HTTPConnection(scope))
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code)(scope, receive, send)
+            return
+
+        classes = self.classes[shard_da_clinica(clinica)]
+        classe = classes[classificar(scope["method"], scope["path"])]
+        if not await classe.entrar(clinica):
+            resposta = JSONResponse(
+                {"detail": "Servidor sobrecarregado, tente novamente em instantes"},
+                status_code=503,
+                headers={"Retry-After": str(RETRY_AFTER_S)},
+            )
+            await resposta(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await classe.sair(clinica)
@@ -0,0 +1,69 @@
+"""Busca textual (full-text) do serviço de Consultas.
+
+Cada consulta ganha uma coluna `busca` (tsvector com stemming `portuguese`)
+gerada pelo próprio Postgres a partir de `descricao` (peso A) e `observacoes`
+(peso B), mantida em todo INSERT/UPDATE sem código nas rotas, e indexada
+com GIN. Como o projeto ainda usa `create_all` (sem migrations), a instalação
+é um DDL idempotente executado no start, cobrindo também tabelas existentes.
+Em bancos que não são PostgreSQL a busca fica indisponível.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Session
+
+__all__ = ["instalar_busca_textual", "busca_disponivel", "buscar_consultas"]
+
+# Marcação do trecho: o termo encontrado vem entre <mark></mark>.
+OPCOES_TRECHO = "StartSel=<mark>, StopSel=</mark>, MaxWords=25, MinWords=8, MaxFragments=2"
+
+_DDL = (
+    """
+    ALTER TABLE consultas ADD COLUMN IF NOT EXISTS busca tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(observacoes, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_consultas_busca ON consultas USING gin (busca)",
+)
+
+# O `ts_headline` (caro) só roda para as linhas da página, depois do LIMIT.
+_SQL_BUSCA = text(
+    """
+    WITH q AS (SELECT websearch_to_tsquery('portuguese', :q) AS q)
+    SELECT h.id, h.cpf_paciente, h.dia, h.hora, h.descricao, h.rank,
+           ts_headline('portuguese', h.texto, q.q, :opcoes) AS trecho
+    FROM (
+        SELECT c.id, c.cpf_paciente, c.dia, c.hora, c.descricao,
+               concat_ws(' — ', c.descricao, c.observacoes) AS texto,
+               ts_rank_cd(c.busca, q.q) AS rank
+        FROM consultas c, q
+        WHERE c.busca @@ q.q
+        ORDER BY rank DESC, c.id DESC
+        LIMIT :limit OFFSET :offset
+    ) h, q
+    ORDER BY h.rank DESC, h.id DESC
+    """
+)
+
+
+def instalar_busca_textual(engine: Engine) -> None:
+    """Cria (se preciso) a coluna tsvector gerada e o índice GIN."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for ddl in _DDL:
+            conn.exec_driver_sql(ddl)
+
+
+def busca_disponivel(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def buscar_consultas(db: Session, q: str, limit: int, offset: int) -> list[Row]:
+    """Consultas que casam com `q` (sintaxe websearch), por relevância."""
+    params = {"q": q, "opcoes": OPCOES_TRECHO, "limit": limit, "offset": offset}
+    return list(db.execute(_SQL_BUSCA, params))
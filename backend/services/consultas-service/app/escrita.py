@@ -0,0 +1,64 @@
+"""Caminho de escrita compartilhado pelas rotas do serviço de Consultas.
+
+Cada escrita é um único comando `INSERT/UPDATE ... RETURNING`: os valores
+gerados pelo banco (ex.: `id`) voltam no mesmo round trip, dispensando o
+`db.refresh` (SELECT extra) depois do `commit`. Como a sessão é criada com
+`expire_on_commit=False` (ver `db.py`), as instâncias retornadas continuam
+utilizáveis para serialização após o `commit`.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Iterator, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import insert, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, lazyload
+
+__all__ = ["transacao", "inserir", "atualizar"]
+
+M = TypeVar("M")
+
+
+@contextmanager
+def transacao(db: Session, *, detail: str, status_code: int = 409) -> Iterator[Session]:
+    """Executa o bloco e faz `commit`; `IntegrityError` vira HTTP `status_code`.
+
+    Outras exceções (ex.: `HTTPException` 404) propagam sem alteração; a
+    sessão é descartada pelo `get_sessao` ao final do request.
+    """
+    try:
+        yield db
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status_code, detail=detail)
+
+
+def inserir(db: Session, modelo: type[M], valores: dict[str, Any]) -> M:
+    """`INSERT ... RETURNING` de uma linha, devolvendo a instância ORM.
+
+    Uma linha recém-criada não tem filhos: os relacionamentos ficam sem carga
+    (`lazyload`) em vez de disparar os SELECTs `selectin` do mapeamento.
+    """
+    stmt = insert(modelo).values(**valores).returning(modelo).options(lazyload("*"))
+    return db.scalars(stmt).one()
+
+
+def atualizar(db: Session, modelo: type[M], chave: Any, valores: dict[str, Any]) -> M | None:
+    """`UPDATE ... WHERE pk = chave RETURNING`; `None` se a linha não existe.
+
+    Dispensa o SELECT prévio de existência: a ausência de linha retornada é
+    o próprio 404.
+    """
+    pk = inspect(modelo).primary_key[0]
+    stmt = (
+        update(modelo)
+        .where(pk == chave)
+        .values(**valores)
+        .returning(modelo)
+        .execution_options(synchronize_session=False)
+    )
+    return db.scalars(stmt).one_or_none()
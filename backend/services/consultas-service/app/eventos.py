@@ -0,0 +1,336 @@
+"""Eventos da agenda em tempo real (Server-Sent Events) do serviço de Consultas.
+
+Triggers no Postgres publicam, via `NOTIFY consultas_eventos`, cada
+INSERT/UPDATE/DELETE em `consultas` (e mudanças em séries e exceções, que
+alteram as ocorrências virtuais de uma data). Cada processo mantém uma única
+conexão em `LISTEN` (uma thread) e repassa os eventos a um corretor em
+memória, que os distribui às conexões SSE inscritas no `dia` afetado:
+
+- uma notificação → no máximo um SELECT (das consultas criadas/alteradas,
+  em lote e só para dias com inscritos) → a mesma mensagem serializada uma
+  vez e entregue a todos os clientes daquele dia;
+- nenhuma conexão do pool fica presa por cliente conectado.
+
+Mensagens (`event:` do SSE):
+
+- `consulta`: consulta criada ou alterada (mesmo formato de `ConsultaOut`);
+- `removida`: `{"id", "dia"}`; também quando a consulta muda para outro dia;
+- `recarregar`: o cliente deve buscar o dia de novo (mudança em série,
+  rajada de eventos, fila do cliente cheia ou reconexão do LISTEN);
+- `pronto`: enviado ao abrir o stream, com o LISTEN já ativo.
+
+Triggers só existem no Postgres; em outros bancos o stream abre mas não
+recebe eventos.
+
+Multi-clínica (ver `app/db.py`): cada assinatura é de uma clínica e dia. Há
+uma conexão LISTEN por shard (aberta com o primeiro assinante de uma clínica
+dele); cada notificação traz o schema de origem (`sc`), que identifica a
+clínica.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from .db import CLINICAS, engine_da_clinica, esquema_da_clinica, shard_da_clinica, shards
+from .models import Consulta
+from .schemas import ConsultaOut
+
+__all__ = ["CANAL", "Assinatura", "corretor", "instalar_eventos"]
+
+logger = logging.getLogger(__name__)
+
+CANAL = "consultas_eventos"
+# Mensagens pendentes por cliente; um cliente lento demais recebe `recarregar`.
+FILA_MAX = int(os.getenv("EVENTOS_FILA_MAX", "100"))
+ASSINANTES_MAX = int(os.getenv("EVENTOS_ASSINANTES_MAX", "1000"))
+PING_S = float(os.getenv("EVENTOS_PING_S", "15"))
+# O stream é encerrado após este tempo e o navegador reconecta sozinho: não
+# segura o desligamento do processo e redistribui clientes entre workers.
+DURACAO_MAX_S = float(os.getenv("EVENTOS_DURACAO_MAX_S", "600"))
+# Acima disto, num mesmo lote de notificações, o dia recebe só `recarregar`.
+RAJADA_MAX = 50
+LOTE_MAX = 1000
+RECONEXAO_MAX_S = 30.0
+
+_DDL = (
+    f"""
+    CREATE OR REPLACE FUNCTION notificar_{CANAL}() RETURNS trigger AS $$
+    DECLARE
+        payload json;
+    BEGIN
+        -- Tipo da tabela no argumento do trigger: em `consultas` particionada,
+        -- TG_TABLE_NAME é o nome da partição.
+        IF TG_ARGV[0] = 'c' THEN
+            payload := json_build_object(
+                't', 'c',
+                'sc', TG_TABLE_SCHEMA,
+                'op', left(TG_OP, 1),
+                'id', CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+                'dia', CASE WHEN TG_OP = 'DELETE' THEN NULL ELSE NEW.dia END,
+                'antes', CASE WHEN TG_OP = 'INSERT' THEN NULL ELSE OLD.dia END
+            );
+        ELSIF TG_ARGV[0] = 's' THEN
+            -- União dos intervalos antigo e novo; `ate` nulo: sem fim.
+            payload := json_build_object(
+                't', 's',
+                'sc', TG_TABLE_SCHEMA,
+                'de', CASE TG_OP
+                        WHEN 'INSERT' THEN NEW.inicio
+                        WHEN 'DELETE' THEN OLD.inicio
+                        ELSE least(OLD.inicio, NEW.inicio) END,
+                'ate', CASE TG_OP
+                        WHEN 'INSERT' THEN NEW.fim
+                        WHEN 'DELETE' THEN OLD.fim
+                        WHEN 'UPDATE' THEN
+                            CASE WHEN OLD.fim IS NULL OR NEW.fim IS NULL THEN NULL
+                                 ELSE greatest(OLD.fim, NEW.fim) END
+                      END
+            );
+        ELSE
+            payload := json_build_object(
+                't', 'e',
+                'sc', TG_TABLE_SCHEMA,
+                'dia', CASE WHEN TG_OP = 'DELETE' THEN OLD.dia ELSE NEW.dia END
+            );
+        END IF;
+        PERFORM pg_notify('{CANAL}', payload::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER tr_consultas_eventos
+        AFTER INSERT OR UPDATE OR DELETE ON consultas
+        FOR EACH ROW EXECUTE FUNCTION notificar_{CANAL}('c')
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER tr_series_consultas_eventos
+        AFTER INSERT OR UPDATE OR DELETE ON series_consultas
+        FOR EACH ROW EXECUTE FUNCTION notificar_{CANAL}('s')
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER tr_excecoes_series_eventos
+        AFTER INSERT OR UPDATE OR DELETE ON excecoes_series
+        FOR EACH ROW EXECUTE FUNCTION notificar_{CANAL}('e')
+    """,
+)
+
+
+def instalar_eventos(engine: Engine) -> None:
+    """Cria (ou atualiza) a função e os triggers de NOTIFY da agenda."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for ddl in _DDL:
+            conn.exec_driver_sql(ddl)
+
+
+def _mensagem(evento: str, dados: Any) -> bytes:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n".encode()
+
+
+RECARREGAR = _mensagem("recarregar", {})
+
+
+@dataclass(eq=False)
+class Assinatura:
+    """Uma conexão SSE: recebe as mensagens de um dia (de uma clínica) numa fila limitada."""
+
+    dia: str
+    loop: asyncio.AbstractEventLoop
+    clinica: str | None = None
+    fila: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(FILA_MAX))
+
+    def _entregar(self, mensagem: bytes) -> None:
+        # Roda no loop do cliente (via `call_soon_threadsafe`).
+        try:
+            self.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            # Cliente não acompanhou: descarta o atraso e pede recarga.
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait(RECARREGAR)
+
+
+class Corretor:
+    """Uma conexão LISTEN por shard + distribuição às assinaturas por clínica e dia."""
+
+    def __init__(self) -> None:
+        self._por_dia: dict[tuple[str | None, str], set[Assinatura]] = defaultdict(set)
+        self._total = 0
+        self._lock = threading.Lock()
+        self._escutando: dict[str, threading.Event] = {}
+        self._encerrando = threading.Event()
+        self._threads: dict[str, threading.Thread] = {}
+        # Schema de origem da notificação → clínica (sem multi-clínica, `None`).
+        self._clinica_do_esquema = {esquema_da_clinica(c): c for c in CLINICAS}
+
+    # ---- lado das conexões SSE (loop asyncio) ----
+
+    def assinar(self, dia: str, clinica: str | None = None) -> Assinatura | None:
+        """Inscreve no `dia` da clínica; `None` se o limite de assinantes foi atingido."""
+        a = Assinatura(dia, asyncio.get_running_loop(), clinica)
+        shard = shard_da_clinica(clinica)
+        with self._lock:
+            if self._total >= ASSINANTES_MAX:
+                return None
+            self._por_dia[(clinica, dia)].add(a)
+            self._total += 1
+            if shard not in self._threads and shards[shard].dialect.name == "postgresql":
+                self._encerrando.clear()
+                self._escutando[shard] = threading.Event()
+                self._threads[shard] = threading.Thread(
+                    target=self._escutar, args=(shard,), name=f"eventos-{shard}", daemon=True
+                )
+                self._threads[shard].start()
+        return a
+
+    def cancelar(self, a: Assinatura) -> None:
+        with self._lock:
+            inscritos = self._por_dia.get((a.clinica, a.dia))
+            if inscritos is not None and a in inscritos:
+                inscritos.discard(a)
+                self._total -= 1
+                if not inscritos:
+                    del self._por_dia[(a.clinica, a.dia)]
+
+    def aguardar_escuta(self, timeout: float, clinica: str | None = None) -> bool:
+        """Bloqueia até o LISTEN do shard da clínica estar ativo (chamar fora do loop)."""
+        escutando = self._escutando.get(shard_da_clinica(clinica))
+        return escutando is None or escutando.wait(timeout)
+
+    def encerrar(self, espera_s: float = 5.0) -> None:
+        threads = list(self._threads.values())
+        if not threads:
+            return
+        self._encerrando.set()
+        for thread in threads:
+            thread.join(timeout=espera_s)
+        self._threads.clear()
+        self._escutando.clear()
+
+    def metricas(self) -> dict[str, int]:
+        with self._lock:
+            return {"assinantes": self._total, "dias": len(self._por_dia)}
+
+    # ---- lado do LISTEN (uma thread por shard) ----
+
+    def _escutar(self, shard: str) -> None:
+        escutando = self._escutando[shard]
+        espera = 0.5
+        reconectando = False
+        while not self._encerrando.is_set():
+            try:
+                with shards[shard].connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    pg = conn.connection.driver_connection
+                    pg.execute(f"LISTEN {CANAL}")
+                    escutando.set()
+                    if reconectando:
+                        # Eventos da janela sem conexão se perderam.
+                        self._para_todos(shard, RECARREGAR)
+                    espera = 0.5
+                    while not self._encerrando.is_set():
+                        # Espera a primeira notificação; depois drena o que já chegou.
+                        lote = [n.payload for n in pg.notifies(timeout=1.0, stop_after=1)]
+                        if not lote:
+                            continue
+                        lote += [n.payload for n in pg.notifies(timeout=0.01, stop_after=LOTE_MAX)]
+                        self._distribuir([json.loads(p) for p in lote])
+            except Exception:
+                logger.exception("Falha no LISTEN %s (%s); reconectando em %.1fs", CANAL, shard, espera)
+            finally:
+                escutando.clear()
+            reconectando = True
+            self._encerrando.wait(espera)
+            espera = min(espera * 2, RECONEXAO_MAX_S)
+
+    def _inscritos(self, clinica: str | None) -> dict[str, list[Assinatura]]:
+        with self._lock:
+            return {dia: list(s) for (c, dia), s in self._por_dia.items() if c == clinica}
+
+    def _para_todos(self, shard: str, mensagem: bytes) -> None:
+        with self._lock:
+            assinaturas = [
+                list(s) for (c, _), s in self._por_dia.items() if shard_da_clinica(c) == shard
+            ]
+        for a in assinaturas:
+            _enviar(a, mensagem)
+
+    def _distribuir(self, eventos: list[dict[str, Any]]) -> None:
+        por_clinica: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+        for ev in eventos:
+            if not CLINICAS:
+                por_clinica[None].append(ev)
+            elif ev.get("sc") in self._clinica_do_esquema:  # outros schemas: não são clínicas
+                por_clinica[self._clinica_do_esquema[ev["sc"]]].append(ev)
+        for clinica, eventos_da_clinica in por_clinica.items():
+            self._distribuir_clinica(clinica, eventos_da_clinica)
+
+    def _distribuir_clinica(self, clinica: str | None, eventos: list[dict[str, Any]]) -> None:
+        inscritos = self._inscritos(clinica)
+        if not inscritos:
+            return
+
+        por_dia: dict[str, list[tuple[str, Any]]] = defaultdict(list)
+        recarregar: set[str] = set()
+        buscar: set[int] = set()
+        for ev in eventos:
+            if ev["t"] == "c":
+                if ev["antes"] in inscritos and ev["antes"] != ev["dia"]:
+                    por_dia[ev["antes"]].append(("removida", {"id": ev["id"], "dia": ev["antes"]}))
+                if ev["dia"] in inscritos:
+                    por_dia[ev["dia"]].append(("consulta", ev["id"]))
+            elif ev["t"] == "s":
+                # Datas ISO: comparação de string = comparação de data.
+                recarregar.update(
+                    d for d in inscritos if ev["de"] <= d and (ev["ate"] is None or d <= ev["ate"])
+                )
+            elif ev["dia"] in inscritos:
+                recarregar.add(ev["dia"])
+
+        for dia, itens in por_dia.items():
+            if len(itens) > RAJADA_MAX:
+                recarregar.add(dia)
+            elif dia not in recarregar:
+                buscar.update(v for tipo, v in itens if tipo == "consulta")
+
+        linhas: dict[int, bytes] = {}
+        if buscar:
+            with engine_da_clinica(clinica).connect() as conn:
+                for c in conn.execute(select(Consulta).where(Consulta.id.in_(buscar))):
+                    dados = ConsultaOut.model_validate(c)
+                    linhas[c.id] = _mensagem("consulta", dados.model_dump(mode="json", by_alias=True))
+
+        for dia in recarregar:
+            _enviar(inscritos[dia], RECARREGAR)
+        for dia, itens in por_dia.items():
+            if dia in recarregar:
+                continue
+            for tipo, v in itens:
+                if tipo == "removida":
+                    _enviar(inscritos[dia], _mensagem("removida", v))
+                elif v in linhas:  # removida logo depois: o DELETE vem no mesmo lote
+                    _enviar(inscritos[dia], linhas[v])
+
+
+def _enviar(assinaturas: list[Assinatura], mensagem: bytes) -> None:
+    for a in assinaturas:
+        try:
+            a.loop.call_soon_threadsafe(a._entregar, mensagem)
+        except RuntimeError:  # loop já encerrado: a conexão está saindo
+            pass
+
+
+# Corretor do processo; a thread de LISTEN de um shard sobe com o primeiro assinante.
+corretor = Corretor()
@@ -0,0 +1,156 @@
+"""Histórico de consultas por paciente: paginação por cursor e próxima consulta.
+
+O índice `ix_consultas_cpf_dia_hora` (`cpf_paciente, dia, hora, id`) deixa as
+consultas de um paciente em ordem cronológica; `id` desempata consultas no
+mesmo horário. `dia` e `hora` são texto, na forma canônica `YYYY-MM-DD` e
+`HH:MM` garantida pelos schemas de entrada: assim a ordem do texto é a
+cronológica. Sobre o índice:
+
+- `pagina_do_paciente`: paginação por cursor (keyset) nos dois sentidos. O
+  cursor é `dia,hora,id` de uma consulta já recebida (ex.:
+  `2026-10-20,09:00,123`); `apos` devolve as seguintes em ordem cronológica e
+  `antes_de` as anteriores, da mais recente para a mais antiga. Cada página é
+  uma descida no índice + `limit` linhas, independente de quantas vieram
+  antes. Um instante também serve de cursor: `2026-10-20,09:00,0`.
+- `proxima_consulta`: a primeira consulta a partir de agora é uma única
+  sondagem no índice (`LIMIT 1`; no Postgres, uma por partição de hoje em
+  diante). As ocorrências virtuais das séries do paciente (ver
+  `app/recorrencia.py`) também contam; sem séries ativas, o custo extra é uma
+  busca vazia em `ix_series_consultas_cpf_paciente`.
+
+Bancos criados antes do índice composto o recebem no start
+(`instalar_historico`), que também remove o antigo índice só de
+`cpf_paciente`, redundante com o prefixo do novo.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, datetime
+from typing import Any, NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .models import Consulta, ExcecaoSerie, SerieConsulta
+from .recorrencia import ocorrencias
+
+__all__ = [
+    "Cursor",
+    "cursor_ou_422",
+    "instalar_historico",
+    "pagina_do_paciente",
+    "proxima_consulta",
+]
+
+_HORA = re.compile(r"^\d{2}:\d{2}(:\d{2})?$")
+_INDICE_ANTIGO = "ix_consultas_cpf_paciente"
+
+
+class Cursor(NamedTuple):
+    dia: str
+    hora: str
+    id: int
+
+
+def cursor_ou_422(valor: str, nome: str) -> Cursor:
+    """`dia,hora,id` → `Cursor` (422 se malformado)."""
+    partes = valor.split(",")
+    try:
+        dia, hora, id = partes
+        cursor = Cursor(date.fromisoformat(dia).isoformat(), hora, int(id))
+    except ValueError:
+        cursor = None
+    if cursor is None or not _HORA.match(cursor.hora) or cursor.id < 0:
+        raise HTTPException(status_code=422, detail=f"`{nome}` deve seguir o formato YYYY-MM-DD,HH:MM,id")
+    return cursor
+
+
+def instalar_historico(engine: Engine) -> None:
+    """Cria o índice composto do histórico e remove o índice antigo (DDL idempotente)."""
+    with engine.begin() as conn:
+        for indice in Consulta.__table__.indexes:
+            if indice.name == "ix_consultas_cpf_dia_hora":
+                indice.create(conn, checkfirst=True)
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {_INDICE_ANTIGO}")
+
+
+def pagina_do_paciente(
+    db: Session, cpf: str, apos: Cursor | None, antes_de: Cursor | None, limit: int
+) -> list[Consulta]:
+    # O limite simples em `dia` repete o da comparação de linhas: só ele
+    # descarta partições (ver `app/particoes.py`).
+    chave = tuple_(Consulta.dia, Consulta.hora, Consulta.id)
+    stmt = select(Consulta).where(Consulta.cpf_paciente == cpf)
+    if antes_de is not None:
+        stmt = stmt.where(chave < tuple(antes_de), Consulta.dia <= antes_de.dia).order_by(
+            Consulta.dia.desc(), Consulta.hora.desc(), Consulta.id.desc()
+        )
+    else:
+        if apos is not None:
+            stmt = stmt.where(chave > tuple(apos), Consulta.dia >= apos.dia)
+        stmt = stmt.order_by(Consulta.dia, Consulta.hora, Consulta.id)
+    return db.scalars(stmt.limit(limit)).all()
+
+
+def _proxima_da_serie(
+    serie: SerieConsulta, excecoes: set[tuple[int, str]], dia: str, hora: str
+) -> dict[str, Any] | None:
+    # Canceladas e editadas (materializadas em `consultas`) estão em `excecoes`.
+    # Sem janela: `ocorrencias` parte da primeira data em `max(dia, inicio)` e,
+    # como as exceções são finitas, a busca para na primeira não excetuada (ou
+    # no `fim` da série).
+    for d in ocorrencias(serie, date.fromisoformat(dia), date.max):
+        ocorrencia = d.isoformat()
+        if (serie.id, ocorrencia) in excecoes or (ocorrencia, serie.hora) < (dia, hora):
+            continue
+        return {
+            "id": None,
+            "cpfPaciente": serie.cpf_paciente,
+            "dia": ocorrencia,
+            "hora": serie.hora,
+            "descricao": serie.descricao,
+            "estado": serie.estado,
+            "observacoes": serie.observacoes,
+            "serieId": serie.id,
+        }
+    return None
+
+
+def proxima_consulta(db: Session, cpf: str, agora: datetime | None = None) -> Consulta | dict[str, Any] | None:
+    """Primeira consulta do paciente a partir de `agora` (padrão: hora local)."""
+    agora = agora or datetime.now()
+    dia, hora = agora.date().isoformat(), agora.strftime("%H:%M")
+    consulta = db.scalars(
+        select(Consulta)
+        .where(
+            Consulta.cpf_paciente == cpf,
+            tuple_(Consulta.dia, Consulta.hora) >= (dia, hora),
+            Consulta.dia >= dia,
+        )
+        .order_by(Consulta.dia, Consulta.hora, Consulta.id)
+        .limit(1)
+    ).first()
+
+    series = db.scalars(
+        select(SerieConsulta).where(
+            SerieConsulta.cpf_paciente == cpf,
+            SerieConsulta.inicio <= (consulta.dia if consulta else "9999-12-31"),
+            or_(SerieConsulta.fim.is_(None), SerieConsulta.fim >= dia),
+        )
+    ).all()
+    if not series:
+        return consulta
+    excecoes = set(
+        db.execute(
+            select(ExcecaoSerie.serie_id, ExcecaoSerie.dia).where(
+                ExcecaoSerie.serie_id.in_([s.id for s in series]), ExcecaoSerie.dia >= dia
+            )
+        ).tuples()
+    )
+    candidatas = [o for s in series if (o := _proxima_da_serie(s, excecoes, dia, hora)) is not None]
+    if consulta is not None:
+        candidatas = [o for o in candidatas if (o["dia"], o["hora"]) < (consulta.dia, consulta.hora)]
+    return min(candidatas, key=lambda o: (o["dia"], o["hora"])) if candidatas else consulta
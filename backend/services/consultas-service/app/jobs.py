@@ -0,0 +1,342 @@
+"""Jobs em segundo plano do serviço de Consultas (sem broker externo).
+
+Operações longas (exportações, remoções em massa...) não rodam dentro do
+request: `POST /api/v1/jobs` grava um job `pendente` na tabela `jobs` e
+responde 202; o executor deste processo o pega e roda num pool de threads de
+tamanho fixo (`JOBS_WORKERS`). O progresso, o resultado e o erro ficam na
+própria tabela, lidos por `GET /api/v1/jobs/{id}`.
+
+- Reserva: `UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED)`, então
+  vários processos (workers do uvicorn, réplicas do serviço) dividem a fila
+  sem pegar o mesmo job.
+- Cancelamento: um job pendente é cancelado na hora; um em execução recebe
+  `cancelamento_solicitado` e para no próximo `ctx.progresso(...)`.
+- Falhas de processo: jobs em execução têm o `atualizado_em` renovado pelo
+  executor; um job sem sinal há `JOBS_ORFAO_S` volta para a fila (até
+  `JOBS_TENTATIVAS_MAX` tentativas). No desligamento, jobs em execução são
+  interrompidos no próximo `ctx.progresso` e voltam para a fila.
+- Multi-clínica (ver `app/db.py`): cada clínica tem a sua tabela `jobs`. O
+  despachante reserva em rodízio entre as clínicas e cada uma ocupa no máximo
+  `JOBS_POR_CLINICA_MAX` workers: a fila de uma clínica grande não atrasa os
+  jobs das outras. A tarefa usa `ctx.engine` (o banco da clínica do job).
+
+Tipos de job são registrados com `@tarefa("nome", SchemaDosParametros)`
+(ver `app/tarefas.py`); a função recebe o contexto e os parâmetros validados
+e devolve um dict (o resultado).
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from pydantic import BaseModel
+from sqlalchemy import DateTime, Index, String, Text, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .db import engine_da_clinica, engines_das_clinicas
+from .models import Base
+
+__all__ = [
+    "Job",
+    "ContextoJob",
+    "JobCancelado",
+    "TAREFAS",
+    "tarefa",
+    "executor",
+    "PENDENTE",
+    "EXECUTANDO",
+    "CANCELADO",
+    "ESTADOS_FINAIS",
+]
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("JOBS_WORKERS", "2"))  # 0: só aceita jobs, não executa
+INTERVALO_S = float(os.getenv("JOBS_INTERVALO_S", "2"))
+ORFAO_S = float(os.getenv("JOBS_ORFAO_S", "300"))
+TENTATIVAS_MAX = int(os.getenv("JOBS_TENTATIVAS_MAX", "3"))
+POR_CLINICA_MAX = int(os.getenv("JOBS_POR_CLINICA_MAX", "0")) or WORKERS  # 0: sem limite
+# Intervalo mínimo entre gravações de progresso de um mesmo job.
+PROGRESSO_S = 1.0
+
+PENDENTE, EXECUTANDO, CONCLUIDO, FALHOU, CANCELADO = (
+    "pendente",
+    "executando",
+    "concluido",
+    "falhou",
+    "cancelado",
+)
+ESTADOS_FINAIS = (CONCLUIDO, FALHOU, CANCELADO)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_estado_id", "estado", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    tipo: Mapped[str] = mapped_column(String(40), nullable=False)
+    parametros: Mapped[str] = mapped_column(Text, nullable=False, default="{}")  # JSON
+    estado: Mapped[str] = mapped_column(String(12), nullable=False, default=PENDENTE)
+
+    processados: Mapped[int] = mapped_column(nullable=False, default=0)
+    total: Mapped[int | None] = mapped_column(nullable=True)
+    resultado: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON
+    erro: Mapped[str | None] = mapped_column(Text, nullable=True)
+    cancelamento_solicitado: Mapped[bool] = mapped_column(nullable=False, default=False)
+    tentativas: Mapped[int] = mapped_column(nullable=False, default=0)
+
+    criado_em: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    iniciado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    concluido_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    atualizado_em: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class JobCancelado(Exception):
+    """Levantada por `ctx.progresso` quando o job foi cancelado."""
+
+
+class _JobInterrompido(Exception):
+    """Levantada por `ctx.progresso` durante o desligamento do processo."""
+
+
+@dataclass(frozen=True)
+class _Tarefa:
+    funcao: Callable[["ContextoJob", Any], dict[str, Any] | None]
+    parametros: type[BaseModel]
+
+
+TAREFAS: dict[str, _Tarefa] = {}
+
+
+def tarefa(nome: str, parametros: type[BaseModel]):
+    """Registra a função decorada como o tipo de job `nome`."""
+
+    def registrar(funcao):
+        TAREFAS[nome] = _Tarefa(funcao, parametros)
+        return funcao
+
+    return registrar
+
+
+class ContextoJob:
+    """Passado à função do job: clínica, progresso e pontos de cancelamento."""
+
+    def __init__(self, job_id: int, encerrando: threading.Event, clinica: str | None = None) -> None:
+        self.job_id = job_id
+        self.clinica = clinica
+        self.engine: Engine = engine_da_clinica(clinica)
+        self._encerrando = encerrando
+        self._ultima_gravacao = 0.0
+
+    def progresso(self, processados: int, total: int | None = None, *, forcar: bool = False) -> None:
+        """Registra o progresso; levanta `JobCancelado` se o job foi cancelado.
+
+        As gravações são espaçadas em `PROGRESSO_S`; chame à vontade entre lotes.
+        """
+        if self._encerrando.is_set():
+            raise _JobInterrompido()
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_gravacao < PROGRESSO_S:
+            return
+        self._ultima_gravacao = agora
+        valores: dict[str, Any] = {"processados": processados, "atualizado_em": datetime.utcnow()}
+        if total is not None:
+            valores["total"] = total
+        with self.engine.begin() as conn:
+            cancelar = conn.execute(
+                update(Job)
+                .where(Job.id == self.job_id)
+                .values(**valores)
+                .returning(Job.cancelamento_solicitado)
+            ).scalar()
+        if cancelar:
+            raise JobCancelado()
+
+
+class ExecutorJobs:
+    """Despachante (uma thread) + pool limitado de threads de execução."""
+
+    def __init__(self, workers: int = WORKERS) -> None:
+        self.workers = workers
+        self._vagas = threading.Semaphore(workers)
+        self._acordar = threading.Event()
+        self._encerrando = threading.Event()
+        self._executando: set[tuple[str | None, int]] = set()  # (clínica, id)
+        self._vez = itertools.count()
+        self._lock = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self._despachante: threading.Thread | None = None
+
+    def iniciar(self) -> None:
+        if self.workers <= 0 or self._despachante is not None:
+            return
+        self._encerrando.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._despachante = threading.Thread(target=self._despachar, name="jobs", daemon=True)
+        self._despachante.start()
+
+    def encerrar(self, espera_s: float = 30.0) -> None:
+        """Interrompe os jobs em execução (voltam para a fila) e para o pool."""
+        if self._despachante is None:
+            return
+        self._encerrando.set()
+        self._acordar.set()
+        self._despachante.join(timeout=espera_s)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._despachante = self._pool = None
+
+    def acordar(self) -> None:
+        """Avisa o despachante de que há job novo (evita esperar o intervalo)."""
+        self._acordar.set()
+
+    def _despachar(self) -> None:
+        proxima_manutencao = 0.0
+        while not self._encerrando.is_set():
+            try:
+                if time.monotonic() >= proxima_manutencao:
+                    proxima_manutencao = time.monotonic() + INTERVALO_S * 5
+                    self._manutencao()
+                while self._vagas.acquire(blocking=False):
+                    reservado = self._reservar_na_vez()
+                    if reservado is None:
+                        self._vagas.release()
+                        break
+                    self._pool.submit(self._executar, *reservado)
+            except Exception:  # o despachante não pode morrer por uma falha pontual
+                logger.exception("Falha ao despachar jobs")
+            self._acordar.wait(INTERVALO_S)
+            self._acordar.clear()
+
+    def _reservar_na_vez(self) -> tuple[str | None, int, str, str] | None:
+        # Rodízio: cada vaga começa pela clínica seguinte à da vaga anterior.
+        clinicas = list(engines_das_clinicas())
+        inicio = next(self._vez)
+        for i in range(len(clinicas)):
+            clinica = clinicas[(inicio + i) % len(clinicas)]
+            with self._lock:
+                if sum(c == clinica for c, _ in self._executando) >= POR_CLINICA_MAX:
+                    continue
+            reservado = _reservar_proximo(engine_da_clinica(clinica))
+            if reservado is not None:
+                with self._lock:
+                    self._executando.add((clinica, reservado[0]))
+                return (clinica, *reservado)
+        return None
+
+    def _manutencao(self) -> None:
+        for clinica, eng in engines_das_clinicas().items():
+            with self._lock:
+                ids = [i for c, i in self._executando if c == clinica]
+            self._manter(eng, ids)
+
+    def _manter(self, engine: Engine, ids: list[int]) -> None:
+        agora = datetime.utcnow()
+        with engine.begin() as conn:
+            if ids:  # sinal de vida dos jobs deste processo
+                conn.execute(
+                    update(Job).where(Job.id.in_(ids), Job.estado == EXECUTANDO).values(atualizado_em=agora)
+                )
+            limite = agora - timedelta(seconds=ORFAO_S)
+            orfaos = (Job.estado == EXECUTANDO) & (Job.atualizado_em < limite)
+            conn.execute(
+                update(Job)
+                .where(orfaos, Job.tentativas < TENTATIVAS_MAX)
+                .values(estado=PENDENTE, atualizado_em=agora)
+            )
+            conn.execute(
+                update(Job)
+                .where(orfaos, Job.tentativas >= TENTATIVAS_MAX)
+                .values(estado=FALHOU, erro="Job abandonado (sem sinal de vida)", concluido_em=agora)
+            )
+
+    def _executar(self, clinica: str | None, job_id: int, tipo: str, parametros: str) -> None:
+        eng = engine_da_clinica(clinica)
+        try:
+            definicao = TAREFAS.get(tipo)
+            if definicao is None:
+                _finalizar(eng, job_id, FALHOU, erro=f"Tipo de job desconhecido: {tipo}")
+                return
+            ctx = ContextoJob(job_id, self._encerrando, clinica)
+            params = definicao.parametros.model_validate_json(parametros)
+            resultado = definicao.funcao(ctx, params)
+            _finalizar(eng, job_id, CONCLUIDO, resultado=resultado or {})
+        except JobCancelado:
+            _finalizar(eng, job_id, CANCELADO)
+        except _JobInterrompido:
+            _devolver_para_fila(eng, job_id)
+        except Exception as e:
+            logger.exception("Job %s (%s) falhou", job_id, tipo)
+            _finalizar(eng, job_id, FALHOU, erro=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._executando.discard((clinica, job_id))
+            self._vagas.release()
+            self._acordar.set()
+
+
+def _reservar_proximo(engine: Engine) -> tuple[int, str, str] | None:
+    agora = datetime.utcnow()
+    proximo = (
+        select(Job.id)
+        .where(Job.estado == PENDENTE)
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id == proximo, Job.estado == PENDENTE)
+        .values(
+            estado=EXECUTANDO,
+            iniciado_em=agora,
+            atualizado_em=agora,
+            tentativas=Job.tentativas + 1,
+        )
+        .returning(Job.id, Job.tipo, Job.parametros)
+    )
+    with engine.begin() as conn:
+        linha = conn.execute(stmt).first()
+    return tuple(linha) if linha is not None else None
+
+
+def _finalizar(
+    engine: Engine, job_id: int, estado: str, *, resultado: dict | None = None, erro: str | None = None
+) -> None:
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.estado == EXECUTANDO)
+            .values(
+                estado=estado,
+                resultado=json.dumps(resultado, default=str) if resultado is not None else None,
+                erro=erro,
+                concluido_em=agora,
+                atualizado_em=agora,
+            )
+        )
+
+
+def _devolver_para_fila(engine: Engine, job_id: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.estado == EXECUTANDO)
+            # Interrupção por desligamento não conta como tentativa.
+            .values(estado=PENDENTE, tentativas=Job.tentativas - 1, atualizado_em=datetime.utcnow())
+        )
+
+
+# Executor do processo: iniciado/encerrado pelo `lifespan` da aplicação.
+executor = ExecutorJobs()
@@ -3,15 +3,56 @@
 # Responsável por inicializar a aplicação FastAPI, criar as tabelas (MVP) e
 # registrar as rotas relacionadas às consultas médicas.
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .db import engine
+from .admissao import AdmissaoMiddleware, metricas as metricas_admissao
+from .auditoria import gravador as gravador_auditoria, instalar_auditoria
+from .compressao import CompressaoMiddleware
+from .idempotencia import IdempotenciaMiddleware
+from .jobs import executor as executor_jobs
+from . import tarefas  # noqa: F401 - registra os tipos de job
+from .busca import instalar_busca_textual
+from .db import criar_esquema, engines_das_clinicas
+from .eventos import corretor as corretor_eventos, instalar_eventos
+from .historico import instalar_historico
 from .models import Base
-from .routers import consultas
+from .particoes import instalar_particionamento, manutencao as manutencao_particoes
+from .recorrencia import instalar_recorrencia
+from .routers import auditoria, busca, consultas, eventos, jobs, series
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Gravação da trilha de auditoria em lotes (ver `app/auditoria.py`).
+    gravador_auditoria.iniciar()
+    # Executor de jobs em segundo plano (pool limitado; ver `app/jobs.py`).
+    executor_jobs.iniciar()
+    # Partições dos próximos meses criadas periodicamente (ver `app/particoes.py`).
+    manutencao_particoes.iniciar(*engines_das_clinicas().values())
+    yield
+    executor_jobs.encerrar()
+    manutencao_particoes.encerrar()
+    corretor_eventos.encerrar()
+    # Por último: grava o que jobs e requests deixaram no buffer.
+    gravador_auditoria.encerrar()
 
 
 # Instancia a aplicação FastAPI com metadados básicos
-app = FastAPI(title="consultas-service", version="0.1.0")
+app = FastAPI(title="consultas-service", version="0.1.0", lifespan=lifespan)
+
+# Controle de admissão por classe de rota (escrita/leitura/busca): excedentes
+# recebem 503 + Retry-After em vez de esperar por conexão. Registrado antes do
+# CORS para que as respostas 503 também levem os cabeçalhos CORS.
+app.add_middleware(AdmissaoMiddleware)
+
+# `Idempotency-Key` nos POSTs: repetições devolvem a resposta original sem
+# reexecutar a escrita. Fica fora da admissão: repetições não ocupam vaga.
+app.add_middleware(IdempotenciaMiddleware)
+
+# Compressão negociada (brotli/gzip) para respostas a partir de 1 KiB.
+app.add_middleware(CompressaoMiddleware)
 
 # Habilita CORS para acesso via browser durante desenvolvimento
 app.add_middleware(
@@ -23,16 +64,62 @@ app.add_middleware(
 )
 
 
-# Cria as tabelas no banco no primeiro start (MVP). Para produção, prefira
-# migrations com Alembic em vez de `create_all`.
-Base.metadata.create_all(bind=engine)
+# Banco de cada clínica: schema próprio no seu shard (sem multi-clínica, só o
+# banco do serviço; ver `app/db.py`).
+for clinica, eng in engines_das_clinicas().items():
+    criar_esquema(clinica)
+    # Cria as tabelas no banco no primeiro start (MVP). Para produção, prefira
+    # migrations com Alembic em vez de `create_all`.
+    Base.metadata.create_all(bind=eng)
+
+    # `consultas.serie_id` em bancos criados antes das séries recorrentes.
+    instalar_recorrencia(eng)
+
+    # `consultas` particionada por mês em `dia` (converte bancos antigos uma vez);
+    # antes da busca e dos eventos, que instalam coluna/índice/triggers nela.
+    instalar_particionamento(eng)
+
+    # Índice (cpf_paciente, dia, hora, id) do histórico por paciente.
+    instalar_historico(eng)
 
+    # Coluna tsvector gerada + índice GIN da busca textual (DDL idempotente).
+    instalar_busca_textual(eng)
 
-# Registra as rotas do domínio de consultas
+    # Triggers de NOTIFY que alimentam o stream de eventos da agenda.
+    instalar_eventos(eng)
+
+    # Triggers que tornam `auditoria` somente-inserção.
+    instalar_auditoria(eng)
+
+
+# Registra as rotas do domínio de consultas (eventos antes de `/consultas/{id}`)
+app.include_router(eventos.router)
 app.include_router(consultas.router)
+app.include_router(series.router)
+app.include_router(busca.router)
+app.include_router(jobs.router)
+app.include_router(auditoria.router)
 
 
 @app.get("/health")
 def health():
     """Endpoint de verificação simples de saúde da aplicação."""
     return {"status": "ok"}
+
+
+@app.get("/metrics/admissao")
+def admissao():
+    """Contadores do controle de admissão por shard e classe de rota."""
+    return metricas_admissao()
+
+
+@app.get("/metrics/eventos")
+def eventos_metricas():
+    """Conexões SSE abertas neste processo."""
+    return corretor_eventos.metricas()
+
+
+@app.get("/metrics/auditoria")
+def auditoria_metricas():
+    """Buffer da trilha de auditoria por shard (ocupação, reservas, gravados, falhas)."""
+    return gravador_auditoria.metricas()
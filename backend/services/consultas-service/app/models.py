@@ -1,6 +1,7 @@
 """Modelos SQLAlchemy do serviço de Consultas.
 
-Define o mapeamento ORM para a entidade `Consulta`. Como este é um
+Define o mapeamento ORM para as entidades `Consulta`, `SerieConsulta`
+(consultas recorrentes) e `ExcecaoSerie`. Como este é um
 microsserviço independente, não há FK direta para pacientes (em outro serviço);
 armazenamos apenas o `cpf_paciente` como string.
 """
@@ -9,8 +10,10 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, String
+from sqlalchemy import DateTime, ForeignKey, Index, String
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.sql.functions import FunctionElement
 
 # Comprimentos máximos centralizados para facilitar manutenção
 CPF_LEN = 14  # Ex.: 000.000.000-00
@@ -19,8 +22,36 @@ HORA_LEN = 8  # Ex.: HH:MM ou HH:MM:SS
 DESC_LEN = 255
 ESTADO_LEN = 40
 OBS_LEN = 255
+FREQ_LEN = 10  # diaria | semanal | mensal
 
-__all__ = ["Base", "Consulta"]
+__all__ = ["Base", "Consulta", "SerieConsulta", "ExcecaoSerie"]
+
+
+class agora_utc(FunctionElement):
+    """Hora do relógio do banco, em UTC, no momento do comando.
+
+    Não é o início da transação (`now()`): a exportação (ver
+    `app/exportacao.py`) compara `created_at` com um corte lido no mesmo
+    relógio, sob lock, e uma transação longa não pode gravar um valor antigo.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(agora_utc)
+def _agora_utc(elemento, compilador, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(agora_utc, "sqlite")
+def _agora_utc_sqlite(elemento, compilador, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"  # com milissegundos
+
+
+@compiles(agora_utc, "postgresql")
+def _agora_utc_pg(elemento, compilador, **kw):
+    return "(clock_timestamp() AT TIME ZONE 'UTC')"
 
 
 class Base(DeclarativeBase):
@@ -36,12 +67,14 @@ class Consulta(Base):
     """
 
     __tablename__ = "consultas"
+    # Histórico por paciente em ordem cronológica (ver `app/historico.py`).
+    __table_args__ = (Index("ix_consultas_cpf_dia_hora", "cpf_paciente", "dia", "hora", "id"),)
 
     # Identificador da consulta (PK autoincremental)
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
     # Relacionamento lógico via CPF (sem FK entre serviços)
-    cpf_paciente: Mapped[str] = mapped_column(String(CPF_LEN), index=True, nullable=False)
+    cpf_paciente: Mapped[str] = mapped_column(String(CPF_LEN), nullable=False)
 
     # Dados da consulta
     dia: Mapped[str] = mapped_column(String(DIA_LEN), nullable=False)
@@ -50,11 +83,73 @@ class Consulta(Base):
     estado: Mapped[str | None] = mapped_column(String(ESTADO_LEN), nullable=True)
     observacoes: Mapped[str | None] = mapped_column(String(OBS_LEN), nullable=True)
 
-    # Auditoria simples
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Série de origem, quando a consulta é uma ocorrência materializada
+    serie_id: Mapped[int | None] = mapped_column(
+        ForeignKey("series_consultas.id", ondelete="SET NULL"), nullable=True
+    )
+
+    # Auditoria simples. Preenchida pelo banco no INSERT: é a marca d'água da
+    # exportação (ver `agora_utc`)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=agora_utc(), nullable=False)
 
     def __repr__(self) -> str:  # pragma: no cover - utilitário de depuração
         return (
             f"Consulta(id={self.id!r}, cpf={self.cpf_paciente!r}, "
             f"dia={self.dia!r}, hora={self.hora!r})"
         )
+
+
+class SerieConsulta(Base):
+    """Série de consultas recorrentes (ex.: terapia semanal).
+
+    Guarda apenas a regra — `frequencia` a cada `intervalo`, de `inicio` até
+    `fim` (aberta se nulo) — e não uma linha por ocorrência. As ocorrências
+    são calculadas para a janela consultada (ver `app/recorrencia.py`); só as
+    editadas viram linhas em `consultas`, registradas em `ExcecaoSerie`.
+    """
+
+    __tablename__ = "series_consultas"
+    __table_args__ = (Index("ix_series_consultas_inicio_fim", "inicio", "fim"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    cpf_paciente: Mapped[str] = mapped_column(String(CPF_LEN), index=True, nullable=False)
+
+    # Regra de recorrência
+    frequencia: Mapped[str] = mapped_column(String(FREQ_LEN), nullable=False)
+    intervalo: Mapped[int] = mapped_column(default=1, nullable=False)
+    inicio: Mapped[str] = mapped_column(String(DIA_LEN), nullable=False)
+    fim: Mapped[str | None] = mapped_column(String(DIA_LEN), nullable=True)
+
+    # Dados copiados para cada ocorrência
+    hora: Mapped[str] = mapped_column(String(HORA_LEN), nullable=False)
+    descricao: Mapped[str] = mapped_column(String(DESC_LEN), nullable=False)
+    estado: Mapped[str | None] = mapped_column(String(ESTADO_LEN), nullable=True)
+    observacoes: Mapped[str | None] = mapped_column(String(OBS_LEN), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:  # pragma: no cover - utilitário de depuração
+        return (
+            f"SerieConsulta(id={self.id!r}, cpf={self.cpf_paciente!r}, "
+            f"frequencia={self.frequencia!r}, inicio={self.inicio!r})"
+        )
+
+
+class ExcecaoSerie(Base):
+    """Ocorrência de uma série que não segue a regra.
+
+    `dia` é a data original da ocorrência. Com `consulta_id`, a ocorrência foi
+    editada e materializada nessa consulta; sem ele, foi cancelada.
+    """
+
+    __tablename__ = "excecoes_series"
+
+    serie_id: Mapped[int] = mapped_column(
+        ForeignKey("series_consultas.id", ondelete="CASCADE"), primary_key=True
+    )
+    dia: Mapped[str] = mapped_column(String(DIA_LEN), primary_key=True)
+    # Remover (ou arquivar) a consulta materializada equivale a cancelar a
+    # ocorrência. Sem FK: no Postgres `consultas` é particionada e sua PK é
+    # `(id, dia)` (ver `app/particoes.py`); um `consulta_id` sem consulta é
+    # tratado como ocorrência cancelada.
+    consulta_id: Mapped[int | None] = mapped_column(nullable=True)
@@ -0,0 +1,355 @@
+"""Particionamento mensal de `consultas` e arquivamento de meses antigos.
+
+No Postgres, `consultas` é particionada por faixa (`RANGE`) em `dia`, uma
+partição por mês (`consultas_AAAA_MM`), mais `consultas_padrao` para valores
+fora das faixas existentes (nenhum INSERT falha por falta de partição). Como
+quase todo o tráfego é da semana corrente e das próximas, as consultas por
+`dia` ou janela `de`/`ate` (`listar_consultas`, séries) só leem as partições
+dos meses pedidos (partition pruning).
+
+- Instalação (`instalar_particionamento`, no start): um banco com a tabela
+  antiga, não particionada, é convertido uma única vez (cópia dos dados sob
+  lock exclusivo). Como a PK de uma tabela particionada precisa incluir a
+  chave de partição, no banco ela passa a `(id, dia)`; para o ORM a chave
+  continua `id`.
+- Manutenção (`manter_particoes`): garante as partições do mês corrente até
+  `CONSULTAS_PARTICOES_FUTURAS_MESES` à frente; roda no start e a cada
+  `CONSULTAS_PARTICOES_INTERVALO_S` segundos. Linhas que caíram na partição
+  padrão são movidas para a partição do mês quando ela é criada.
+- Arquivamento (comando abaixo): desanexa as partições anteriores a um mês,
+  grava cada uma como Parquet comprimido (zstd) no armazenamento frio e só
+  então remove a tabela. Uma execução interrompida é retomada: partições já
+  desanexadas e não removidas são arquivadas na próxima.
+
+Uso:
+    python -m app.particoes manter [--url URL | --clinica ID]
+    python -m app.particoes arquivar /caminho/frio --antes-de AAAA-MM [--lote 50000] [--url URL | --clinica ID]
+
+Com multi-clínica (`CLINICAS`, ver `app/db.py`), cada clínica tem sua
+`consultas` particionada no próprio schema; os comandos valem para a clínica
+de `--clinica` (padrão: `CLINICA_PADRAO`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import threading
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import column, create_engine, select, table, text
+from sqlalchemy.engine import Connection, Engine
+
+from .db import CLINICA_PADRAO, CLINICAS, engine_da_clinica
+from .exportacao import _tipo_arrow
+from .models import Consulta
+
+__all__ = [
+    "instalar_particionamento",
+    "manter_particoes",
+    "arquivar",
+    "manutencao",
+]
+
+logger = logging.getLogger(__name__)
+
+FUTURAS_MESES = int(os.getenv("CONSULTAS_PARTICOES_FUTURAS_MESES", "6"))
+INTERVALO_S = float(os.getenv("CONSULTAS_PARTICOES_INTERVALO_S", "21600"))
+# DDL de partição espera no máximo isto por locks; senão tenta no próximo ciclo.
+LOCK_TIMEOUT = "5s"
+
+TABELA = "consultas"
+PADRAO = f"{TABELA}_padrao"
+_NOME_MES = re.compile(rf"^{TABELA}_(\d{{4}})_(\d{{2}})$")
+# Serializa conversão/manutenção entre processos (workers, réplicas do serviço);
+# por schema, para que clínicas de um mesmo shard não esperem umas às outras.
+_TRAVA = f"hashtext(current_schema() || '.{TABELA}_particoes')"
+
+
+def _mes(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _somar_meses(mes: date, n: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _nome(mes: date) -> str:
+    return f"{TABELA}_{mes:%Y_%m}"
+
+
+def _mes_do_nome(nome: str) -> date | None:
+    m = _NOME_MES.match(nome)
+    return date(int(m[1]), int(m[2]), 1) if m else None
+
+
+def _particionada(conn: Connection) -> bool:
+    return bool(
+        conn.scalar(
+            text("SELECT count(*) FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+            {"t": TABELA},
+        )
+    )
+
+
+def _anexadas(conn: Connection) -> set[str]:
+    return set(
+        conn.scalars(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:t)"
+            ),
+            {"t": TABELA},
+        )
+    )
+
+
+def _colunas(conn: Connection, tabela: str) -> str:
+    """Colunas graváveis (sem as geradas, como `busca`), na ordem da tabela."""
+    nomes = conn.scalars(
+        text(
+            "SELECT quote_ident(attname) FROM pg_attribute WHERE attrelid = to_regclass(:t) "
+            "AND attnum > 0 AND NOT attisdropped AND attgenerated = '' ORDER BY attnum"
+        ),
+        {"t": tabela},
+    )
+    return ", ".join(nomes)
+
+
+def _criar_particao(conn: Connection, mes: date) -> None:
+    de, ate = mes.isoformat(), _somar_meses(mes, 1).isoformat()
+    colunas = _colunas(conn, TABELA)
+    faixa = "dia >= :de AND dia < :ate"
+    # Linhas do mês que caíram na partição padrão impedem o CREATE: saem antes
+    # e voltam pela tabela-mãe, já para a partição nova.
+    params = {"de": de, "ate": ate}
+    conn.execute(text(f"CREATE TEMP TABLE _movidas AS SELECT {colunas} FROM {PADRAO} WHERE {faixa}"), params)
+    conn.execute(text(f"DELETE FROM {PADRAO} WHERE {faixa}"), params)
+    conn.exec_driver_sql(
+        f"CREATE TABLE {_nome(mes)} PARTITION OF {TABELA} FOR VALUES FROM ('{de}') TO ('{ate}')"
+    )
+    conn.exec_driver_sql(f"INSERT INTO {TABELA} ({colunas}) SELECT {colunas} FROM _movidas")
+    conn.exec_driver_sql("DROP TABLE _movidas")
+
+
+def _garantir_particoes(conn: Connection, meses: set[date]) -> list[str]:
+    existentes = _anexadas(conn)
+    criadas = []
+    for mes in sorted(meses):
+        if _nome(mes) not in existentes:
+            _criar_particao(conn, mes)
+            criadas.append(_nome(mes))
+    return criadas
+
+
+def _meses_a_frente(hoje: date | None = None) -> set[date]:
+    atual = _mes(hoje or date.today())
+    return {_somar_meses(atual, n) for n in range(FUTURAS_MESES + 1)}
+
+
+def _converter(conn: Connection) -> None:
+    """Troca a tabela comum por uma particionada com os mesmos dados."""
+    antiga = f"{TABELA}_nao_particionada"
+    conn.exec_driver_sql(f"LOCK TABLE {TABELA} IN ACCESS EXCLUSIVE MODE")
+    conn.exec_driver_sql(f"ALTER TABLE {TABELA} RENAME TO {antiga}")
+    conn.exec_driver_sql(
+        f"CREATE TABLE {TABELA} (LIKE {antiga} INCLUDING DEFAULTS INCLUDING GENERATED) "
+        f"PARTITION BY RANGE (dia)"
+    )
+    conn.exec_driver_sql(f"CREATE TABLE {PADRAO} PARTITION OF {TABELA} DEFAULT")
+
+    # Um mês por partição só onde há dados (valores malformados ficam na padrão).
+    meses = _meses_a_frente()
+    for ano_mes in conn.scalars(text(f"SELECT DISTINCT left(dia, 7) FROM {antiga}")):
+        try:
+            meses.add(date.fromisoformat(f"{ano_mes}-01"))
+        except ValueError:
+            pass
+    _garantir_particoes(conn, meses)
+
+    colunas = _colunas(conn, antiga)
+    conn.exec_driver_sql(f"INSERT INTO {TABELA} ({colunas}) SELECT {colunas} FROM {antiga}")
+    # A sequência de `id` passa para a tabela nova antes de a antiga sair.
+    seq = conn.scalar(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": antiga})
+    if seq:
+        conn.exec_driver_sql(f"ALTER SEQUENCE {seq} OWNED BY {TABELA}.id")
+    # CASCADE: leva a FK antiga `excecoes_series.consulta_id` (ver `models.py`).
+    conn.exec_driver_sql(f"DROP TABLE {antiga} CASCADE")
+
+    conn.exec_driver_sql(f"ALTER TABLE {TABELA} ADD PRIMARY KEY (id, dia)")
+    conn.exec_driver_sql(
+        f"ALTER TABLE {TABELA} ADD FOREIGN KEY (serie_id) "
+        f"REFERENCES series_consultas (id) ON DELETE SET NULL"
+    )
+    for indice in Consulta.__table__.indexes:
+        indice.create(conn, checkfirst=True)
+
+
+def instalar_particionamento(engine: Engine) -> None:
+    """Converte `consultas` para particionada (uma vez) e cria as partições."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        if not _particionada(conn):
+            conn.execute(text(f"SELECT pg_advisory_xact_lock({_TRAVA})"))
+            if not _particionada(conn):  # outro processo pode ter convertido
+                logger.info("Convertendo %s para tabela particionada por mês", TABELA)
+                _converter(conn)
+    manter_particoes(engine)
+
+
+def manter_particoes(engine: Engine, hoje: date | None = None) -> list[str]:
+    """Cria as partições do mês corrente e dos próximos; devolve as criadas."""
+    if engine.dialect.name != "postgresql":
+        return []
+    with engine.begin() as conn:
+        if not conn.scalar(text(f"SELECT pg_try_advisory_xact_lock({_TRAVA})")):
+            return []  # outro processo está cuidando disso
+        if not _particionada(conn):
+            return []
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        return _garantir_particoes(conn, _meses_a_frente(hoje))
+
+
+def _arquivar_particao(eng: Engine, nome: str, destino: str, lote: int) -> int:
+    t = table(nome, *(column(c.name) for c in Consulta.__table__.columns))
+    schema = pa.schema([pa.field(c.name, _tipo_arrow(c)) for c in Consulta.__table__.columns])
+    arquivo = os.path.join(destino, f"{nome}.parquet")
+
+    total = 0
+    with eng.connect() as conn:
+        with pq.ParquetWriter(arquivo + ".tmp", schema, compression="zstd") as escritor:
+            resultado = conn.execute(select(t).order_by(t.c.id), execution_options={"yield_per": lote})
+            for linhas in resultado.partitions():
+                colunas = [pa.array(v, type=f.type) for v, f in zip(zip(*linhas), schema)]
+                escritor.write_table(pa.Table.from_arrays(colunas, schema=schema))
+                total += len(linhas)
+        if pq.read_metadata(arquivo + ".tmp").num_rows != total:
+            raise RuntimeError(f"Arquivo de {nome} incompleto; partição mantida")
+        os.replace(arquivo + ".tmp", arquivo)
+        # Só remove depois de o arquivo estar completo no destino.
+        conn.exec_driver_sql(f"DROP TABLE {nome}")
+        conn.commit()
+    return total
+
+
+def arquivar(
+    destino: str, antes_de: date, lote: int = 50_000, eng: Engine | None = None
+) -> dict[str, int]:
+    """Arquiva as partições de meses anteriores a `antes_de`; devolve linhas por partição."""
+    eng = eng or engine_da_clinica(CLINICA_PADRAO)
+    antes_de = _mes(antes_de)
+    if antes_de > _mes(date.today()):
+        raise ValueError("Só é possível arquivar meses já encerrados")
+    os.makedirs(destino, exist_ok=True)
+
+    with eng.begin() as conn:
+        if not _particionada(conn):
+            raise RuntimeError(f"{TABELA} não é particionada")
+        anexadas = _anexadas(conn)
+        # Desanexadas por uma execução anterior que não chegou a removê-las.
+        soltas = set(
+            conn.scalars(
+                text(
+                    "SELECT c.relname FROM pg_class c WHERE c.relkind = 'r' AND c.relname ~ :padrao "
+                    "AND c.relnamespace = current_schema()::regnamespace "
+                    "AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)"
+                ),
+                {"padrao": _NOME_MES.pattern},
+            )
+        )
+    alvos = sorted(
+        n for n in anexadas | soltas if (mes := _mes_do_nome(n)) is not None and mes < antes_de
+    )
+
+    por_particao = {}
+    for nome in alvos:
+        if nome in anexadas:
+            with eng.begin() as conn:
+                conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+                conn.exec_driver_sql(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}")
+        por_particao[nome] = _arquivar_particao(eng, nome, destino, lote)
+        logger.info("%s arquivada (%d linhas)", nome, por_particao[nome])
+    return por_particao
+
+
+class ManutencaoParticoes:
+    """Thread que roda `manter_particoes` periodicamente (iniciada no `lifespan`)."""
+
+    def __init__(self, intervalo_s: float = INTERVALO_S) -> None:
+        self.intervalo_s = intervalo_s
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def iniciar(self, *engines: Engine) -> None:
+        """Mantém as partições de cada engine (um por clínica; ver `app/db.py`)."""
+        engines = [e for e in engines if e.dialect.name == "postgresql"]
+        if not engines or self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._rodar, args=(engines,), name="particoes", daemon=True)
+        self._thread.start()
+
+    def encerrar(self) -> None:
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def _rodar(self, engines: list[Engine]) -> None:
+        while not self._parar.wait(self.intervalo_s):
+            for engine in engines:
+                try:
+                    criadas = manter_particoes(engine)
+                    if criadas:
+                        logger.info("Partições criadas: %s", ", ".join(criadas))
+                except Exception:  # tenta de novo no próximo ciclo
+                    logger.exception("Falha na manutenção das partições de %s", TABELA)
+
+
+manutencao = ManutencaoParticoes()
+
+
+def _ano_mes(valor: str) -> date:
+    try:
+        return date.fromisoformat(f"{valor}-01")
+    except ValueError:
+        raise argparse.ArgumentTypeError("use o formato AAAA-MM")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    alvo = parser.add_mutually_exclusive_group()
+    alvo.add_argument("--url", help="URL do banco (padrão: DATABASE_URL)")
+    alvo.add_argument("--clinica", default=CLINICA_PADRAO, help="clínica (com CLINICAS; padrão: CLINICA_PADRAO)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("manter", help="cria as partições do mês corrente e dos próximos")
+    p = sub.add_parser("arquivar", help="arquiva (Parquet) e remove partições antigas")
+    p.add_argument("destino", help="diretório do armazenamento frio")
+    p.add_argument("--antes-de", type=_ano_mes, required=True, help="primeiro mês mantido (AAAA-MM)")
+    p.add_argument("--lote", type=int, default=50_000, help="linhas lidas por vez")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.url:
+        eng = create_engine(args.url)
+    else:
+        if CLINICAS and args.clinica not in CLINICAS:
+            parser.error(f"informe --clinica (uma de: {', '.join(CLINICAS)})")
+        eng = engine_da_clinica(args.clinica)
+    if args.comando == "manter":
+        criadas = manter_particoes(eng)
+        print(f"{len(criadas)} partição(ões) criada(s): {', '.join(criadas) or '-'}")
+    else:
+        for nome, linhas in arquivar(args.destino, args.antes_de, args.lote, eng).items():
+            print(f"{nome}: {linhas} linhas → {os.path.join(args.destino, nome)}.parquet")
+
+
+if __name__ == "__main__":
+    main()
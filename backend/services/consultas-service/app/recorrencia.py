@@ -0,0 +1,160 @@
+"""Séries de consultas recorrentes: expansão preguiçosa das ocorrências.
+
+Uma série ocupa uma linha (a regra) mais uma por exceção, independente de
+quantas ocorrências gera. `listar_consultas` calcula as ocorrências apenas
+para a janela pedida (`expandir_series`): busca as séries ativas na janela
+pelo índice `(inicio, fim)`, as exceções dessas séries na janela, e gera as
+datas em memória. Ocorrências editadas já estão em `consultas` (com
+`serie_id`) e as canceladas são omitidas.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Iterator
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .models import ExcecaoSerie, SerieConsulta
+
+__all__ = [
+    "FREQUENCIAS",
+    "instalar_recorrencia",
+    "ocorrencias",
+    "ocorre_em",
+    "janela_da_listagem",
+    "expandir_series",
+]
+
+FREQUENCIAS = ("diaria", "semanal", "mensal")
+
+# Maior janela (em dias) que a listagem aceita expandir de uma vez.
+JANELA_MAX_DIAS = 366
+
+# Tabelas criadas antes das séries não recebem a coluna via `create_all`.
+_DDL = (
+    """
+    ALTER TABLE consultas ADD COLUMN IF NOT EXISTS serie_id integer
+    REFERENCES series_consultas (id) ON DELETE SET NULL
+    """,
+)
+
+
+def instalar_recorrencia(engine: Engine) -> None:
+    """Adiciona (se preciso) `consultas.serie_id` em bancos já existentes."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for ddl in _DDL:
+            conn.exec_driver_sql(ddl)
+
+
+def ocorrencias(serie: SerieConsulta, de: date, ate: date) -> Iterator[date]:
+    """Datas das ocorrências de `serie` entre `de` e `ate` (inclusive)."""
+    inicio = date.fromisoformat(serie.inicio)
+    fim = min(ate, date.fromisoformat(serie.fim)) if serie.fim else ate
+    de = max(de, inicio)
+    if de > fim:
+        return
+
+    if serie.frequencia == "mensal":
+        # Mesmo dia do mês de `inicio`; meses sem esse dia (ex.: 31) são pulados.
+        meses = (de.year - inicio.year) * 12 + de.month - inicio.month
+        k = -(-meses // serie.intervalo)
+        while True:
+            total = inicio.month - 1 + k * serie.intervalo
+            ano, mes = inicio.year + total // 12, total % 12 + 1
+            if ano > fim.year or date(ano, mes, 1) > fim:
+                return
+            try:
+                d = date(ano, mes, inicio.day)
+            except ValueError:
+                d = None
+            if d is not None and de <= d <= fim:
+                yield d
+            k += 1
+
+    passo = serie.intervalo * (7 if serie.frequencia == "semanal" else 1)
+    d = inicio + timedelta(days=-(-(de - inicio).days // passo) * passo)
+    while d <= fim:
+        yield d
+        if (fim - d).days < passo:  # sem passar de `date.max` (série sem fim)
+            return
+        d += timedelta(days=passo)
+
+
+def ocorre_em(serie: SerieConsulta, dia: date) -> bool:
+    return next(ocorrencias(serie, dia, dia), None) is not None
+
+
+def _dia_ou_422(valor: str, nome: str) -> date:
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"`{nome}` deve seguir o formato YYYY-MM-DD")
+
+
+def janela_da_listagem(dia: str | None, de: str | None, ate: str | None) -> tuple[date, date] | None:
+    """Janela `[de, ate]` pedida na listagem (`dia` equivale a `de = ate`)."""
+    if dia:
+        d = _dia_ou_422(dia, "dia")
+        return d, d
+    if de is None and ate is None:
+        return None
+    if de is None or ate is None:
+        raise HTTPException(status_code=422, detail="Informe `de` e `ate` juntos")
+    inicio, fim = _dia_ou_422(de, "de"), _dia_ou_422(ate, "ate")
+    if fim < inicio:
+        raise HTTPException(status_code=422, detail="`ate` deve ser igual ou posterior a `de`")
+    if (fim - inicio).days >= JANELA_MAX_DIAS:
+        raise HTTPException(status_code=422, detail=f"Janela máxima de {JANELA_MAX_DIAS} dias")
+    return inicio, fim
+
+
+def expandir_series(db: Session, de: date, ate: date) -> list[dict[str, Any]]:
+    """Ocorrências virtuais (não materializadas) na janela, por `(dia, hora)`.
+
+    Cada item tem os campos de `ConsultaOut` (pelos aliases), com `id` nulo e
+    `serieId` preenchido.
+    """
+    series = db.scalars(
+        select(SerieConsulta).where(
+            SerieConsulta.inicio <= ate.isoformat(),
+            or_(SerieConsulta.fim.is_(None), SerieConsulta.fim >= de.isoformat()),
+        )
+    ).all()
+    if not series:
+        return []
+
+    excecoes = set(
+        db.execute(
+            select(ExcecaoSerie.serie_id, ExcecaoSerie.dia).where(
+                ExcecaoSerie.serie_id.in_([s.id for s in series]),
+                ExcecaoSerie.dia.between(de.isoformat(), ate.isoformat()),
+            )
+        ).tuples()
+    )
+
+    itens = []
+    for s in series:
+        for d in ocorrencias(s, de, ate):
+            dia = d.isoformat()
+            if (s.id, dia) in excecoes:
+                continue
+            itens.append(
+                {
+                    "id": None,
+                    "cpfPaciente": s.cpf_paciente,
+                    "dia": dia,
+                    "hora": s.hora,
+                    "descricao": s.descricao,
+                    "estado": s.estado,
+                    "observacoes": s.observacoes,
+                    "serieId": s.id,
+                }
+            )
+    itens.sort(key=lambda c: (c["dia"], c["hora"]))
+    return itens
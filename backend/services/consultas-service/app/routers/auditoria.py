@@ -0,0 +1,39 @@
+# Rotas de consulta à trilha de auditoria do serviço de Consultas.
+#
+# Endpoints:
+# - GET /api/v1/auditoria?tabela=consultas&chave=42&limit=100
+#   → mudanças registradas, da mais recente à mais antiga; a próxima página
+#   usa `antes_de=<menor id recebido>`
+#
+# Os registros são gravados em segundo plano (ver `app/auditoria.py`): uma
+# mudança recém-confirmada aparece aqui em até `AUDITORIA_INTERVALO_S`.
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..auditoria import RegistroAuditoria
+from ..db import get_sessao
+from ..schemas import AuditoriaOut
+
+router = APIRouter(prefix="/api/v1", tags=["auditoria"])
+
+
+@router.get("/auditoria", response_model=list[AuditoriaOut])
+def listar_auditoria(
+    tabela: Optional[str] = Query(default=None, max_length=40),
+    chave: Optional[str] = Query(default=None, max_length=60),
+    antes_de: Optional[int] = Query(default=None, ge=1),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: Session = Depends(get_sessao),
+):
+    stmt = select(RegistroAuditoria).order_by(RegistroAuditoria.id.desc()).limit(limit)
+    if tabela is not None:
+        stmt = stmt.where(RegistroAuditoria.tabela == tabela)
+    if chave is not None:
+        stmt = stmt.where(RegistroAuditoria.chave == chave)
+    if antes_de is not None:
+        stmt = stmt.where(RegistroAuditoria.id < antes_de)
+    return db.scalars(stmt).all()
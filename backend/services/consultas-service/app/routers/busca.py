@@ -0,0 +1,29 @@
+# Rotas de busca textual do serviço de Consultas.
+#
+# Endpoints:
+# - GET /api/v1/busca?q=dor lombar&limit=20&offset=0 → consultas por relevância
+#
+# A busca usa a coluna tsvector `busca` (stemming em português) e seu índice
+# GIN; ver `app/busca.py`. Aceita a sintaxe websearch do Postgres: "frase
+# exata", OR e -exclusão.
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..busca import busca_disponivel, buscar_consultas
+from ..db import get_sessao
+from ..schemas import ConsultaBuscaOut
+
+router = APIRouter(prefix="/api/v1", tags=["busca"])
+
+
+@router.get("/busca", response_model=list[ConsultaBuscaOut])
+def buscar(
+    q: str = Query(min_length=2, max_length=200, description="Termos da busca"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_sessao),
+):
+    if not busca_disponivel(db):
+        raise HTTPException(status_code=501, detail="Busca textual requer PostgreSQL")
+    return buscar_consultas(db, q, limit, offset)
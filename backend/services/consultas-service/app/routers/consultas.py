@@ -2,26 +2,41 @@
 #
 # Endpoints:
 # - POST   /api/v1/pacientes/{cpf}/consultas  → cria consulta para um paciente
-# - GET    /api/v1/pacientes/{cpf}/consultas  → lista consultas por CPF
+# - GET    /api/v1/pacientes/{cpf}/consultas  → histórico do paciente, paginado por
+#   cursor: `?apos=dia,hora,id` (seguintes, em ordem cronológica) ou
+#   `?antes_de=dia,hora,id` (anteriores, da mais recente para a mais antiga)
+# - GET    /api/v1/pacientes/{cpf}/consultas/proxima → próxima consulta (404 se não houver)
 # - GET    /api/v1/consultas/{id}             → obtém consulta por ID
 # - PATCH  /api/v1/consultas/{id}             → atualização parcial
 # - DELETE /api/v1/consultas/{id}             → remoção
+# - GET    /api/v1/consultas?dia= | ?de=&ate= → agenda (inclui ocorrências de séries)
 #
 # Nota: este microsserviço é independente do serviço de pacientes. Não há
 # validação cross-service do CPF aqui. Em uma evolução, poderíamos chamar o
 # serviço de pacientes (via HTTP) para validar existência do CPF informado.
 
-from fastapi import APIRouter, Depends, HTTPException
+import heapq
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
+from ..campos import colunas_do_schema, selecionar_campos, projetar
 from ..db import get_sessao
+from ..escrita import transacao, inserir, atualizar
+from ..historico import cursor_ou_422, pagina_do_paciente, proxima_consulta
 from ..models import Consulta
+from ..recorrencia import expandir_series, janela_da_listagem
 from ..schemas import ConsultaIn, ConsultaOut, ConsultaAtualizar
 from ..validators import assert_cpf_or_422
 
 router = APIRouter(prefix="/api/v1", tags=["consultas"])
 
+# Campos selecionáveis via `?fields=` (nomes de saída de `ConsultaOut`).
+_CAMPOS_LISTAGEM = colunas_do_schema(ConsultaOut, Consulta)
+# Sempre lidos quando há janela, para intercalar com as ocorrências das séries.
+_CAMPOS_ORDEM = {"dia": Consulta.dia, "hora": Consulta.hora}
+
 
 def _get_consulta_or_404(db: Session, id: int) -> Consulta:
     c = db.get(Consulta, id)
@@ -37,22 +52,40 @@ def criar_consulta_para_paciente(cpf: str, payload: ConsultaIn, db: Session = De
     data = payload.model_dump(exclude_none=True)
     data["cpf_paciente"] = cpf
 
-    c = Consulta(**data)
-    db.add(c)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao criar consulta")
-    db.refresh(c)
+    with transacao(db, detail="Violação de integridade ao criar consulta"):
+        c = inserir(db, Consulta, data)
     return c
 
 
 @router.get("/pacientes/{cpf}/consultas", response_model=list[ConsultaOut])
-def listar_consultas_por_paciente(cpf: str, db: Session = Depends(get_sessao)):
+def listar_consultas_por_paciente(
+    cpf: str,
+    apos: str | None = Query(default=None, description="Cursor `dia,hora,id`: consultas seguintes"),
+    antes_de: str | None = Query(default=None, description="Cursor `dia,hora,id`: consultas anteriores"),
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_sessao),
+):
     assert_cpf_or_422(cpf)
-    # Lista todas as consultas vinculadas ao CPF informado.
-    return db.query(Consulta).filter(Consulta.cpf_paciente == cpf).all()
+    if apos is not None and antes_de is not None:
+        raise HTTPException(status_code=422, detail="Use `apos` ou `antes_de`, não ambos")
+    # Paginação por cursor no índice (cpf_paciente, dia, hora, id): custo independe da página.
+    return pagina_do_paciente(
+        db,
+        cpf,
+        cursor_ou_422(apos, "apos") if apos is not None else None,
+        cursor_ou_422(antes_de, "antes_de") if antes_de is not None else None,
+        limit,
+    )
+
+
+@router.get("/pacientes/{cpf}/consultas/proxima", response_model=ConsultaOut)
+def obter_proxima_consulta(cpf: str, db: Session = Depends(get_sessao)):
+    assert_cpf_or_422(cpf)
+    # Inclui as ocorrências de séries (com `id` nulo e `serieId`).
+    c = proxima_consulta(db, cpf)
+    if c is None:
+        raise HTTPException(status_code=404, detail="Nenhuma consulta agendada")
+    return c
 
 
 @router.get("/consultas/{id}", response_model=ConsultaOut)
@@ -62,20 +95,14 @@ def obter_consulta(id: int, db: Session = Depends(get_sessao)):
 
 @router.patch("/consultas/{id}", response_model=ConsultaOut)
 def atualizar_consulta(id: int, payload: ConsultaAtualizar, db: Session = Depends(get_sessao)):
-    c = _get_consulta_or_404(db, id)
     data = payload.model_dump(exclude_unset=True)
     if not data:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
 
-    for k, v in data.items():
-        setattr(c, k, v)
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao atualizar consulta")
-    db.refresh(c)
+    with transacao(db, detail="Violação de integridade ao atualizar consulta"):
+        c = atualizar(db, Consulta, id, data)
+    if c is None:
+        raise HTTPException(status_code=404, detail="Consulta não encontrada")
     return c
 
 
@@ -88,13 +115,50 @@ def remover_consulta(id: int, db: Session = Depends(get_sessao)):
 
 
 @router.get("/consultas", response_model=list[ConsultaOut])
-def listar_consultas(dia: str | None = None, db: Session = Depends(get_sessao)):
+def listar_consultas(
+    dia: str | None = None,
+    de: str | None = Query(default=None, description="Início da janela (YYYY-MM-DD), com `ate`"),
+    ate: str | None = Query(default=None, description="Fim da janela (YYYY-MM-DD), inclusive"),
+    limit: int | None = Query(default=None, ge=1, le=10000),
+    fields: str | None = Query(
+        default=None, description="Campos a retornar, separados por vírgula (ex.: id,hora,cpfPaciente)"
+    ),
+    db: Session = Depends(get_sessao),
+):
     """Lista consultas.
 
-    - Se `dia` for informado (YYYY-MM-DD), filtra por esse dia.
-    - Caso contrário, retorna todas as consultas (sem paginação – uso controlado).
+    - Se `dia` (YYYY-MM-DD) ou a janela `de`/`ate` for informada, filtra por
+      ela e inclui as ocorrências de séries recorrentes (ordenado por dia/hora).
+    - Caso contrário, retorna todas as consultas (use `limit` para limitar).
+    - `fields` restringe as colunas lidas e os campos da resposta.
     """
-    q = db.query(Consulta)
-    if dia:
-        q = q.filter(Consulta.dia == dia)
-    return q.all()
+    campos = selecionar_campos(fields, _CAMPOS_LISTAGEM)
+    janela = janela_da_listagem(dia, de, ate)
+    colunas = campos or _CAMPOS_LISTAGEM
+    if janela:
+        colunas = {**colunas, **_CAMPOS_ORDEM}
+    stmt = projetar(colunas)
+    if janela:
+        inicio, fim = (d.isoformat() for d in janela)
+        stmt = stmt.where(Consulta.dia.between(inicio, fim)).order_by(
+            Consulta.dia, Consulta.hora, Consulta.id
+        )
+    if limit:
+        stmt = stmt.limit(limit)
+    linhas = db.execute(stmt).all()
+
+    if janela:
+        itens = list(
+            heapq.merge(
+                (dict(linha._mapping) for linha in linhas),
+                expandir_series(db, *janela),
+                key=lambda c: (c["dia"], c["hora"]),
+            )
+        )[:limit]
+        if campos:
+            return JSONResponse([{n: c[n] for n in campos} for c in itens])
+        return itens
+    if campos:
+        # Saída parcial: dispensa o `response_model` (que exigiria todos os campos).
+        return JSONResponse([dict(linha._mapping) for linha in linhas])
+    return linhas
@@ -0,0 +1,69 @@
+# Stream de eventos da agenda (Server-Sent Events).
+#
+# Endpoints:
+# - GET /api/v1/consultas/eventos?dia=YYYY-MM-DD → `text/event-stream` com as
+#   consultas criadas/alteradas/removidas no dia (ver `app/eventos.py`)
+#
+# A conexão fica aberta: não usa sessão do banco nem vaga do controle de
+# admissão (ver `ROTAS_ISENTAS` em `app/admissao.py`). Com multi-clínica, a
+# clínica vem de `X-Clinica` ou de `?clinica=` (o EventSource do navegador não
+# envia cabeçalhos).
+
+import asyncio
+import time
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..db import clinica_do_request
+from ..eventos import DURACAO_MAX_S, PING_S, Assinatura, corretor
+
+router = APIRouter(prefix="/api/v1", tags=["eventos"])
+
+# Pausa sugerida ao navegador antes de reconectar (campo `retry:` do SSE).
+RETRY_MS = 3000
+
+
+async def _stream(request: Request, a: Assinatura):
+    fim = time.monotonic() + DURACAO_MAX_S
+    try:
+        yield f"retry: {RETRY_MS}\nevent: pronto\ndata: {{\"dia\": \"{a.dia}\"}}\n\n".encode()
+        while not await request.is_disconnected():
+            restante = fim - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                yield await asyncio.wait_for(a.fila.get(), timeout=min(PING_S, restante))
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"  # mantém proxies e balanceadores com a conexão viva
+    finally:
+        corretor.cancelar(a)
+
+
+@router.get("/consultas/eventos")
+async def eventos_da_agenda(request: Request, dia: str):
+    try:
+        dia = date.fromisoformat(dia).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="`dia` deve seguir o formato YYYY-MM-DD")
+
+    clinica = clinica_do_request(request)
+    a = corretor.assinar(dia, clinica)
+    if a is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Limite de conexões de eventos atingido",
+            headers={"Retry-After": str(RETRY_MS // 1000)},
+        )
+    # Eventos anteriores ao LISTEN ativo se perderiam sem aviso.
+    if not await run_in_threadpool(corretor.aguardar_escuta, 5.0, clinica):
+        corretor.cancelar(a)
+        raise HTTPException(status_code=503, detail="Eventos indisponíveis no momento")
+
+    return StreamingResponse(
+        _stream(request, a),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
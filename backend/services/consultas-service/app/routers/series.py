@@ -0,0 +1,151 @@
+# Rotas HTTP para séries de consultas recorrentes.
+#
+# Endpoints:
+# - POST   /api/v1/pacientes/{cpf}/series               → cria série para um paciente
+# - GET    /api/v1/pacientes/{cpf}/series               → lista séries por CPF
+# - GET    /api/v1/series/{id}                          → obtém série por ID
+# - PATCH  /api/v1/series/{id}                          → atualização parcial (ex.: `fim`)
+# - DELETE /api/v1/series/{id}                          → remove série (consultas editadas ficam)
+# - PATCH  /api/v1/series/{id}/ocorrencias/{dia}        → edita (materializa) uma ocorrência
+# - DELETE /api/v1/series/{id}/ocorrencias/{dia}        → cancela uma ocorrência
+#
+# As ocorrências aparecem em `GET /api/v1/consultas?dia=` / `?de=&ate=` sem
+# serem gravadas; ver `app/recorrencia.py`.
+
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..db import get_sessao
+from ..escrita import transacao, inserir, atualizar
+from ..models import Consulta, ExcecaoSerie, SerieConsulta
+from ..recorrencia import ocorre_em
+from ..schemas import ConsultaAtualizar, ConsultaOut, SerieAtualizar, SerieIn, SerieOut
+from ..validators import assert_cpf_or_422
+
+router = APIRouter(prefix="/api/v1", tags=["series"])
+
+
+def _get_serie_or_404(db: Session, id: int) -> SerieConsulta:
+    s = db.get(SerieConsulta, id)
+    if not s:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+    return s
+
+
+def _ocorrencia_or_404(serie: SerieConsulta, dia: str) -> str:
+    """Normaliza `dia` e garante que é uma data gerada pela regra da série."""
+    try:
+        d = date.fromisoformat(dia)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="`dia` deve seguir o formato YYYY-MM-DD")
+    if not ocorre_em(serie, d):
+        raise HTTPException(status_code=404, detail="Ocorrência não encontrada nesta série")
+    return d.isoformat()
+
+
+@router.post("/pacientes/{cpf}/series", response_model=SerieOut, status_code=201)
+def criar_serie_para_paciente(cpf: str, payload: SerieIn, db: Session = Depends(get_sessao)):
+    assert_cpf_or_422(cpf)
+    data = payload.model_dump(exclude_none=True)
+    data["cpf_paciente"] = cpf
+
+    with transacao(db, detail="Violação de integridade ao criar série"):
+        s = inserir(db, SerieConsulta, data)
+    return s
+
+
+@router.get("/pacientes/{cpf}/series", response_model=list[SerieOut])
+def listar_series_por_paciente(cpf: str, db: Session = Depends(get_sessao)):
+    assert_cpf_or_422(cpf)
+    return db.query(SerieConsulta).filter(SerieConsulta.cpf_paciente == cpf).all()
+
+
+@router.get("/series/{id}", response_model=SerieOut)
+def obter_serie(id: int, db: Session = Depends(get_sessao)):
+    return _get_serie_or_404(db, id)
+
+
+@router.patch("/series/{id}", response_model=SerieOut)
+def atualizar_serie(id: int, payload: SerieAtualizar, db: Session = Depends(get_sessao)):
+    data = payload.model_dump(exclude_unset=True)
+    if not data:
+        raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
+    if data.get("fim") is not None:
+        # Só a coluna: a instância voltaria do identity map sem o UPDATE abaixo.
+        inicio = db.scalar(select(SerieConsulta.inicio).where(SerieConsulta.id == id))
+        if inicio is None:
+            raise HTTPException(status_code=404, detail="Série não encontrada")
+        if data["fim"] < inicio:
+            raise HTTPException(status_code=422, detail="`fim` deve ser igual ou posterior a `inicio`")
+
+    with transacao(db, detail="Violação de integridade ao atualizar série"):
+        s = atualizar(db, SerieConsulta, id, data)
+    if s is None:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+    return s
+
+
+@router.delete("/series/{id}", status_code=204)
+def remover_serie(id: int, db: Session = Depends(get_sessao)):
+    # Exceções saem em cascata; consultas já materializadas perdem só o vínculo.
+    removidas = db.execute(delete(SerieConsulta).where(SerieConsulta.id == id)).rowcount
+    db.commit()
+    if not removidas:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+    return
+
+
+@router.patch("/series/{id}/ocorrencias/{dia}", response_model=ConsultaOut)
+def editar_ocorrencia(id: int, dia: str, payload: ConsultaAtualizar, db: Session = Depends(get_sessao)):
+    """Edita uma ocorrência; na primeira edição ela vira uma consulta própria."""
+    data = payload.model_dump(exclude_unset=True)
+    data.pop("cpf_paciente", None)  # a ocorrência é sempre do paciente da série
+    if not data:
+        raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
+    serie = _get_serie_or_404(db, id)
+    dia = _ocorrencia_or_404(serie, dia)
+
+    excecao = db.get(ExcecaoSerie, (id, dia))
+    if excecao is not None:
+        if excecao.consulta_id is None:
+            raise HTTPException(status_code=404, detail="Ocorrência cancelada")
+        with transacao(db, detail="Violação de integridade ao atualizar consulta"):
+            c = atualizar(db, Consulta, excecao.consulta_id, data)
+        if c is None:  # consulta removida ou arquivada: a ocorrência saiu da agenda
+            raise HTTPException(status_code=404, detail="Ocorrência cancelada")
+        return c
+
+    valores = {
+        "cpf_paciente": serie.cpf_paciente,
+        "dia": dia,
+        "hora": serie.hora,
+        "descricao": serie.descricao,
+        "estado": serie.estado,
+        "observacoes": serie.observacoes,
+        "serie_id": serie.id,
+        **data,
+    }
+    # A PK (serie_id, dia) da exceção barra duas materializações concorrentes.
+    with transacao(db, detail="Ocorrência já editada por outra requisição; tente novamente"):
+        c = inserir(db, Consulta, valores)
+        inserir(db, ExcecaoSerie, {"serie_id": serie.id, "dia": dia, "consulta_id": c.id})
+    return c
+
+
+@router.delete("/series/{id}/ocorrencias/{dia}", status_code=204)
+def cancelar_ocorrencia(id: int, dia: str, db: Session = Depends(get_sessao)):
+    serie = _get_serie_or_404(db, id)
+    dia = _ocorrencia_or_404(serie, dia)
+
+    excecao = db.get(ExcecaoSerie, (id, dia))
+    with transacao(db, detail="Ocorrência alterada por outra requisição; tente novamente"):
+        if excecao is None:
+            inserir(db, ExcecaoSerie, {"serie_id": serie.id, "dia": dia})
+        elif excecao.consulta_id is not None:
+            consulta_id, excecao.consulta_id = excecao.consulta_id, None
+            db.flush()
+            db.execute(delete(Consulta).where(Consulta.id == consulta_id))
+    return
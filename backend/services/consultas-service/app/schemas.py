@@ -11,10 +11,42 @@
 # e retornamos no formato de alias por padrão nas responses.
 
 from __future__ import annotations
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Optional
+import json
+import re
+from datetime import date, datetime
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from typing import Any, Dict, Literal, Optional
 from .validators import validar_cpf_formato
 
+# `9:00`, `09:00` ou `09:00:00` → `09:00` (segundos descartados).
+_HORA = re.compile(r"^(?P<h>\d{1,2}):(?P<m>\d{2})(:\d{2})?$")
+
+
+# `dia`/`hora` são texto no banco e o histórico por paciente (ver
+# `app/historico.py`) ordena e pagina por eles como texto: só a forma canônica
+# (`YYYY-MM-DD`, `HH:MM`) ordena como data/hora.
+def _valida_dia(v: str | None) -> str | None:
+    if v is None:
+        return v
+    try:
+        return date.fromisoformat(v).isoformat()
+    except ValueError:
+        pass
+    try:
+        # Aceita também dia/mês sem zero à esquerda (`2030-1-6`).
+        return datetime.strptime(v, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError("Data deve seguir o formato YYYY-MM-DD")
+
+
+def _valida_hora(v: str | None) -> str | None:
+    if v is None:
+        return v
+    m = _HORA.match(v)
+    if m is None or int(m["h"]) > 23 or int(m["m"]) > 59:
+        raise ValueError("Hora deve seguir o formato HH:MM")
+    return f"{int(m['h']):02d}:{m['m']}"
+
 
 class ConsultaIn(BaseModel):
     # Dados necessários para criar uma consulta
@@ -34,6 +66,16 @@ class ConsultaIn(BaseModel):
     def _valida_cpf(cls, v: str) -> str:
         return validar_cpf_formato(v)
 
+    @field_validator("dia")
+    @classmethod
+    def _normaliza_dia(cls, v: str) -> str:
+        return _valida_dia(v)
+
+    @field_validator("hora")
+    @classmethod
+    def _normaliza_hora(cls, v: str) -> str:
+        return _valida_hora(v)
+
 
 class ConsultaAtualizar(BaseModel):
     # Atualização parcial de uma consulta existente. Envie apenas campos a alterar.
@@ -55,16 +97,162 @@ class ConsultaAtualizar(BaseModel):
             return v
         return validar_cpf_formato(v)
 
+    @field_validator("dia")
+    @classmethod
+    def _normaliza_dia(cls, v: str | None) -> str | None:
+        return _valida_dia(v)
+
+    @field_validator("hora")
+    @classmethod
+    def _normaliza_hora(cls, v: str | None) -> str | None:
+        return _valida_hora(v)
+
 
 class ConsultaOut(BaseModel):
     # Representação de saída de uma consulta.
     # `from_attributes=True` permite retornar instâncias SQLAlchemy diretamente.
+    # Ocorrências de séries ainda não materializadas vêm com `id` nulo e
+    # `serieId` preenchido (edite-as via `/series/{id}/ocorrencias/{dia}`).
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
-    id: int
+    id: Optional[int]
     cpf_paciente: str = Field(alias="cpfPaciente")
     dia: str
     hora: str
     descricao: str
     estado: Optional[str] = None
     observacoes: Optional[str] = None
+    serie_id: Optional[int] = Field(default=None, alias="serieId")
+
+
+class SerieIn(BaseModel):
+    # Criação de uma série recorrente. A primeira ocorrência é `inicio`; as
+    # seguintes a cada `intervalo` dias/semanas/meses, até `fim` (se houver).
+    model_config = ConfigDict(populate_by_name=True)
+
+    frequencia: Literal["diaria", "semanal", "mensal"]
+    intervalo: int = Field(default=1, ge=1, le=52)
+    inicio: str = Field(description="Primeira ocorrência (YYYY-MM-DD)")
+    fim: Optional[str] = Field(default=None, description="Última data possível (YYYY-MM-DD)")
+    hora: str = Field(min_length=4, max_length=8, description="Hora das consultas (HH:MM)")
+    descricao: str = Field(min_length=1, max_length=255)
+    estado: Optional[str] = Field(default=None, max_length=40)
+    observacoes: Optional[str] = Field(default=None, max_length=255)
+
+    @field_validator("inicio", "fim")
+    @classmethod
+    def _valida_datas(cls, v: str | None) -> str | None:
+        return _valida_dia(v)
+
+    @field_validator("hora")
+    @classmethod
+    def _normaliza_hora(cls, v: str) -> str:
+        return _valida_hora(v)
+
+    @model_validator(mode="after")
+    def _fim_apos_inicio(self) -> "SerieIn":
+        if self.fim is not None and self.fim < self.inicio:
+            raise ValueError("`fim` deve ser igual ou posterior a `inicio`")
+        return self
+
+
+class SerieAtualizar(BaseModel):
+    # Atualização parcial de uma série. A regra (frequência/intervalo/início)
+    # não muda, para não deslocar exceções já registradas; use `fim` para
+    # encerrar a série e crie outra para um novo padrão.
+    model_config = ConfigDict(populate_by_name=True)
+
+    fim: Optional[str] = None
+    hora: Optional[str] = Field(default=None, min_length=4, max_length=8)
+    descricao: Optional[str] = Field(default=None, min_length=1, max_length=255)
+    estado: Optional[str] = Field(default=None, max_length=40)
+    observacoes: Optional[str] = Field(default=None, max_length=255)
+
+    @field_validator("fim")
+    @classmethod
+    def _valida_fim(cls, v: str | None) -> str | None:
+        return _valida_dia(v)
+
+    @field_validator("hora")
+    @classmethod
+    def _normaliza_hora(cls, v: str | None) -> str | None:
+        return _valida_hora(v)
+
+
+class SerieOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: int
+    cpf_paciente: str = Field(alias="cpfPaciente")
+    frequencia: str
+    intervalo: int
+    inicio: str
+    fim: Optional[str] = None
+    hora: str
+    descricao: str
+    estado: Optional[str] = None
+    observacoes: Optional[str] = None
+
+
+class ConsultaBuscaOut(BaseModel):
+    # Resultado da busca textual: dados básicos da consulta, relevância e trecho
+    # com os termos encontrados marcados (<mark>…</mark>).
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: int
+    cpf_paciente: str = Field(alias="cpfPaciente")
+    dia: str
+    hora: str
+    descricao: str
+    rank: float
+    trecho: str
+
+
+# ========== JOBS ==========
+class JobIn(BaseModel):
+    # Submissão de um job em segundo plano; `parametros` depende do `tipo`
+    # (ver `app/tarefas.py`).
+    tipo: str = Field(min_length=1, max_length=40)
+    parametros: Dict[str, Any] = Field(default_factory=dict)
+
+
+class JobOut(BaseModel):
+    # Estado de um job: pendente → executando → concluido | falhou | cancelado.
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    tipo: str
+    estado: str
+    processados: int
+    total: Optional[int] = None
+    resultado: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+    cancelamento_solicitado: bool
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    @field_validator("resultado", mode="before")
+    @classmethod
+    def _resultado_json(cls, v: Any) -> Any:
+        return json.loads(v) if isinstance(v, str) else v
+
+
+# ========== AUDITORIA ==========
+class AuditoriaOut(BaseModel):
+    # Uma mudança registrada: operação I/U/D e valores antes/depois (num
+    # UPDATE, só as colunas alteradas).
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    ocorrido_em: datetime
+    tabela: str
+    chave: Optional[str] = None
+    operacao: str
+    antes: Optional[Dict[str, Any]] = None
+    depois: Optional[Dict[str, Any]] = None
+    autor: Optional[str] = None
+    origem: Optional[str] = None
+
+    @field_validator("antes", "depois", mode="before")
+    @classmethod
+    def _valores_json(cls, v: Any) -> Any:
+        return json.loads(v) if isinstance(v, str) else v
@@ -0,0 +1,107 @@
+"""Tipos de job do serviço de Consultas (ver `app/jobs.py`).
+
+- `exportacao`: exportação analítica incremental em Parquet (`app/exportacao.py`)
+  para um subdiretório de `JOBS_EXPORTACAO_DIR` (com multi-clínica, de
+  `JOBS_EXPORTACAO_DIR/<clínica>`).
+- `remocao_em_massa`: remove as consultas de um período (opcionalmente de um
+  só paciente) em lotes curtos, sem segurar locks por toda a operação.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+from sqlalchemy import delete, func, select
+
+from .db import SessionLocal
+from .exportacao import exportar
+from .jobs import ContextoJob, tarefa
+from .models import Consulta
+from .validators import validar_cpf_formato
+
+EXPORTACAO_DIR = os.getenv("JOBS_EXPORTACAO_DIR", "/tmp/exportacoes")
+REMOCAO_LOTE = 1000
+
+
+class ExportacaoParams(BaseModel):
+    # Subdiretório (um nome simples, sem `.` inicial: nem `.`, nem `..`) de
+    # JOBS_EXPORTACAO_DIR; execuções para o mesmo destino continuam de onde a
+    # anterior parou.
+    destino: str = Field(default="analitico", pattern=r"^[\w-][\w.-]*$", max_length=100)
+    lote: int = Field(default=50_000, ge=100, le=1_000_000)
+    atraso_s: int = Field(default=60, ge=0)
+
+
+class RemocaoParams(BaseModel):
+    # Intervalo fechado de dias (YYYY-MM-DD).
+    de: date
+    ate: date
+    cpf_paciente: Optional[str] = Field(default=None, min_length=11, max_length=14)
+
+    @field_validator("cpf_paciente")
+    @classmethod
+    def _cpf(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        return validar_cpf_formato(v)
+
+    @model_validator(mode="after")
+    def _intervalo(self) -> "RemocaoParams":
+        if self.ate < self.de:
+            raise ValueError("`ate` deve ser igual ou posterior a `de`")
+        return self
+
+
+def _diretorio_exportacao(clinica: str | None, nome: str) -> str:
+    """Diretório do destino `nome`, que precisa ficar dentro do da clínica."""
+    base = os.path.realpath(os.path.join(EXPORTACAO_DIR, clinica or ""))
+    destino = os.path.realpath(os.path.join(base, nome))
+    if os.path.commonpath([base, destino]) != base or destino == base:
+        raise ValueError(f"Destino fora do diretório de exportação: {nome!r}")
+    return destino
+
+
+@tarefa("exportacao", ExportacaoParams)
+def exportar_em_segundo_plano(ctx: ContextoJob, params: ExportacaoParams) -> dict:
+    exportadas = 0
+
+    def _lote(n: int) -> None:
+        nonlocal exportadas
+        exportadas += n
+        ctx.progresso(exportadas)  # cancelamento: a marca d'água já está salva
+
+    destino = _diretorio_exportacao(ctx.clinica, params.destino)
+    # Sem clínica, `exportar` lê de uma réplica (se houver).
+    eng = ctx.engine if ctx.clinica is not None else None
+    por_tabela = exportar(destino, params.lote, params.atraso_s, eng, ao_gravar_lote=_lote)
+    ctx.progresso(exportadas, exportadas, forcar=True)
+    return {"destino": destino, "exportadas": por_tabela}
+
+
+@tarefa("remocao_em_massa", RemocaoParams)
+def remover_consultas(ctx: ContextoJob, params: RemocaoParams) -> dict:
+    filtro = [Consulta.dia >= params.de.isoformat(), Consulta.dia <= params.ate.isoformat()]
+    if params.cpf_paciente:
+        filtro.append(Consulta.cpf_paciente == params.cpf_paciente)
+
+    removidas = 0
+    db = SessionLocal(bind=ctx.engine, info={"origem": f"job {ctx.job_id}", "clinica": ctx.clinica})
+    try:
+        total = db.scalar(select(func.count()).select_from(Consulta).where(*filtro))
+        ctx.progresso(0, total, forcar=True)
+        while True:
+            # Um lote por transação; o cancelamento entre lotes deixa o que já
+            # saiu removido e o restante intacto.
+            ids = db.scalars(select(Consulta.id).where(*filtro).order_by(Consulta.id).limit(REMOCAO_LOTE)).all()
+            if not ids:
+                break
+            removidas += db.execute(delete(Consulta).where(Consulta.id.in_(ids))).rowcount
+            db.commit()
+            ctx.progresso(removidas, max(total, removidas))
+    finally:
+        db.close()
+    ctx.progresso(removidas, max(total, removidas), forcar=True)
+    return {"removidas": removidas}
@@ -0,0 +1,97 @@
+# Controle de admissão (`app/admissao.py`).
+
+import asyncio
+import threading
+
+import pytest
+
+from app import admissao
+from app.admissao import ClasseAdmissao, classificar
+from app.db import SHARD_PRINCIPAL
+from app.routers import consultas as rotas
+
+
+@pytest.mark.parametrize(
+    "metodo, caminho, classe",
+    [
+        ("POST", "/api/v1/pacientes/x/consultas", "escrita"),
+        ("DELETE", "/api/v1/series/1", "escrita"),
+        ("GET", "/api/v1/consultas/busca/", "busca"),
+        ("GET", "/api/v1/consultas/1", "leitura"),
+        ("HEAD", "/api/v1/consultas", "leitura"),
+    ],
+)
+def test_classificar(metodo, caminho, classe):
+    assert classificar(metodo, caminho) == classe
+
+
+def test_fila_cheia_e_espera_estourada_sao_rejeitadas():
+    async def cenario():
+        classe = ClasseAdmissao("escrita", limite=1, fila_max=1, espera_max_s=0.05)
+        assert await classe.entrar()
+        espera = asyncio.create_task(classe.entrar())  # vai para a fila
+        await asyncio.sleep(0)
+        assert await classe.entrar() is False  # fila cheia
+        assert await espera is False  # ninguém saiu a tempo
+        return classe.metricas()
+
+    m = asyncio.run(cenario())
+    assert (m["admitidos"], m["rejeitados_fila_cheia"], m["rejeitados_espera"]) == (1, 1, 1)
+    assert (m["em_execucao"], m["na_fila"]) == (1, 0)
+
+
+def test_fila_e_atendida_quando_uma_vaga_libera():
+    async def cenario():
+        classe = ClasseAdmissao("leitura", limite=1, fila_max=4, espera_max_s=1.0)
+        assert await classe.entrar()
+        espera = asyncio.create_task(classe.entrar())
+        await asyncio.sleep(0)
+        assert classe.na_fila == 1
+        await classe.sair()
+        assert await espera is True
+        return classe.metricas()
+
+    m = asyncio.run(cenario())
+    assert (m["admitidos"], m["em_execucao"], m["na_fila"]) == (2, 1, 0)
+
+
+def test_teto_por_clinica_nao_bloqueia_as_outras():
+    async def cenario():
+        classe = ClasseAdmissao("escrita", limite=2, fila_max=0, espera_max_s=0.05, limite_clinica=1)
+        assert await classe.entrar("norte")
+        assert await classe.entrar("norte") is False
+        assert await classe.entrar("sul") is True
+
+    asyncio.run(cenario())
+
+
+def test_503_com_retry_after_e_contadores(cliente, novo_cpf, monkeypatch):
+    escrita = ClasseAdmissao("escrita", limite=1, fila_max=0, espera_max_s=0.05)
+    monkeypatch.setitem(admissao.CLASSES[SHARD_PRINCIPAL], "escrita", escrita)
+    entrou, liberar = threading.Event(), threading.Event()
+    inserir = rotas.inserir
+
+    def inserir_devagar(*args, **kwargs):
+        entrou.set()
+        liberar.wait(5)
+        return inserir(*args, **kwargs)
+
+    monkeypatch.setattr(rotas, "inserir", inserir_devagar)
+    cpf = novo_cpf()
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+    payload = {"cpfPaciente": cpf, "dia": "2030-06-01", "hora": "09:00", "descricao": "Pico"}
+    primeira = threading.Thread(target=cliente.post, args=(url,), kwargs={"json": payload})
+    primeira.start()
+    try:
+        assert entrou.wait(5)
+        r = cliente.post(url, json=payload)
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == str(admissao.RETRY_AFTER_S)
+        # Leituras têm a sua própria classe e seguem atendidas.
+        assert cliente.get(url).status_code == 200
+    finally:
+        liberar.set()
+        primeira.join(5)
+
+    m = cliente.get("/metrics/admissao").json()[SHARD_PRINCIPAL]["escrita"]
+    assert (m["admitidos"], m["rejeitados_fila_cheia"], m["em_execucao"]) == (1, 1, 0)
@@ -0,0 +1,52 @@
+# Conteúdo dos registros da trilha de auditoria (`app/auditoria.py`).
+#
+# A gravação fica parada nos testes (ver `conftest.py`): os registros
+# confirmados ficam no buffer do gravador, lidos aqui diretamente.
+
+import json
+
+import pytest
+
+from app.auditoria import gravador
+
+
+@pytest.fixture
+def auditoria():
+    """`auditoria()` → registros publicados desde o início do teste."""
+    buffer = gravador.da_clinica(None)._itens
+    inicio = len(buffer)
+    return lambda: list(buffer)[inicio:]
+
+
+def _json(valor):
+    return json.loads(valor) if valor is not None else None
+
+
+def test_update_registra_antes_e_depois(cliente, auditoria, novo_cpf):
+    cpf = novo_cpf()
+    payload = {"cpfPaciente": cpf, "dia": "2030-05-05", "hora": "09:00", "descricao": "Retorno"}
+    consulta = cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload).json()
+
+    r = cliente.patch(f"/api/v1/consultas/{consulta['id']}", json={"hora": "10:15", "descricao": "Retorno"})
+    assert r.status_code == 200, r.text
+
+    [registro] = [r for r in auditoria() if r["operacao"] == "U"]
+    assert (registro["tabela"], registro["chave"]) == ("consultas", str(consulta["id"]))
+    assert _json(registro["antes"]) == {"hora": "09:00"}
+    assert _json(registro["depois"]) == {"hora": "10:15"}
+
+
+def test_delete_em_sql_registra_a_linha_removida(cliente, auditoria, novo_cpf):
+    cpf = novo_cpf()
+    payload = {"frequencia": "semanal", "inicio": "2030-01-07", "hora": "08:00", "descricao": "Pilates"}
+    serie = cliente.post(f"/api/v1/pacientes/{cpf}/series", json=payload).json()
+
+    assert cliente.delete(f"/api/v1/series/{serie['id']}").status_code == 204
+    [registro] = [r for r in auditoria() if r["operacao"] == "D"]
+    assert registro["tabela"] == "series_consultas"
+    antes = _json(registro["antes"])
+    assert (antes["id"], antes["cpf_paciente"], antes["hora"]) == (serie["id"], cpf, "08:00")
+    assert registro["depois"] is None
+
+    # `rowcount` do DELETE segue valendo para quem o consulta (404).
+    assert cliente.delete(f"/api/v1/series/{serie['id']}").status_code == 404
@@ -0,0 +1,56 @@
+# Busca textual (`app/busca.py`). A busca é do Postgres: no SQLite só a
+# resposta 501 é verificada (rode com `TESTES_DATABASE_URL` para o resto).
+
+import pytest
+
+from app.db import engine
+
+postgres = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="busca textual requer PostgreSQL")
+
+
+@pytest.mark.skipif(engine.dialect.name == "postgresql", reason="só fora do PostgreSQL")
+def test_sem_postgres_responde_501(cliente):
+    assert cliente.get("/api/v1/busca", params={"q": "dor"}).status_code == 501
+
+
+@pytest.fixture(scope="module")
+def consultas(cliente):
+    cpf = "900.700.001-00"
+    textos = {
+        "descricao": ("Avaliação de escoliose torácica", "Retorno"),
+        "observacoes": ("Acompanhar", "Relata escoliose leve; solicitar radiografia"),
+        "nenhuma": ("Consulta de rotina", "Sem queixas"),
+    }
+    ids = {}
+    for chave, (descricao, observacoes) in textos.items():
+        payload = {"cpfPaciente": cpf, "dia": "2033-01-10", "hora": "09:00"}
+        payload.update(descricao=descricao, observacoes=observacoes)
+        ids[chave] = cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload).json()["id"]
+    return ids
+
+
+@postgres
+def test_stemming_e_peso_da_descricao(cliente, consultas):
+    # "escolioses" casa com "escoliose"; a descrição (peso A) vem antes das observações (B).
+    r = cliente.get("/api/v1/busca", params={"q": "escolioses"})
+    assert r.status_code == 200, r.text
+    achados = [c["id"] for c in r.json()]
+    assert achados[:2] == [consultas["descricao"], consultas["observacoes"]]
+    assert consultas["nenhuma"] not in achados
+    assert "<mark>escoliose</mark>" in r.json()[0]["trecho"]
+
+
+@postgres
+def test_sintaxe_websearch_e_paginacao(cliente, consultas):
+    achados = [c["id"] for c in cliente.get("/api/v1/busca", params={"q": "escoliose -radiografia"}).json()]
+    assert consultas["descricao"] in achados and consultas["observacoes"] not in achados
+
+    pagina = cliente.get("/api/v1/busca", params={"q": "escoliose", "limit": 1, "offset": 1}).json()
+    assert [c["id"] for c in pagina] == [consultas["observacoes"]]
+
+
+@postgres
+def test_edicao_atualiza_o_indice(cliente, consultas):
+    cliente.patch(f"/api/v1/consultas/{consultas['nenhuma']}", json={"observacoes": "Cefaleia tensional"})
+    achados = [c["id"] for c in cliente.get("/api/v1/busca", params={"q": "cefaleia"}).json()]
+    assert achados == [consultas["nenhuma"]]
@@ -0,0 +1,42 @@
+# `?fields=` nas listagens (`app/campos.py`).
+
+import pytest
+
+
+@pytest.fixture
+def agenda(cliente, novo_cpf):
+    """Um dia com uma consulta avulsa e uma ocorrência de série."""
+    cpf = novo_cpf()
+    dia = "2032-02-10"
+    payload = {"cpfPaciente": cpf, "dia": dia, "hora": "11:00", "descricao": "Avulsa", "observacoes": "x" * 50}
+    assert cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload).status_code == 201
+    serie = {"frequencia": "diaria", "inicio": dia, "fim": dia, "hora": "08:00", "descricao": "Da série"}
+    assert cliente.post(f"/api/v1/pacientes/{cpf}/series", json=serie).status_code == 201
+    return cpf, dia
+
+
+def test_fields_projeta_a_resposta_e_o_sql(cliente, comandos, agenda):
+    cpf, dia = agenda
+    with comandos() as sql:
+        r = cliente.get("/api/v1/consultas", params={"dia": dia, "fields": "hora,cpfPaciente,hora"})
+    assert r.status_code == 200, r.text
+    itens = [c for c in r.json() if c["cpfPaciente"] == cpf]
+    # Duplicados ignorados; ocorrências da série também projetadas.
+    assert itens == [{"hora": "08:00", "cpfPaciente": cpf}, {"hora": "11:00", "cpfPaciente": cpf}]
+    # Só as colunas pedidas (mais as da ordenação da janela) são lidas.
+    consulta = next(s for s in sql if "FROM consultas" in s)
+    assert "observacoes" not in consulta and "descricao" not in consulta
+
+
+def test_sem_fields_devolve_o_schema_completo(cliente, agenda):
+    cpf, dia = agenda
+    itens = [c for c in cliente.get("/api/v1/consultas", params={"dia": dia}).json() if c["cpfPaciente"] == cpf]
+    assert {"id", "dia", "hora", "descricao", "serieId"} <= set(itens[0])
+    assert itens[0]["id"] is None and itens[1]["id"] is not None
+
+
+@pytest.mark.parametrize("fields", ["hora,senha", ",", "cpf_paciente"])
+def test_fields_invalidos(cliente, fields):
+    r = cliente.get("/api/v1/consultas", params={"fields": fields})
+    assert r.status_code == 422
+    assert "Permitidos" in r.json()["detail"]
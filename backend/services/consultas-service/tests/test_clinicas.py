@@ -0,0 +1,111 @@
+# Multi-clínica (`app/db.py`): roteamento de cada request para o banco da
+# clínica.
+#
+# `CLINICAS` é lida no import de `app`, e a sessão de testes roda sem ela (ver
+# `conftest.py`); o cenário com clínicas roda num processo à parte. Duas
+# clínicas: `norte` no shard principal e `sul` num segundo shard. No
+# PostgreSQL o segundo shard é o mesmo banco (cada clínica no seu schema); no
+# SQLite, outro arquivo (sem schemas, uma clínica por shard).
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import db
+from app.db import engine
+
+_CENARIO = textwrap.dedent(
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    CPF = "529.982.247-25"
+    consulta = {"cpfPaciente": CPF, "dia": "2031-05-05", "hora": "09:00", "descricao": "Retorno"}
+    norte, sul = {"X-Clinica": "norte"}, {"X-Clinica": "sul"}
+
+    with TestClient(app) as c:
+        r = c.post(f"/api/v1/pacientes/{CPF}/consultas", json=consulta, headers=norte)
+        assert r.status_code == 201, r.text
+        id_norte = r.json()["id"]
+        r = c.post(f"/api/v1/pacientes/{CPF}/consultas", json={**consulta, "hora": "10:00"}, headers=sul)
+        assert r.status_code == 201, r.text
+        # Ids por clínica: a primeira consulta de cada uma.
+        assert r.json()["id"] == id_norte, (r.json()["id"], id_norte)
+
+        r = c.get(f"/api/v1/pacientes/{CPF}/consultas", headers=sul)
+        assert [x["hora"] for x in r.json()] == ["10:00"], r.text
+        # `?clinica=` (EventSource do navegador, sem cabeçalhos).
+        r = c.get(f"/api/v1/pacientes/{CPF}/consultas", params={"clinica": "norte"})
+        assert [x["hora"] for x in r.json()] == ["09:00"], r.text
+
+        assert c.get(f"/api/v1/consultas/{id_norte}").status_code == 400
+        assert c.get(f"/api/v1/consultas/{id_norte}", headers={"X-Clinica": "leste"}).status_code == 404
+
+        # A mesma Idempotency-Key em clínicas diferentes são chaves diferentes.
+        chave = {"Idempotency-Key": "mesma-chave"}
+        a = c.post(f"/api/v1/pacientes/{CPF}/consultas", json=consulta, headers={**norte, **chave})
+        b = c.post(f"/api/v1/pacientes/{CPF}/consultas", json=consulta, headers={**sul, **chave})
+        assert (a.status_code, b.status_code) == (201, 201), (a.text, b.text)
+        assert a.headers.get("Idempotent-Replayed") is None and b.headers.get("Idempotent-Replayed") is None
+    """
+)
+
+
+@pytest.fixture
+def segundo_shard(tmp_path):
+    if engine.dialect.name != "postgresql":
+        yield f"sqlite:///{tmp_path / 'sul.db'}"
+        return
+    yield engine.url.render_as_string(hide_password=False)
+    with engine.begin() as conn:
+        for esquema in ("clinica_norte", "clinica_sul"):
+            conn.exec_driver_sql(f'DROP SCHEMA IF EXISTS "{esquema}" CASCADE')
+
+
+def test_dados_de_cada_clinica_ficam_no_seu_banco(segundo_shard, tmp_path):
+    env = {
+        **os.environ,
+        "CLINICAS": "norte=principal,sul=outro",
+        "DATABASE_SHARDS": f"outro={segundo_shard}",
+    }
+    if engine.dialect.name != "postgresql":
+        env["DATABASE_URL"] = f"sqlite:///{tmp_path / 'norte.db'}"
+    servico = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    r = subprocess.run(
+        [sys.executable, "-c", _CENARIO], cwd=servico, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert r.returncode == 0, r.stderr
+
+
+def test_pares_aceita_url_com_igual():
+    assert db._pares(" a = x , b=postgresql://h/db?opt=1,") == {"a": "x", "b": "postgresql://h/db?opt=1"}
+
+
+@pytest.mark.parametrize(
+    "clinicas, clinica, shard",
+    [
+        ({"Norte": "principal"}, "Norte", "principal"),  # identificador inválido
+        ({"norte": "leste"}, "norte", "leste"),  # shard inexistente
+    ],
+)
+def test_configuracao_invalida_recusada(monkeypatch, clinicas, clinica, shard):
+    monkeypatch.setattr(db, "CLINICAS", clinicas)
+    with pytest.raises(RuntimeError):
+        db._montar_engine(clinica, shard)
+
+
+def test_shard_sem_schemas_comporta_uma_clinica(monkeypatch, tmp_path):
+    monkeypatch.setitem(db.shards, "arquivo", create_engine(f"sqlite:///{tmp_path / 'x.db'}"))
+    monkeypatch.setattr(db, "CLINICAS", {"norte": "arquivo", "sul": "arquivo"})
+    with pytest.raises(RuntimeError):
+        db._montar_engine("norte", "arquivo")
+
+
+def test_sem_clinicas_tudo_vai_para_o_banco_do_servico():
+    assert db.engines_das_clinicas() == {None: engine}
+    assert db.engine_da_clinica(None) is engine
+    assert db.shard_da_clinica(None) == db.SHARD_PRINCIPAL
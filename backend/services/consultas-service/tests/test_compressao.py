@@ -0,0 +1,78 @@
+# Compressão negociada das respostas (`app/compressao.py`).
+
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compressao import CompressaoMiddleware, escolher_codificacao
+
+GRANDE = "consulta " * 200  # 1800 bytes
+PEQUENO = "ok"
+
+
+@pytest.mark.parametrize(
+    "accept, esperado",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.0, gzip;q=0", None),
+        ("*", "gzip"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_escolher_codificacao(accept, esperado):
+    assert escolher_codificacao(accept) == esperado
+
+
+@pytest.fixture(scope="module")
+def bruto():
+    app = FastAPI()
+    app.add_middleware(CompressaoMiddleware, minimo=1024)
+
+    @app.get("/grande")
+    def grande():
+        return PlainTextResponse(GRANDE)
+
+    @app.get("/pequeno")
+    def pequeno():
+        return PlainTextResponse(PEQUENO)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([GRANDE.encode(), GRANDE.encode()]), media_type="text/plain")
+
+    # Sem decodificar no cliente: o corpo é lido como foi enviado.
+    def obter(caminho, accept):
+        with c.stream("GET", caminho, headers={"Accept-Encoding": accept}) as r:
+            return r.headers, b"".join(r.iter_raw())
+
+    with TestClient(app) as c:
+        yield obter
+
+
+@pytest.mark.parametrize("accept, descomprimir", [("br", brotli.decompress), ("gzip", gzip.decompress)])
+def test_corpo_acima_do_minimo_e_comprimido(bruto, accept, descomprimir):
+    headers, corpo = bruto("/grande", accept)
+    assert headers["content-encoding"] == accept
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(corpo) < len(GRANDE)
+    assert descomprimir(corpo).decode() == GRANDE
+
+
+@pytest.mark.parametrize("caminho, accept", [("/pequeno", "br"), ("/grande", "identity"), ("/stream", "gzip")])
+def test_passa_intacto(bruto, caminho, accept):
+    headers, corpo = bruto(caminho, accept)
+    assert "content-encoding" not in headers
+    assert corpo.decode() in (PEQUENO, GRANDE, GRANDE * 2)
+
+
+def test_middleware_registrado_no_servico(cliente):
+    r = cliente.get("/openapi.json", headers={"Accept-Encoding": "br"})
+    assert r.headers["content-encoding"] == "br"
+    assert r.json()["info"]["title"]  # o cliente decodifica
@@ -0,0 +1,64 @@
+# Quantos comandos SQL cada rota de escrita emite (ver `app/escrita.py`).
+#
+# Cada escrita é um único INSERT/UPDATE ... RETURNING, sem `refresh` depois do
+# commit. Só no SQLite sobra uma leitura nas atualizações: a imagem "antes" da
+# auditoria (`app/auditoria.py`), que no Postgres vem no RETURNING do próprio
+# UPDATE. Um comando a mais (ex.: um `refresh` reintroduzido) quebra o teste.
+
+import pytest
+
+from app.db import engine
+
+ANTES = [] if engine.dialect.name == "postgresql" else ["SELECT"]
+
+CPF = "529.982.247-25"
+
+
+def _verbos(sql: list[str]) -> list[str]:
+    return [s.lstrip().split(None, 1)[0].upper() for s in sql]
+
+
+@pytest.fixture
+def consulta(cliente) -> dict:
+    payload = {"cpfPaciente": CPF, "dia": "2030-01-06", "hora": "09:00", "descricao": "Retorno"}
+    r = cliente.post(f"/api/v1/pacientes/{CPF}/consultas", json=payload)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_criar_consulta(cliente, comandos):
+    payload = {"cpfPaciente": CPF, "dia": "2030-01-07", "hora": "10:00", "descricao": "Primeira consulta"}
+    with comandos() as sql:
+        r = cliente.post(f"/api/v1/pacientes/{CPF}/consultas", json=payload)
+    assert r.status_code == 201, r.text
+    assert r.json()["id"] is not None
+    assert _verbos(sql) == ["INSERT"]
+
+
+def test_atualizar_consulta(cliente, comandos, consulta):
+    with comandos() as sql:
+        r = cliente.patch(f"/api/v1/consultas/{consulta['id']}", json={"hora": "11:30"})
+    assert r.status_code == 200, r.text
+    assert r.json()["hora"] == "11:30"
+    assert _verbos(sql) == ANTES + ["UPDATE"]
+
+
+def test_atualizar_consulta_inexistente(cliente, comandos):
+    # Nenhuma linha devolvida pelo UPDATE é o 404.
+    with comandos() as sql:
+        r = cliente.patch("/api/v1/consultas/999999", json={"hora": "11:30"})
+    assert r.status_code == 404
+    assert _verbos(sql) == ANTES + ["UPDATE"]
+
+
+def test_criar_e_atualizar_serie(cliente, comandos):
+    payload = {"frequencia": "semanal", "inicio": "2030-01-07", "hora": "09:00", "descricao": "Fisioterapia"}
+    with comandos() as sql:
+        r = cliente.post(f"/api/v1/pacientes/{CPF}/series", json=payload)
+    assert r.status_code == 201, r.text
+    assert _verbos(sql) == ["INSERT"]
+
+    with comandos() as sql:
+        r = cliente.patch(f"/api/v1/series/{r.json()['id']}", json={"hora": "10:00"})
+    assert r.status_code == 200, r.text
+    assert _verbos(sql) == ANTES + ["UPDATE"]
@@ -0,0 +1,185 @@
+# Eventos da agenda em tempo real (`app/eventos.py`, `app/routers/eventos.py`).
+#
+# A distribuição é testada com notificações montadas à mão (mesmo formato do
+# trigger), em qualquer banco; o caminho trigger → LISTEN → stream SSE só
+# existe no PostgreSQL.
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app import eventos
+from app.db import engine
+from app.eventos import RECARREGAR, Assinatura, Corretor
+from app.routers import eventos as rota_eventos
+
+postgres = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="NOTIFY requer PostgreSQL")
+
+
+def _distribuir(notificacoes: list[dict], dias: list[str]) -> dict[str, list[bytes]]:
+    """Distribui `notificacoes` a um assinante por dia; devolve o que cada um recebeu."""
+
+    async def _rodar():
+        corretor = Corretor()
+        assinaturas = {}
+        for dia in dias:
+            # Direto no corretor: sem subir a thread de LISTEN.
+            assinaturas[dia] = Assinatura(dia, asyncio.get_running_loop())
+            corretor._por_dia[(None, dia)].add(assinaturas[dia])
+        corretor._distribuir(notificacoes)
+        await asyncio.sleep(0)  # entregas agendadas com `call_soon_threadsafe`
+        recebidas = {}
+        for dia, a in assinaturas.items():
+            recebidas[dia] = []
+            while not a.fila.empty():
+                recebidas[dia].append(a.fila.get_nowait())
+        return recebidas
+
+    return asyncio.run(_rodar())
+
+
+def _evento(mensagem: bytes) -> tuple[str, dict]:
+    evento, dados = mensagem.decode().strip().split("\n")
+    return evento.removeprefix("event: "), json.loads(dados.removeprefix("data: "))
+
+
+@pytest.fixture
+def consulta(cliente, novo_cpf):
+    cpf = novo_cpf()
+    payload = {"cpfPaciente": cpf, "dia": "2031-03-10", "hora": "09:00", "descricao": "Retorno"}
+    r = cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_consulta_criada_vai_para_o_dia(consulta):
+    ev = {"t": "c", "op": "I", "id": consulta["id"], "dia": "2031-03-10", "antes": None}
+    recebidas = _distribuir([ev], ["2031-03-10", "2031-03-11"])
+
+    [mensagem] = recebidas["2031-03-10"]
+    tipo, dados = _evento(mensagem)
+    assert tipo == "consulta"
+    assert (dados["id"], dados["hora"]) == (consulta["id"], "09:00")
+    assert recebidas["2031-03-11"] == []
+
+
+def test_consulta_movida_sai_de_um_dia_e_entra_no_outro(consulta):
+    ev = {"t": "c", "op": "U", "id": consulta["id"], "dia": "2031-03-10", "antes": "2031-03-09"}
+    recebidas = _distribuir([ev], ["2031-03-09", "2031-03-10"])
+
+    assert [_evento(m) for m in recebidas["2031-03-09"]] == [
+        ("removida", {"id": consulta["id"], "dia": "2031-03-09"})
+    ]
+    assert [_evento(m)[0] for m in recebidas["2031-03-10"]] == ["consulta"]
+
+
+def test_dia_sem_inscritos_nao_consulta_o_banco(comandos, consulta):
+    ev = {"t": "c", "op": "U", "id": consulta["id"], "dia": "2031-03-10", "antes": "2031-03-10"}
+    with comandos() as sql:
+        recebidas = _distribuir([ev], ["2031-04-01"])
+    assert recebidas == {"2031-04-01": []}
+    assert sql == []
+
+
+def test_lote_busca_as_consultas_num_unico_select(cliente, comandos, novo_cpf):
+    ids = []
+    for hora in ("08:00", "08:30", "09:00"):
+        cpf = novo_cpf()
+        payload = {"cpfPaciente": cpf, "dia": "2031-03-12", "hora": hora, "descricao": "Retorno"}
+        ids.append(cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload).json()["id"])
+
+    lote = [{"t": "c", "op": "I", "id": i, "dia": "2031-03-12", "antes": None} for i in ids]
+    with comandos() as sql:
+        recebidas = _distribuir(lote, ["2031-03-12"])
+    assert [_evento(m)[1]["id"] for m in recebidas["2031-03-12"]] == ids
+    assert len(sql) == 1
+
+
+def test_consulta_removida_no_mesmo_lote_nao_e_enviada():
+    # O INSERT e o DELETE chegam juntos: a linha já não existe no SELECT.
+    lote = [
+        {"t": "c", "op": "I", "id": 999999, "dia": "2031-03-10", "antes": None},
+        {"t": "c", "op": "D", "id": 999999, "dia": None, "antes": "2031-03-10"},
+    ]
+    recebidas = _distribuir(lote, ["2031-03-10"])
+    assert [_evento(m) for m in recebidas["2031-03-10"]] == [("removida", {"id": 999999, "dia": "2031-03-10"})]
+
+
+def test_rajada_vira_recarregar(monkeypatch):
+    monkeypatch.setattr(eventos, "RAJADA_MAX", 2)
+    lote = [{"t": "c", "op": "I", "id": i, "dia": "2031-03-10", "antes": None} for i in range(3)]
+    assert _distribuir(lote, ["2031-03-10"]) == {"2031-03-10": [RECARREGAR]}
+
+
+@pytest.mark.parametrize(
+    "ev, afetados",
+    [
+        ({"t": "s", "de": "2031-03-10", "ate": "2031-03-20"}, ["2031-03-10", "2031-03-20"]),
+        ({"t": "s", "de": "2031-03-15", "ate": None}, ["2031-03-20", "2031-12-31"]),
+        ({"t": "e", "dia": "2031-03-20"}, ["2031-03-20"]),
+    ],
+)
+def test_mudanca_em_serie_ou_excecao_pede_recarga(ev, afetados):
+    dias = ["2031-03-09", "2031-03-10", "2031-03-20", "2031-12-31"]
+    recebidas = _distribuir([ev], dias)
+    assert {d for d, m in recebidas.items() if m == [RECARREGAR]} == set(afetados)
+    assert all(m == [] for d, m in recebidas.items() if d not in afetados)
+
+
+def test_fila_cheia_troca_o_atraso_por_recarregar(monkeypatch):
+    monkeypatch.setattr(eventos, "FILA_MAX", 2)
+
+    async def _rodar():
+        a = Assinatura("2031-03-10", asyncio.get_running_loop())
+        for i in range(3):
+            a._entregar(f"{i}".encode())
+        return [a.fila.get_nowait() for _ in range(a.fila.qsize())]
+
+    assert asyncio.run(_rodar()) == [RECARREGAR]
+
+
+def test_dia_invalido(cliente):
+    assert cliente.get("/api/v1/consultas/eventos", params={"dia": "10/03/2031"}).status_code == 422
+
+
+def test_limite_de_assinantes(cliente, monkeypatch):
+    monkeypatch.setattr(eventos, "ASSINANTES_MAX", 0)
+    r = cliente.get("/api/v1/consultas/eventos", params={"dia": "2031-03-10"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "3"
+
+
+def test_stream_abre_com_pronto_e_libera_a_assinatura(cliente, monkeypatch):
+    monkeypatch.setattr(rota_eventos, "DURACAO_MAX_S", 0.2)
+    r = cliente.get("/api/v1/consultas/eventos", params={"dia": "2031-03-10"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text.startswith('retry: 3000\nevent: pronto\ndata: {"dia": "2031-03-10"}\n\n')
+    assert eventos.corretor.metricas()["assinantes"] == 0
+
+
+@postgres
+def test_stream_recebe_consulta_criada_por_outro_request(cliente, monkeypatch, novo_cpf):
+    monkeypatch.setattr(rota_eventos, "DURACAO_MAX_S", 2.0)
+    cpf = novo_cpf()
+    payload = {"cpfPaciente": cpf, "dia": "2031-03-13", "hora": "14:00", "descricao": "Retorno"}
+    criada = {}
+
+    def _criar():
+        # Cria quando o stream já está aberto (com o LISTEN ativo).
+        while eventos.corretor.metricas()["assinantes"] == 0:
+            threading.Event().wait(0.01)
+        criada.update(cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload).json())
+        cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json={**payload, "dia": "2031-03-14"})
+
+    escritor = threading.Thread(target=_criar)
+    escritor.start()
+    r = cliente.get("/api/v1/consultas/eventos", params={"dia": "2031-03-13"})
+    escritor.join()
+
+    recebidos = [_evento(b.strip().encode()) for b in r.text.split("\n\n") if b.startswith("event: consulta")]
+    assert [(tipo, dados["id"], dados["dia"]) for tipo, dados in recebidos] == [
+        ("consulta", criada["id"], "2031-03-13")
+    ]
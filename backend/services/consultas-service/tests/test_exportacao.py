@@ -0,0 +1,27 @@
+# Exportação incremental para Parquet (`app/exportacao.py`).
+
+from app.exportacao import exportar
+
+
+def _criar(cliente, cpf, dia):
+    payload = {"cpfPaciente": cpf, "dia": dia, "hora": "09:00", "descricao": "Exportável"}
+    r = cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload)
+    assert r.status_code == 201, r.text
+
+
+def test_exportacao_incremental_pela_hora_do_banco(cliente, tmp_path, novo_cpf):
+    cpf = novo_cpf()
+    _criar(cliente, cpf, "2030-03-01")
+    assert exportar(str(tmp_path), atraso_s=0)["consultas"] >= 1
+
+    _criar(cliente, cpf, "2030-03-02")
+    _criar(cliente, cpf, "2030-03-03")
+    assert exportar(str(tmp_path), atraso_s=0) == {"consultas": 2}
+    assert exportar(str(tmp_path), atraso_s=0) == {"consultas": 0}
+
+
+def test_atraso_adia_linhas_recentes(cliente, tmp_path, novo_cpf):
+    exportar(str(tmp_path), atraso_s=0)
+    _criar(cliente, novo_cpf(), "2030-03-04")
+    assert exportar(str(tmp_path), atraso_s=3600) == {"consultas": 0}
+    assert exportar(str(tmp_path), atraso_s=0) == {"consultas": 1}
@@ -0,0 +1,137 @@
+# Histórico por paciente (`app/historico.py`): paginação por cursor nos dois
+# sentidos e `/consultas/proxima`, incluindo ocorrências de séries.
+#
+# Datas fixas ficam em 2030 em diante, sempre no futuro em relação a "agora".
+
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def criar(cliente):
+    def _criar(cpf: str, dia: str, hora: str) -> dict:
+        payload = {"cpfPaciente": cpf, "dia": dia, "hora": hora, "descricao": f"{dia} {hora}"}
+        r = cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload)
+        assert r.status_code == 201, r.text
+        return r.json()
+
+    return _criar
+
+
+def _cursor(c: dict) -> str:
+    return f"{c['dia']},{c['hora']},{c['id']}"
+
+
+def _chaves(consultas: list[dict]) -> list[tuple[str, str]]:
+    return [(c["dia"], c["hora"]) for c in consultas]
+
+
+def test_paginacao_nos_dois_sentidos(cliente, criar, novo_cpf):
+    cpf = novo_cpf()
+    horarios = [("2030-01-06", "09:00"), ("2030-01-06", "10:00"), ("2030-01-20", "08:00"),
+                ("2030-02-01", "07:30"), ("2030-03-15", "16:00")]
+    for dia, hora in reversed(horarios):
+        criar(cpf, dia, hora)
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+
+    primeira = cliente.get(url, params={"limit": 2}).json()
+    assert _chaves(primeira) == horarios[:2]
+    segunda = cliente.get(url, params={"limit": 2, "apos": _cursor(primeira[-1])}).json()
+    assert _chaves(segunda) == horarios[2:4]
+    ultima = cliente.get(url, params={"limit": 2, "apos": _cursor(segunda[-1])}).json()
+    assert _chaves(ultima) == horarios[4:]
+
+    # `antes_de` devolve as anteriores, da mais recente para a mais antiga.
+    anteriores = cliente.get(url, params={"limit": 3, "antes_de": _cursor(ultima[0])}).json()
+    assert _chaves(anteriores) == horarios[3::-1][:3]
+
+    # Um instante também serve de cursor.
+    depois = cliente.get(url, params={"apos": "2030-01-06,09:30,0"}).json()
+    assert _chaves(depois)[0] == ("2030-01-06", "10:00")
+
+
+def test_paginacao_desempata_pelo_id(cliente, criar, novo_cpf):
+    cpf = novo_cpf()
+    ids = [criar(cpf, "2030-04-01", "09:00")["id"] for _ in range(3)]
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+    primeira = cliente.get(url, params={"limit": 2}).json()
+    resto = cliente.get(url, params={"apos": _cursor(primeira[-1])}).json()
+    assert [c["id"] for c in primeira + resto] == sorted(ids)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"apos": "2030-01-06"}, {"apos": "2030-13-01,09:00,1"}, {"antes_de": "2030-01-06,9h,1"},
+     {"apos": "2030-01-06,09:00,1", "antes_de": "2030-02-06,09:00,1"}],
+)
+def test_cursor_invalido(cliente, novo_cpf, params):
+    r = cliente.get(f"/api/v1/pacientes/{novo_cpf()}/consultas", params=params)
+    assert r.status_code == 422
+
+
+def test_formatos_nao_canonicos_ordenam_cronologicamente(cliente, criar, novo_cpf):
+    cpf = novo_cpf()
+    criar(cpf, "2030-01-20", "08:00")
+    criar(cpf, "2030-1-6", "10:00")
+    criar(cpf, "2030-01-06", "9:00")
+    consultas = cliente.get(f"/api/v1/pacientes/{cpf}/consultas").json()
+    assert _chaves(consultas) == [("2030-01-06", "09:00"), ("2030-01-06", "10:00"), ("2030-01-20", "08:00")]
+    proxima = cliente.get(f"/api/v1/pacientes/{cpf}/consultas/proxima").json()
+    assert (proxima["dia"], proxima["hora"]) == ("2030-01-06", "09:00")
+
+
+def test_proxima_sem_consultas(cliente, novo_cpf):
+    r = cliente.get(f"/api/v1/pacientes/{novo_cpf()}/consultas/proxima")
+    assert r.status_code == 404
+
+
+def test_proxima_ignora_consultas_passadas(cliente, criar, novo_cpf):
+    cpf = novo_cpf()
+    criar(cpf, "2020-01-01", "09:00")
+    futura = criar(cpf, "2031-05-05", "09:00")
+    assert cliente.get(f"/api/v1/pacientes/{cpf}/consultas/proxima").json()["id"] == futura["id"]
+
+
+def _serie(cliente, cpf: str, **campos) -> dict:
+    payload = {"frequencia": "semanal", "hora": "07:00", "descricao": "Fisioterapia", **campos}
+    r = cliente.post(f"/api/v1/pacientes/{cpf}/series", json=payload)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_proxima_serie_com_inicio_distante(cliente, criar, novo_cpf):
+    # Regressão: séries com `inicio` a mais de um ano de hoje eram ignoradas.
+    cpf = novo_cpf()
+    serie = _serie(cliente, cpf, inicio="2030-01-01")
+    criar(cpf, "2030-01-06", "09:00")
+    proxima = cliente.get(f"/api/v1/pacientes/{cpf}/consultas/proxima").json()
+    assert proxima["id"] is None
+    assert (proxima["dia"], proxima["hora"], proxima["serieId"]) == ("2030-01-01", "07:00", serie["id"])
+
+
+def test_proxima_pula_longa_sequencia_de_ocorrencias_canceladas(cliente, novo_cpf):
+    # Mais de um ano de ocorrências canceladas a partir de amanhã.
+    cpf = novo_cpf()
+    inicio = date.today() + timedelta(days=1)
+    serie = _serie(cliente, cpf, inicio=inicio.isoformat(), frequencia="diaria")
+    for n in range(400):
+        dia = (inicio + timedelta(days=n)).isoformat()
+        r = cliente.delete(f"/api/v1/series/{serie['id']}/ocorrencias/{dia}")
+        assert r.status_code == 204, r.text
+    proxima = cliente.get(f"/api/v1/pacientes/{cpf}/consultas/proxima").json()
+    assert proxima["dia"] == (inicio + timedelta(days=400)).isoformat()
+
+
+def test_proxima_consulta_antes_da_serie(cliente, criar, novo_cpf):
+    cpf = novo_cpf()
+    _serie(cliente, cpf, inicio="2030-01-01")
+    consulta = criar(cpf, "2029-12-31", "23:00")
+    assert cliente.get(f"/api/v1/pacientes/{cpf}/consultas/proxima").json()["id"] == consulta["id"]
+
+
+def test_proxima_serie_encerrada_nao_conta(cliente, criar, novo_cpf):
+    cpf = novo_cpf()
+    _serie(cliente, cpf, inicio="2020-01-01", fim="2020-06-30")
+    consulta = criar(cpf, "2030-01-06", "09:00")
+    assert cliente.get(f"/api/v1/pacientes/{cpf}/consultas/proxima").json()["id"] == consulta["id"]
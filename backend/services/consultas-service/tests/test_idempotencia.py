@@ -0,0 +1,126 @@
+# `Idempotency-Key` nos POSTs (`app/idempotencia.py`).
+
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.routers import consultas as rotas
+
+
+def _payload(cpf, **extra):
+    return {"cpfPaciente": cpf, "dia": "2030-04-01", "hora": "09:00", "descricao": "Avaliação", **extra}
+
+
+@pytest.fixture
+def chave():
+    return str(uuid.uuid4())
+
+
+def _total(cliente, cpf) -> int:
+    return len(cliente.get(f"/api/v1/pacientes/{cpf}/consultas").json())
+
+
+def test_repeticao_devolve_a_resposta_original(cliente, novo_cpf, chave):
+    cpf = novo_cpf()
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+    primeira = cliente.post(url, json=_payload(cpf), headers={"Idempotency-Key": chave})
+    segunda = cliente.post(url, json=_payload(cpf), headers={"Idempotency-Key": chave})
+
+    assert primeira.status_code == segunda.status_code == 201
+    assert segunda.json() == primeira.json()
+    assert "idempotent-replayed" not in primeira.headers
+    assert segunda.headers["idempotent-replayed"] == "true"
+    assert _total(cliente, cpf) == 1
+
+
+def test_erro_4xx_tambem_e_repetido(cliente, chave):
+    url = "/api/v1/pacientes/invalido/consultas"
+    primeira = cliente.post(url, json=_payload("invalido"), headers={"Idempotency-Key": chave})
+    segunda = cliente.post(url, json=_payload("invalido"), headers={"Idempotency-Key": chave})
+    assert primeira.status_code == segunda.status_code == 422
+    assert segunda.headers["idempotent-replayed"] == "true"
+
+
+def test_mesma_chave_com_outra_requisicao(cliente, novo_cpf, chave):
+    cpf = novo_cpf()
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+    assert cliente.post(url, json=_payload(cpf), headers={"Idempotency-Key": chave}).status_code == 201
+
+    r = cliente.post(url, json=_payload(cpf, hora="10:00"), headers={"Idempotency-Key": chave})
+    assert r.status_code == 422
+    assert "idempotent-replayed" not in r.headers
+    assert _total(cliente, cpf) == 1
+
+
+def test_sem_chave_cada_post_executa(cliente, novo_cpf):
+    cpf = novo_cpf()
+    for _ in range(2):
+        assert cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=_payload(cpf)).status_code == 201
+    assert _total(cliente, cpf) == 2
+
+
+def test_duplicatas_concorrentes_executam_uma_vez(cliente, novo_cpf, chave, monkeypatch):
+    entrou, liberar = threading.Event(), threading.Event()
+    chamadas = []
+    inserir = rotas.inserir
+
+    def inserir_devagar(*args, **kwargs):
+        chamadas.append(1)
+        entrou.set()
+        liberar.wait(5)
+        return inserir(*args, **kwargs)
+
+    monkeypatch.setattr(rotas, "inserir", inserir_devagar)
+    cpf = novo_cpf()
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+    respostas = {}
+
+    def enviar(nome):
+        respostas[nome] = cliente.post(url, json=_payload(cpf), headers={"Idempotency-Key": chave})
+
+    original = threading.Thread(target=enviar, args=("original",))
+    original.start()
+    assert entrou.wait(5)
+    duplicata = threading.Thread(target=enviar, args=("duplicata",))
+    duplicata.start()
+    time.sleep(0.2)  # a duplicata chega com a original ainda em andamento
+    liberar.set()
+    original.join(5)
+    duplicata.join(5)
+
+    assert len(chamadas) == 1
+    assert respostas["original"].status_code == respostas["duplicata"].status_code == 201
+    assert respostas["duplicata"].json() == respostas["original"].json()
+    assert respostas["duplicata"].headers["idempotent-replayed"] == "true"
+
+
+def test_duplicata_desiste_com_409_se_a_original_demora(cliente, novo_cpf, chave, monkeypatch):
+    from app import idempotencia
+
+    entrou, liberar = threading.Event(), threading.Event()
+    inserir = rotas.inserir
+
+    def inserir_devagar(*args, **kwargs):
+        entrou.set()
+        liberar.wait(5)
+        return inserir(*args, **kwargs)
+
+    monkeypatch.setattr(rotas, "inserir", inserir_devagar)
+    monkeypatch.setattr(idempotencia, "ESPERA_S", 0.2)
+    cpf = novo_cpf()
+    url = f"/api/v1/pacientes/{cpf}/consultas"
+    original = threading.Thread(
+        target=cliente.post, args=(url,), kwargs={"json": _payload(cpf), "headers": {"Idempotency-Key": chave}}
+    )
+    original.start()
+    try:
+        assert entrou.wait(5)
+        r = cliente.post(url, json=_payload(cpf), headers={"Idempotency-Key": chave})
+        assert r.status_code == 409
+        assert r.headers["retry-after"] == "1"
+    finally:
+        liberar.set()
+        original.join(5)
+    assert _total(cliente, cpf) == 1
@@ -0,0 +1,158 @@
+# Jobs em segundo plano (`app/jobs.py`, `app/routers/jobs.py`).
+#
+# Nos testes o executor do processo fica parado (`JOBS_WORKERS=0`): cada teste
+# reserva e roda o job na própria thread, com `_reservar_proximo` e
+# `ExecutorJobs._executar`, e confere o estado gravado pela API.
+
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import select, update
+
+from app import jobs
+from app.db import engine
+from app.jobs import CANCELADO, PENDENTE, Job, tarefa
+
+
+class _Params(BaseModel):
+    n: int = 3
+
+
+@pytest.fixture(autouse=True)
+def fila_vazia():
+    # Jobs pendentes deixados por outros testes não podem ser reservados aqui.
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.estado == PENDENTE).values(estado=CANCELADO))
+
+
+@pytest.fixture
+def tarefas_de_teste(monkeypatch):
+    monkeypatch.setattr(jobs, "TAREFAS", dict(jobs.TAREFAS))
+    monkeypatch.setattr("app.routers.jobs.TAREFAS", jobs.TAREFAS)
+
+    @tarefa("teste_soma", _Params)
+    def _soma(ctx, params):
+        for i in range(params.n):
+            ctx.progresso(i + 1, params.n, forcar=True)
+        return {"soma": sum(range(params.n))}
+
+    @tarefa("teste_falha", _Params)
+    def _falha(ctx, params):
+        raise RuntimeError("sem conexão")
+
+
+def _submeter(cliente, tipo: str, **parametros) -> dict:
+    r = cliente.post("/api/v1/jobs", json={"tipo": tipo, "parametros": parametros})
+    assert r.status_code == 202, r.text
+    return r.json()
+
+
+def _rodar(executor: jobs.ExecutorJobs, job_id: int) -> None:
+    reservado = jobs._reservar_proximo(engine)
+    assert reservado is not None and reservado[0] == job_id
+    executor._executar(None, *reservado)
+
+
+def _estado(cliente, job_id: int) -> dict:
+    r = cliente.get(f"/api/v1/jobs/{job_id}")
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_job_concluido_com_resultado_e_progresso(cliente, tarefas_de_teste):
+    job = _submeter(cliente, "teste_soma", n=4)
+    assert job["estado"] == "pendente"
+
+    _rodar(jobs.ExecutorJobs(workers=1), job["id"])
+
+    job = _estado(cliente, job["id"])
+    assert job["estado"] == "concluido"
+    assert job["resultado"] == {"soma": 6}
+    assert (job["processados"], job["total"]) == (4, 4)
+    assert job["iniciado_em"] is not None and job["concluido_em"] is not None
+
+
+def test_job_que_levanta_excecao_falha(cliente, tarefas_de_teste):
+    job = _submeter(cliente, "teste_falha")
+    _rodar(jobs.ExecutorJobs(workers=1), job["id"])
+
+    job = _estado(cliente, job["id"])
+    assert job["estado"] == "falhou"
+    assert job["erro"] == "RuntimeError: sem conexão"
+
+
+def test_tipo_desconhecido_ou_parametros_invalidos(cliente, tarefas_de_teste):
+    r = cliente.post("/api/v1/jobs", json={"tipo": "inexistente"})
+    assert r.status_code == 422
+    assert "teste_soma" in r.json()["detail"]
+
+    r = cliente.post("/api/v1/jobs", json={"tipo": "teste_soma", "parametros": {"n": "muitos"}})
+    assert r.status_code == 422
+
+
+def test_cancelar_job_pendente(cliente, tarefas_de_teste):
+    job = _submeter(cliente, "teste_soma")
+
+    r = cliente.post(f"/api/v1/jobs/{job['id']}/cancelar")
+    assert r.status_code == 202
+    assert r.json()["estado"] == "cancelado"
+    assert jobs._reservar_proximo(engine) is None
+
+    # Já finalizado: nada a cancelar.
+    assert cliente.post(f"/api/v1/jobs/{job['id']}/cancelar").status_code == 409
+    assert cliente.post("/api/v1/jobs/999999/cancelar").status_code == 404
+
+
+def test_cancelar_job_em_execucao_para_no_proximo_progresso(cliente, tarefas_de_teste):
+    job = _submeter(cliente, "teste_soma")
+    reservado = jobs._reservar_proximo(engine)
+
+    r = cliente.post(f"/api/v1/jobs/{job['id']}/cancelar")
+    assert r.status_code == 202
+    assert r.json()["estado"] == "executando"
+    assert r.json()["cancelamento_solicitado"] is True
+
+    jobs.ExecutorJobs(workers=1)._executar(None, *reservado)
+    job = _estado(cliente, job["id"])
+    assert job["estado"] == "cancelado"
+    assert job["resultado"] is None
+
+
+def test_desligamento_devolve_job_para_a_fila(cliente, tarefas_de_teste):
+    job = _submeter(cliente, "teste_soma")
+    executor = jobs.ExecutorJobs(workers=1)
+    executor._encerrando.set()
+
+    _rodar(executor, job["id"])
+
+    assert _estado(cliente, job["id"])["estado"] == "pendente"
+    with engine.connect() as conn:
+        # A interrupção não conta como tentativa.
+        assert conn.scalar(select(Job.tentativas).where(Job.id == job["id"])) == 0
+
+
+@pytest.mark.parametrize("tentativas, estado", [(1, "pendente"), (jobs.TENTATIVAS_MAX, "falhou")])
+def test_job_orfao_volta_para_fila_ate_o_limite(cliente, tarefas_de_teste, tentativas, estado):
+    job = _submeter(cliente, "teste_soma")
+    jobs._reservar_proximo(engine)
+    sem_sinal = datetime.utcnow() - timedelta(seconds=jobs.ORFAO_S + 60)
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == job["id"]).values(atualizado_em=sem_sinal, tentativas=tentativas))
+
+    jobs.ExecutorJobs(workers=1)._manter(engine, [])
+
+    assert _estado(cliente, job["id"])["estado"] == estado
+
+
+def test_sinal_de_vida_impede_job_de_virar_orfao(cliente, tarefas_de_teste):
+    job = _submeter(cliente, "teste_soma")
+    jobs._reservar_proximo(engine)
+    sem_sinal = datetime.utcnow() - timedelta(seconds=jobs.ORFAO_S + 60)
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == job["id"]).values(atualizado_em=sem_sinal))
+
+    # O próprio processo ainda executa o job: renova o sinal antes de procurar órfãos.
+    jobs.ExecutorJobs(workers=1)._manter(engine, [job["id"]])
+
+    assert _estado(cliente, job["id"])["estado"] == "executando"
@@ -0,0 +1,169 @@
+# Particionamento mensal de `consultas` e arquivamento (`app/particoes.py`).
+#
+# Partições só existem no PostgreSQL; fora dele a instalação e a manutenção
+# não fazem nada. Os testes com meses de dados usam anos distantes (1999,
+# 2040) para não esbarrar nas partições e consultas dos outros testes.
+
+from datetime import date
+
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine, insert, text
+
+from app import particoes
+from app.db import engine
+from app.models import Base, Consulta
+
+postgres = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="partições requerem PostgreSQL")
+
+
+@pytest.mark.parametrize(
+    "mes, n, esperado",
+    [
+        (date(2030, 11, 1), 1, date(2030, 12, 1)),
+        (date(2030, 12, 1), 1, date(2031, 1, 1)),
+        (date(2030, 1, 1), -1, date(2029, 12, 1)),
+        (date(2030, 6, 1), 18, date(2031, 12, 1)),
+    ],
+)
+def test_somar_meses(mes, n, esperado):
+    assert particoes._somar_meses(mes, n) == esperado
+
+
+def test_nome_da_particao():
+    assert particoes._nome(date(2030, 3, 1)) == "consultas_2030_03"
+    assert particoes._mes_do_nome("consultas_2030_03") == date(2030, 3, 1)
+    assert particoes._mes_do_nome("consultas_padrao") is None
+
+
+def test_meses_a_frente_inclui_o_corrente():
+    meses = particoes._meses_a_frente(date(2030, 11, 20))
+    assert len(meses) == particoes.FUTURAS_MESES + 1
+    assert min(meses) == date(2030, 11, 1)
+
+
+@pytest.mark.skipif(engine.dialect.name == "postgresql", reason="só fora do PostgreSQL")
+def test_sem_postgres_nao_faz_nada():
+    particoes.instalar_particionamento(engine)
+    assert particoes.manter_particoes(engine) == []
+
+
+def _criar(cliente, novo_cpf, dia: str) -> dict:
+    cpf = novo_cpf()
+    payload = {"cpfPaciente": cpf, "dia": dia, "hora": "09:00", "descricao": "Retorno"}
+    r = cliente.post(f"/api/v1/pacientes/{cpf}/consultas", json=payload)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def _particao_de(conn, id: int) -> str:
+    return conn.scalar(text("SELECT tableoid::regclass::text FROM consultas WHERE id = :id"), {"id": id})
+
+
+@postgres
+def test_manutencao_cria_o_mes_e_tira_as_linhas_da_padrao(cliente, novo_cpf):
+    consulta = _criar(cliente, novo_cpf, "2040-07-03")
+    with engine.connect() as conn:
+        assert _particao_de(conn, consulta["id"]) == "consultas_padrao"
+
+    criadas = particoes.manter_particoes(engine, hoje=date(2040, 7, 1))
+
+    assert criadas[0] == "consultas_2040_07"
+    assert len(criadas) == particoes.FUTURAS_MESES + 1
+    with engine.connect() as conn:
+        assert _particao_de(conn, consulta["id"]) == "consultas_2040_07"
+    assert cliente.get(f"/api/v1/consultas/{consulta['id']}").json()["dia"] == "2040-07-03"
+    # Segunda execução: nada a criar.
+    assert particoes.manter_particoes(engine, hoje=date(2040, 7, 1)) == []
+
+
+@postgres
+def test_consulta_por_dia_le_uma_unica_particao():
+    particoes.manter_particoes(engine, hoje=date(2040, 7, 1))
+    with engine.connect() as conn:
+        plano = "\n".join(
+            conn.scalars(text("EXPLAIN SELECT * FROM consultas WHERE dia >= '2040-08-01' AND dia < '2040-08-08'"))
+        )
+    assert "consultas_2040_08" in plano
+    assert "consultas_2040_07" not in plano and "consultas_padrao" not in plano
+
+
+@postgres
+def test_arquivar_grava_parquet_e_remove_a_particao(cliente, novo_cpf, tmp_path):
+    consultas = [_criar(cliente, novo_cpf, dia) for dia in ("1999-01-10", "1999-01-20", "1999-02-05")]
+    particoes.manter_particoes(engine, hoje=date(1999, 1, 1))
+
+    por_particao = particoes.arquivar(str(tmp_path), date(1999, 2, 1), lote=100, eng=engine)
+
+    assert por_particao == {"consultas_1999_01": 2}
+    arquivo = pq.read_table(tmp_path / "consultas_1999_01.parquet")
+    assert sorted(arquivo.column("id").to_pylist()) == [c["id"] for c in consultas[:2]]
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT to_regclass('consultas_1999_01')")) is None
+    assert cliente.get(f"/api/v1/consultas/{consultas[0]['id']}").status_code == 404
+    assert cliente.get(f"/api/v1/consultas/{consultas[2]['id']}").status_code == 200
+
+
+@postgres
+def test_arquivar_retoma_particao_desanexada(cliente, novo_cpf, tmp_path):
+    consulta = _criar(cliente, novo_cpf, "1999-03-15")
+    particoes.manter_particoes(engine, hoje=date(1999, 3, 1))
+    # Execução anterior interrompida entre o DETACH e o DROP.
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE consultas DETACH PARTITION consultas_1999_03")
+
+    por_particao = particoes.arquivar(str(tmp_path), date(1999, 4, 1), eng=engine)
+
+    assert por_particao["consultas_1999_03"] == 1
+    assert pq.read_table(tmp_path / "consultas_1999_03.parquet").column("id").to_pylist() == [consulta["id"]]
+
+
+def test_arquivar_mes_futuro_recusado(tmp_path):
+    with pytest.raises(ValueError):
+        particoes.arquivar(str(tmp_path), particoes._somar_meses(date.today().replace(day=1), 1), eng=engine)
+
+
+@pytest.fixture
+def banco_antigo():
+    """Engine num schema próprio com as tabelas como antes do particionamento."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP SCHEMA IF EXISTS teste_particoes CASCADE")
+        conn.exec_driver_sql("CREATE SCHEMA teste_particoes")
+    eng = create_engine(engine.url, connect_args={"options": "-c search_path=teste_particoes"})
+    Base.metadata.create_all(bind=eng)
+    yield eng
+    eng.dispose()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP SCHEMA teste_particoes CASCADE")
+
+
+@postgres
+def test_conversao_preserva_dados_e_sequencia(banco_antigo):
+    linhas = [
+        {"cpf_paciente": "000.000.001-00", "dia": dia, "hora": "09:00", "descricao": "Retorno"}
+        for dia in ("2029-05-10", "2029-05-11", "2029-09-01")
+    ]
+    with banco_antigo.begin() as conn:
+        ids = list(conn.scalars(insert(Consulta).returning(Consulta.id), linhas))
+        assert not particoes._particionada(conn)
+
+    particoes.instalar_particionamento(banco_antigo)
+
+    with banco_antigo.begin() as conn:
+        assert particoes._particionada(conn)
+        assert {"consultas_2029_05", "consultas_2029_09", "consultas_padrao"} <= particoes._anexadas(conn)
+        assert [_particao_de(conn, i) for i in ids] == ["consultas_2029_05", "consultas_2029_05", "consultas_2029_09"]
+        # A sequência de `id` continua de onde parou.
+        novo = conn.scalar(insert(Consulta).returning(Consulta.id), {**linhas[0], "hora": "10:00"})
+        assert novo > max(ids)
+        pk = conn.scalars(
+            text(
+                "SELECT a.attname FROM pg_index i JOIN pg_attribute a "
+                "ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+                "WHERE i.indrelid = 'consultas'::regclass AND i.indisprimary ORDER BY a.attname"
+            )
+        ).all()
+        assert pk == ["dia", "id"]
+
+    # Instalação de novo: já convertida, nada muda.
+    particoes.instalar_particionamento(banco_antigo)
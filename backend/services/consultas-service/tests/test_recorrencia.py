@@ -0,0 +1,94 @@
+# Séries recorrentes (`app/recorrencia.py`): datas geradas pela regra e a
+# expansão na listagem, com ocorrências editadas e canceladas.
+
+from datetime import date
+
+import pytest
+
+from app.models import SerieConsulta
+from app.recorrencia import ocorrencias
+
+
+def _serie(frequencia, inicio, fim=None, intervalo=1):
+    return SerieConsulta(frequencia=frequencia, inicio=inicio, fim=fim, intervalo=intervalo)
+
+
+def _datas(serie, de, ate):
+    return [d.isoformat() for d in ocorrencias(serie, date.fromisoformat(de), date.fromisoformat(ate))]
+
+
+@pytest.mark.parametrize(
+    "serie, de, ate, esperado",
+    [
+        (_serie("diaria", "2030-01-30", intervalo=2), "2030-01-29", "2030-02-05",
+         ["2030-01-30", "2030-02-01", "2030-02-03", "2030-02-05"]),
+        # Janela começando no meio da série: alinhada ao passo a partir de `inicio`.
+        (_serie("semanal", "2030-01-07", intervalo=2), "2030-01-15", "2030-02-20",
+         ["2030-01-21", "2030-02-04", "2030-02-18"]),
+        (_serie("semanal", "2030-01-07", fim="2030-01-21"), "2030-01-01", "2030-12-31",
+         ["2030-01-07", "2030-01-14", "2030-01-21"]),
+        # Dia 31: meses sem o dia são pulados (não viram o último dia do mês).
+        (_serie("mensal", "2030-01-31"), "2030-01-01", "2030-06-30",
+         ["2030-01-31", "2030-03-31", "2030-05-31"]),
+        # 29/02 só existe nos anos bissextos.
+        (_serie("mensal", "2028-02-29", intervalo=12), "2028-01-01", "2033-01-01",
+         ["2028-02-29", "2032-02-29"]),
+        (_serie("mensal", "2030-01-15", intervalo=5), "2030-03-01", "2031-12-31",
+         ["2030-06-15", "2030-11-15", "2031-04-15", "2031-09-15"]),
+        # Janela antes do início ou depois do fim: nada.
+        (_serie("diaria", "2030-05-01"), "2030-04-01", "2030-04-30", []),
+        (_serie("diaria", "2030-05-01", fim="2030-05-03"), "2030-05-04", "2030-05-10", []),
+    ],
+)
+def test_ocorrencias(serie, de, ate, esperado):
+    assert _datas(serie, de, ate) == esperado
+
+
+def test_serie_sem_fim_ate_date_max():
+    datas = list(ocorrencias(_serie("diaria", "9999-12-29"), date(9999, 12, 1), date.max))
+    assert datas[-1] == date.max and len(datas) == 3
+    mensal = ocorrencias(_serie("mensal", "9999-11-30"), date(9999, 1, 1), date.max)
+    assert list(mensal) == [date(9999, 11, 30), date(9999, 12, 30)]
+
+
+def _da_serie(cliente, serie_id, de, ate):
+    itens = cliente.get("/api/v1/consultas", params={"de": de, "ate": ate}).json()
+    return [(c["dia"], c["hora"], c["id"] is not None) for c in itens if c["serieId"] == serie_id]
+
+
+def test_listagem_expande_com_excecoes(cliente, novo_cpf):
+    cpf = novo_cpf()
+    payload = {"frequencia": "mensal", "inicio": "2031-01-31", "hora": "14:00", "descricao": "Revisão"}
+    serie = cliente.post(f"/api/v1/pacientes/{cpf}/series", json=payload).json()
+    sid = serie["id"]
+
+    assert _da_serie(cliente, sid, "2031-01-01", "2031-05-31") == [
+        ("2031-01-31", "14:00", False), ("2031-03-31", "14:00", False), ("2031-05-31", "14:00", False),
+    ]
+
+    # Cancelada: some da agenda. Editada: vira uma consulta própria (com id).
+    assert cliente.delete(f"/api/v1/series/{sid}/ocorrencias/2031-01-31").status_code == 204
+    r = cliente.patch(f"/api/v1/series/{sid}/ocorrencias/2031-03-31", json={"hora": "15:30"})
+    assert r.status_code == 200, r.text
+    assert r.json()["id"] is not None and r.json()["serieId"] == sid
+    assert _da_serie(cliente, sid, "2031-01-01", "2031-05-31") == [
+        ("2031-03-31", "15:30", True), ("2031-05-31", "14:00", False),
+    ]
+
+    # Uma segunda edição altera a mesma consulta, sem duplicar a ocorrência.
+    r2 = cliente.patch(f"/api/v1/series/{sid}/ocorrencias/2031-03-31", json={"hora": "16:00"})
+    assert r2.json()["id"] == r.json()["id"]
+    assert _da_serie(cliente, sid, "2031-03-01", "2031-03-31") == [("2031-03-31", "16:00", True)]
+
+    # Cancelar a editada remove a consulta materializada.
+    assert cliente.delete(f"/api/v1/series/{sid}/ocorrencias/2031-03-31").status_code == 204
+    assert cliente.get(f"/api/v1/consultas/{r.json()['id']}").status_code == 404
+    assert _da_serie(cliente, sid, "2031-01-01", "2031-05-31") == [("2031-05-31", "14:00", False)]
+
+
+def test_dia_fora_da_regra(cliente, novo_cpf):
+    cpf = novo_cpf()
+    payload = {"frequencia": "semanal", "inicio": "2031-01-06", "hora": "08:00", "descricao": "Fisio"}
+    sid = cliente.post(f"/api/v1/pacientes/{cpf}/series", json=payload).json()["id"]
+    assert cliente.delete(f"/api/v1/series/{sid}/ocorrencias/2031-01-07").status_code == 404
+    assert cliente.patch(f"/api/v1/series/{sid}/ocorrencias/2031-01-07", json={"hora": "09:00"}).status_code == 404
@@ -0,0 +1,154 @@
+"""Controle de admissão (load shedding) do serviço de Estoque.
+
+Middleware ASGI que limita quantos requests de cada classe de rota executam
+ao mesmo tempo, protegendo o pool de conexões do banco em picos:
+
+- `escrita`: métodos que alteram dados (POST, PATCH, PUT, DELETE)
+- `busca`: rotas de busca textual (`.../busca`)
+- `leitura`: demais GET/HEAD
+
+Cada classe tem um limite de execução simultânea, uma fila de espera limitada
+e um tempo máximo de espera. Quem não cabe na fila, ou espera demais, recebe
+503 com `Retry-After` imediatamente, em vez de ocupar uma thread aguardando
+conexão. Os contadores ficam em `GET /metrics/admissao`.
+
+Configuração por ambiente, por classe (ex.: `ADMISSAO_LEITURA_LIMITE`,
+`ADMISSAO_LEITURA_FILA`, `ADMISSAO_LEITURA_ESPERA_S`) e `ADMISSAO_RETRY_AFTER_S`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+__all__ = ["ClasseAdmissao", "AdmissaoMiddleware", "CLASSES", "classificar", "metricas"]
+
+RETRY_AFTER_S = int(os.getenv("ADMISSAO_RETRY_AFTER_S", "1"))
+
+# Rotas fora do controle de admissão (sondas e métricas não podem ser barradas).
+ROTAS_ISENTAS = ("/health", "/metrics")
+
+_METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+
+
+@dataclass
+class ClasseAdmissao:
+    """Limite de concorrência + fila limitada de uma classe de rotas."""
+
+    nome: str
+    limite: int
+    fila_max: int
+    espera_max_s: float
+    em_execucao: int = 0
+    na_fila: int = 0
+    admitidos: int = 0
+    rejeitados_fila_cheia: int = 0
+    rejeitados_espera: int = 0
+    _livre: asyncio.Condition | None = field(default=None, repr=False)
+
+    @classmethod
+    def do_ambiente(cls, nome: str, limite: int, fila_max: int, espera_max_s: float) -> "ClasseAdmissao":
+        prefixo = f"ADMISSAO_{nome.upper()}_"
+        return cls(
+            nome=nome,
+            limite=int(os.getenv(prefixo + "LIMITE", limite)),
+            fila_max=int(os.getenv(prefixo + "FILA", fila_max)),
+            espera_max_s=float(os.getenv(prefixo + "ESPERA_S", espera_max_s)),
+        )
+
+    async def entrar(self) -> bool:
+        """Ocupa uma vaga; `False` se a fila está cheia ou a espera estourou."""
+        if self._livre is None:
+            self._livre = asyncio.Condition()
+        if self.em_execucao < self.limite and self.na_fila == 0:
+            self.em_execucao += 1
+            self.admitidos += 1
+            return True
+        if self.na_fila >= self.fila_max:
+            self.rejeitados_fila_cheia += 1
+            return False
+
+        self.na_fila += 1
+        try:
+            async with self._livre:
+                await asyncio.wait_for(
+                    self._livre.wait_for(lambda: self.em_execucao < self.limite),
+                    timeout=self.espera_max_s,
+                )
+                self.em_execucao += 1
+        except asyncio.TimeoutError:
+            self.rejeitados_espera += 1
+            return False
+        finally:
+            self.na_fila -= 1
+        self.admitidos += 1
+        return True
+
+    async def sair(self) -> None:
+        self.em_execucao -= 1
+        if self._livre is not None:
+            async with self._livre:
+                self._livre.notify()
+
+    def metricas(self) -> dict[str, int | float]:
+        return {
+            "limite": self.limite,
+            "fila_max": self.fila_max,
+            "em_execucao": self.em_execucao,
+            "na_fila": self.na_fila,
+            "admitidos": self.admitidos,
+            "rejeitados_fila_cheia": self.rejeitados_fila_cheia,
+            "rejeitados_espera": self.rejeitados_espera,
+        }
+
+
+# Padrões pensados para o pool padrão do SQLAlchemy (5 conexões + 10 overflow):
+# a soma dos limites não ultrapassa o total de conexões disponíveis.
+CLASSES: dict[str, ClasseAdmissao] = {
+    "escrita": ClasseAdmissao.do_ambiente("escrita", limite=4, fila_max=32, espera_max_s=2.0),
+    "leitura": ClasseAdmissao.do_ambiente("leitura", limite=8, fila_max=64, espera_max_s=2.0),
+    "busca": ClasseAdmissao.do_ambiente("busca", limite=2, fila_max=8, espera_max_s=1.0),
+}
+
+
+def classificar(metodo: str, caminho: str) -> str:
+    if metodo not in _METODOS_LEITURA:
+        return "escrita"
+    if caminho.rstrip("/").endswith("/busca"):
+        return "busca"
+    return "leitura"
+
+
+def metricas() -> dict[str, dict[str, int | float]]:
+    return {nome: c.metricas() for nome, c in CLASSES.items()}
+
+
+class AdmissaoMiddleware:
+    """Aplica `CLASSES` a cada request HTTP; excedentes recebem 503."""
+
+    def __init__(self, app: ASGIApp, classes: dict[str, ClasseAdmissao] | None = None) -> None:
+        self.app = app
+        self.classes = classes if classes is not None else CLASSES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(ROTAS_ISENTAS):
+            await self.app(scope, receive, send)
+            return
+
+        classe = self.classes[classificar(scope["method"], scope["path"])]
+        if not await classe.entrar():
+            resposta = JSONResponse(
+                {"detail": "Servidor sobrecarregado, tente novamente em instantes"},
+                status_code=503,
+                headers={"Retry-After": str(RETRY_AFTER_S)},
+            )
+            await resposta(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await classe.sair()
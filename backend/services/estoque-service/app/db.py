@@ -0,0 +1,122 @@
+# Configuração de acesso ao banco de dados (SQLAlchemy) do serviço de Estoque.
+#
+# Este módulo expõe:
+# - `engine`: conexão de baixo nível (pool) com o banco de dados (primário)
+# - `replica_engines`: engines das réplicas de leitura (opcional)
+# - `SessionLocal`: fábrica de sessões (transações)
+# - `get_sessao`: dependência do FastAPI para abrir/fechar sessão por request
+#
+# Réplicas de leitura: se `DATABASE_REPLICA_URLS` (URLs separadas por vírgula)
+# estiver definida, requests GET/HEAD usam uma réplica em round-robin; réplicas
+# que falham ficam fora por `DATABASE_REPLICA_RETRY_S` segundos e a leitura cai
+# no primário. Após uma escrita, o cookie `le_primario` mantém o cliente no
+# primário por `READ_YOUR_WRITES_S` segundos (read-your-writes).
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+# URL do banco de dados. Em desenvolvimento via docker-compose, apontamos para o
+# serviço `db_estoque`. Em produção, configure via variável de ambiente.
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    "postgresql+psycopg://estoque:estoque@db_estoque:5432/estoque_db",
+)
+REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_RETRY_S = float(os.getenv("DATABASE_REPLICA_RETRY_S", "30"))
+READ_YOUR_WRITES_S = int(os.getenv("READ_YOUR_WRITES_S", "5"))
+STICKY_COOKIE = "le_primario"
+_METODOS_LEITURA = {"GET", "HEAD"}
+
+# Cria o engine (gerencia pool de conexões com o Postgres)
+engine = create_engine(DATABASE_URL)
+
+# Um engine (e pool) por réplica; vazio quando não há réplicas configuradas.
+replica_engines: list[Engine] = [create_engine(u) for u in REPLICA_URLS]
+
+# Cria uma fábrica de sessões. `autoflush=False` e `autocommit=False` são o padrão seguro.
+# `expire_on_commit=False` mantém válidas as instâncias devolvidas por
+# INSERT/UPDATE ... RETURNING (ver `escrita.py`), sem SELECT de recarga após o commit.
+SessionLocal = sessionmaker(
+    bind=engine, autoflush=False, autocommit=False, expire_on_commit=False
+)
+
+# Estado de saúde das réplicas: índice → instante (monotonic) até o qual fica fora.
+_rr = itertools.count()
+_fora_ate: dict[int, float] = {}
+_lock = threading.Lock()
+
+
+def _marcar_fora(i: int) -> None:
+    with _lock:
+        _fora_ate[i] = time.monotonic() + REPLICA_RETRY_S
+
+
+def _monitorar_erros(i: int, eng: Engine) -> None:
+    # Desconexões no meio de um request também tiram a réplica de rotação.
+    @event.listens_for(eng, "handle_error")
+    def _on_error(ctx):  # pragma: no cover - depende de falha real de rede
+        if ctx.is_disconnect:
+            _marcar_fora(i)
+
+
+for _i, _eng in enumerate(replica_engines):
+    _monitorar_erros(_i, _eng)
+
+
+def _conectar_replica() -> Connection | None:
+    """Obtém uma conexão de réplica saudável em round-robin, ou `None`.
+
+    Réplicas em quarentena são puladas; ao expirar a quarentena a réplica é
+    testada com `SELECT 1` antes de voltar à rotação.
+    """
+    n = len(replica_engines)
+    for _ in range(n):
+        i = next(_rr) % n
+        with _lock:
+            fora_ate = _fora_ate.get(i)
+        if fora_ate is not None and fora_ate > time.monotonic():
+            continue
+        try:
+            conn = replica_engines[i].connect()
+            if fora_ate is not None:
+                conn.exec_driver_sql("SELECT 1")
+                with _lock:
+                    _fora_ate.pop(i, None)
+            return conn
+        except DBAPIError:
+            _marcar_fora(i)
+    return None
+
+
+def get_sessao(request: Request, response: Response):
+    """Dependência usada nos endpoints para obter uma sessão por request.
+
+    Leituras (GET/HEAD) usam uma réplica quando houver e o cliente não tiver
+    escrito recentemente; escritas usam o primário e renovam o cookie de
+    read-your-writes. Garante o fechamento da sessão ao final do ciclo do
+    request, evitando vazamentos de conexão.
+    """
+    conn = None
+    if request.method in _METODOS_LEITURA:
+        if replica_engines and not request.cookies.get(STICKY_COOKIE):
+            conn = _conectar_replica()
+    elif replica_engines:
+        response.set_cookie(STICKY_COOKIE, "1", max_age=READ_YOUR_WRITES_S, httponly=True)
+
+    db = SessionLocal(bind=conn) if conn is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,96 @@
+# Application factory do serviço de Estoque.
+#
+# Responsável por inicializar a aplicação FastAPI, criar as tabelas (MVP),
+# registrar as rotas de itens/movimentos e manter em segundo plano a
+# consolidação periódica dos snapshots de saldo.
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from .admissao import AdmissaoMiddleware, metricas as metricas_admissao
+from .compressao import CompressaoMiddleware
+from .db import SessionLocal, engine
+from .models import Base
+from .routers import itens, movimentos
+from .saldos import consolidar_saldos, instalar_ledger
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre consolidações de saldo (segundos); 0 desativa o job.
+SNAPSHOT_INTERVALO_S = float(os.getenv("SNAPSHOT_INTERVALO_S", "60"))
+
+
+def _consolidar() -> int:
+    db = SessionLocal()
+    try:
+        return consolidar_saldos(db)
+    finally:
+        db.close()
+
+
+async def _consolidar_periodicamente() -> None:
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVALO_S)
+        try:
+            await asyncio.to_thread(_consolidar)
+        except Exception:  # o job não pode morrer por uma falha pontual
+            logger.exception("Falha ao consolidar saldos do estoque")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tarefa = asyncio.create_task(_consolidar_periodicamente()) if SNAPSHOT_INTERVALO_S > 0 else None
+    yield
+    if tarefa is not None:
+        tarefa.cancel()
+
+
+# Instancia a aplicação FastAPI com metadados básicos
+app = FastAPI(title="estoque-service", version="0.1.0", lifespan=lifespan)
+
+# Controle de admissão por classe de rota (escrita/leitura/busca): excedentes
+# recebem 503 + Retry-After em vez de esperar por conexão. Registrado antes do
+# CORS para que as respostas 503 também levem os cabeçalhos CORS.
+app.add_middleware(AdmissaoMiddleware)
+
+# Compressão negociada (brotli/gzip) para respostas a partir de 1 KiB.
+app.add_middleware(CompressaoMiddleware)
+
+# Habilita CORS para acesso via browser durante desenvolvimento
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # em produção, restrinja para o domínio do frontend
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+# Cria as tabelas no banco no primeiro start (MVP). Para produção, prefira
+# migrations com Alembic em vez de `create_all`.
+Base.metadata.create_all(bind=engine)
+
+# Trigger que mantém o livro-razão somente de inclusão (DDL idempotente).
+instalar_ledger(engine)
+
+
+# Registra as rotas do domínio de estoque
+app.include_router(itens.router)
+app.include_router(movimentos.router)
+
+
+@app.get("/health")
+def health():
+    """Endpoint de verificação simples de saúde da aplicação."""
+    return {"status": "ok"}
+
+
+@app.get("/metrics/admissao")
+def admissao():
+    """Contadores do controle de admissão por classe de rota."""
+    return metricas_admissao()
@@ -0,0 +1,92 @@
+"""Modelos SQLAlchemy do serviço de Estoque.
+
+O estoque é modelado como um livro-razão (ledger) só de inclusão:
+
+- `Item`: material controlado (ex.: luvas, seringas, anestésico)
+- `Movimento`: cada entrada, uso ou ajuste, com quantidade assinada
+  (positiva soma, negativa subtrai). Nunca é alterado nem removido;
+  correções são novos movimentos de ajuste.
+- `SaldoSnapshot`: saldo consolidado de um item até um movimento
+  (`ate_movimento_id`). O saldo atual é o snapshot mais a cauda de
+  movimentos posteriores, sem somar todo o histórico.
+
+Movimentos de uso podem apontar para uma consulta (`consulta_id`) do serviço
+de Consultas; como nos demais serviços, não há FK entre bancos.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, Numeric, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+# Comprimentos máximos centralizados para facilitar manutenção
+NOME_LEN = 120
+UNIDADE_LEN = 20
+TIPO_LEN = 10
+OBS_LEN = 255
+
+# Quantidades com até 3 casas decimais (ex.: 2,5 ml)
+QTD = Numeric(14, 3)
+
+TIPOS_MOVIMENTO = ("entrada", "uso", "ajuste")
+
+__all__ = ["Base", "Item", "Movimento", "SaldoSnapshot", "TIPOS_MOVIMENTO"]
+
+
+class Base(DeclarativeBase):
+    """Base declarativa do SQLAlchemy (2.x)."""
+    pass
+
+
+class Item(Base):
+    """Material controlado no estoque."""
+
+    __tablename__ = "itens"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    nome: Mapped[str] = mapped_column(String(NOME_LEN), unique=True, nullable=False)
+    unidade: Mapped[str] = mapped_column(String(UNIDADE_LEN), nullable=False, default="un")
+    estoque_minimo: Mapped[Decimal] = mapped_column(QTD, nullable=False, default=Decimal(0))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:  # pragma: no cover - utilitário de depuração
+        return f"Item(id={self.id!r}, nome={self.nome!r})"
+
+
+class Movimento(Base):
+    """Lançamento do livro-razão (append-only)."""
+
+    __tablename__ = "movimentos"
+    # (item_id, id): soma da cauda após o snapshot e histórico paginado por item
+    __table_args__ = (Index("ix_movimentos_item_id_id", "item_id", "id"),)
+
+    # BIGINT no Postgres (alto volume); INTEGER no SQLite, onde só ele é autoincremental
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    item_id: Mapped[int] = mapped_column(ForeignKey("itens.id"), nullable=False)
+    tipo: Mapped[str] = mapped_column(String(TIPO_LEN), nullable=False)
+    quantidade: Mapped[Decimal] = mapped_column(QTD, nullable=False)
+    consulta_id: Mapped[int | None] = mapped_column(index=True, nullable=True)
+    observacao: Mapped[str | None] = mapped_column(String(OBS_LEN), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:  # pragma: no cover - utilitário de depuração
+        return (
+            f"Movimento(id={self.id!r}, item_id={self.item_id!r}, "
+            f"tipo={self.tipo!r}, quantidade={self.quantidade!r})"
+        )
+
+
+class SaldoSnapshot(Base):
+    """Saldo consolidado de um item até o movimento `ate_movimento_id`."""
+
+    __tablename__ = "saldos"
+
+    item_id: Mapped[int] = mapped_column(ForeignKey("itens.id"), primary_key=True)
+    saldo: Mapped[Decimal] = mapped_column(QTD, nullable=False)
+    ate_movimento_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    atualizado_em: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
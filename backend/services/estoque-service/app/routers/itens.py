@@ -0,0 +1,69 @@
+# Rotas HTTP para itens de estoque.
+#
+# Endpoints:
+# - POST   /api/v1/itens        → cadastra item
+# - GET    /api/v1/itens        → lista itens com saldo atual
+# - GET    /api/v1/itens/{id}   → obtém item com saldo atual
+# - PATCH  /api/v1/itens/{id}   → atualização parcial do cadastro
+#
+# O saldo nunca é editado aqui: ele resulta dos movimentos (ver `movimentos.py`).
+
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..db import get_sessao
+from ..escrita import transacao, inserir, atualizar
+from ..models import Item
+from ..saldos import consultar_itens_com_saldo
+from ..schemas import ItemIn, ItemOut, ItemAtualizar
+
+router = APIRouter(prefix="/api/v1", tags=["itens"])
+
+
+def _item_out(item: Item, saldo: Decimal) -> ItemOut:
+    out = ItemOut.model_validate(item)
+    out.saldo = saldo
+    out.abaixo_minimo = saldo < item.estoque_minimo
+    return out
+
+
+@router.post("/itens", response_model=ItemOut, status_code=201)
+def criar_item(payload: ItemIn, db: Session = Depends(get_sessao)):
+    with transacao(db, detail="Já existe um item com este nome"):
+        item = inserir(db, Item, payload.model_dump())
+    return _item_out(item, Decimal(0))
+
+
+@router.get("/itens", response_model=list[ItemOut])
+def listar_itens(
+    abaixo_minimo: bool = Query(default=False, description="Somente itens abaixo do estoque mínimo"),
+    db: Session = Depends(get_sessao),
+):
+    stmt = consultar_itens_com_saldo().order_by(Item.nome)
+    itens = [_item_out(item, saldo) for item, saldo in db.execute(stmt)]
+    if abaixo_minimo:
+        itens = [i for i in itens if i.abaixo_minimo]
+    return itens
+
+
+@router.get("/itens/{id}", response_model=ItemOut)
+def obter_item(id: int, db: Session = Depends(get_sessao)):
+    row = db.execute(consultar_itens_com_saldo().where(Item.id == id)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Item não encontrado")
+    return _item_out(*row)
+
+
+@router.patch("/itens/{id}", response_model=ItemOut)
+def atualizar_item(id: int, payload: ItemAtualizar, db: Session = Depends(get_sessao)):
+    data = payload.model_dump(exclude_unset=True)
+    if not data:
+        raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
+
+    with transacao(db, detail="Já existe um item com este nome"):
+        item = atualizar(db, Item, id, data)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item não encontrado")
+    return obter_item(id, db)
@@ -0,0 +1,76 @@
+# Rotas HTTP para o livro-razão de movimentos de estoque.
+#
+# Endpoints:
+# - POST /api/v1/itens/{id}/movimentos      → registra entrada/uso/ajuste
+# - GET  /api/v1/itens/{id}/movimentos      → histórico do item (mais recentes primeiro)
+# - POST /api/v1/movimentos                 → registra um lote (um único INSERT)
+# - GET  /api/v1/consultas/{id}/movimentos  → materiais usados em uma consulta
+# - POST /api/v1/saldos:consolidar          → força a consolidação dos snapshots
+#
+# Movimentos nunca são alterados ou removidos: correções são ajustes.
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db import get_sessao
+from ..escrita import transacao, inserir, inserir_varios
+from ..models import Movimento
+from ..saldos import consolidar_saldos
+from ..schemas import LOTE_MAX, MovimentoIn, MovimentoLoteIn, MovimentoOut
+
+router = APIRouter(prefix="/api/v1", tags=["movimentos"])
+
+
+def _linha(payload: MovimentoIn, item_id: int) -> dict:
+    data = payload.model_dump(exclude={"item_id"})
+    data["item_id"] = item_id
+    data["quantidade"] = payload.quantidade_assinada()
+    return data
+
+
+@router.post("/itens/{id}/movimentos", response_model=MovimentoOut, status_code=201)
+def registrar_movimento(id: int, payload: MovimentoIn, db: Session = Depends(get_sessao)):
+    # A FK `item_id` garante a existência do item: violação → 404.
+    with transacao(db, status_code=404, detail="Item não encontrado"):
+        mov = inserir(db, Movimento, _linha(payload, id))
+    return mov
+
+
+@router.post("/movimentos", response_model=list[MovimentoOut], status_code=201)
+def registrar_lote(payload: list[MovimentoLoteIn], db: Session = Depends(get_sessao)):
+    if not payload:
+        raise HTTPException(status_code=400, detail="Lote vazio")
+    if len(payload) > LOTE_MAX:
+        raise HTTPException(status_code=422, detail=f"Lote acima de {LOTE_MAX} movimentos")
+    # Tudo ou nada: um item inexistente invalida o lote inteiro.
+    with transacao(db, status_code=422, detail="Lote contém item inexistente"):
+        movs = inserir_varios(db, Movimento, [_linha(m, m.item_id) for m in payload])
+    return movs
+
+
+@router.get("/itens/{id}/movimentos", response_model=list[MovimentoOut])
+def listar_movimentos_do_item(
+    id: int,
+    limit: int = Query(default=50, ge=1, le=500),
+    antes_de: int | None = Query(default=None, description="Cursor: id do último movimento já recebido"),
+    db: Session = Depends(get_sessao),
+):
+    # Paginação por cursor no índice (item_id, id): custo independe da página.
+    stmt = select(Movimento).where(Movimento.item_id == id)
+    if antes_de is not None:
+        stmt = stmt.where(Movimento.id < antes_de)
+    stmt = stmt.order_by(Movimento.id.desc()).limit(limit)
+    return db.execute(stmt).scalars().all()
+
+
+@router.get("/consultas/{consulta_id}/movimentos", response_model=list[MovimentoOut])
+def listar_movimentos_da_consulta(consulta_id: int, db: Session = Depends(get_sessao)):
+    stmt = select(Movimento).where(Movimento.consulta_id == consulta_id).order_by(Movimento.id)
+    return db.execute(stmt).scalars().all()
+
+
+@router.post("/saldos:consolidar")
+def consolidar(db: Session = Depends(get_sessao)):
+    # Normalmente roda em segundo plano (ver `main.py`); útil após cargas em lote.
+    return {"itens_atualizados": consolidar_saldos(db)}
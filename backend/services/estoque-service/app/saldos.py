@@ -0,0 +1,118 @@
+"""Saldos do estoque: leitura pelo snapshot + cauda e consolidação periódica.
+
+O saldo atual de um item é `snapshot.saldo + soma(movimentos com id >
+snapshot.ate_movimento_id)`. A cauda é lida pelo índice `(item_id, id)` e fica
+curta porque um job periódico (`consolidar_saldos`) avança os snapshots, então
+a leitura não depende do tamanho do histórico.
+
+Escritas são só INSERTs no livro-razão: nenhum movimento atualiza uma linha
+de saldo, o que evitaria contenção de lock em itens muito movimentados.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .models import Item, Movimento, SaldoSnapshot
+
+__all__ = ["instalar_ledger", "consultar_itens_com_saldo", "consolidar_saldos"]
+
+# Garante no banco que o livro-razão é só de inclusão (correções = ajustes).
+_DDL_SOMENTE_INCLUSAO = (
+    """
+    CREATE OR REPLACE FUNCTION movimentos_somente_inclusao() RETURNS trigger AS $$
+    BEGIN
+        RAISE EXCEPTION 'movimentos é somente inclusão: registre um ajuste';
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER movimentos_somente_inclusao
+    BEFORE UPDATE OR DELETE ON movimentos
+    FOR EACH ROW EXECUTE FUNCTION movimentos_somente_inclusao()
+    """,
+)
+
+
+def instalar_ledger(engine: Engine) -> None:
+    """Instala (idempotente) o trigger que bloqueia UPDATE/DELETE em movimentos."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for ddl in _DDL_SOMENTE_INCLUSAO:
+            conn.exec_driver_sql(ddl)
+
+
+def _saldo_atual():
+    # Snapshot (ou 0) + movimentos posteriores a ele, via índice (item_id, id).
+    cauda = (
+        select(func.coalesce(func.sum(Movimento.quantidade), 0))
+        .where(
+            Movimento.item_id == Item.id,
+            Movimento.id > func.coalesce(SaldoSnapshot.ate_movimento_id, 0),
+        )
+        .correlate(Item, SaldoSnapshot)
+        .scalar_subquery()
+    )
+    return (func.coalesce(SaldoSnapshot.saldo, 0) + cauda).label("saldo")
+
+
+def consultar_itens_com_saldo() -> Select:
+    """`SELECT item, saldo` para filtrar/paginar nas rotas."""
+    return select(Item, _saldo_atual()).outerjoin(SaldoSnapshot, SaldoSnapshot.item_id == Item.id)
+
+
+def consolidar_saldos(db: Session) -> int:
+    """Avança os snapshots até o último movimento confirmado.
+
+    Os ids vêm de uma sequência e podem ser confirmados fora de ordem; um
+    `LOCK ... IN SHARE MODE` curto espera as transações de escrita em curso,
+    garantindo que todo id até `limite` já está visível antes de consolidar.
+    Retorna o número de itens atualizados.
+    """
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        db.execute(text("LOCK TABLE movimentos IN SHARE MODE"))
+    limite = db.scalar(select(func.max(Movimento.id)))
+    db.commit()  # libera o lock: as escritas seguem durante a consolidação
+    if limite is None:
+        return 0
+
+    novos = (
+        select(
+            Movimento.item_id,
+            func.coalesce(SaldoSnapshot.saldo, Decimal(0)) + func.sum(Movimento.quantidade),
+            func.max(Movimento.id),
+            func.now(),
+        )
+        .select_from(Movimento)
+        .outerjoin(SaldoSnapshot, SaldoSnapshot.item_id == Movimento.item_id)
+        .where(
+            Movimento.id > func.coalesce(SaldoSnapshot.ate_movimento_id, 0),
+            Movimento.id <= limite,
+        )
+        .group_by(Movimento.item_id, SaldoSnapshot.saldo)
+    )
+    insert = pg_insert if dialeto == "postgresql" else sqlite_insert
+    stmt = insert(SaldoSnapshot).from_select(
+        ["item_id", "saldo", "ate_movimento_id", "atualizado_em"], novos
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SaldoSnapshot.item_id],
+        set_={
+            "saldo": stmt.excluded.saldo,
+            "ate_movimento_id": stmt.excluded.ate_movimento_id,
+            "atualizado_em": stmt.excluded.atualizado_em,
+        },
+        # Execuções concorrentes nunca fazem um snapshot retroceder.
+        where=SaldoSnapshot.ate_movimento_id < stmt.excluded.ate_movimento_id,
+    ).returning(SaldoSnapshot.item_id)
+    atualizados = len(db.execute(stmt).all())
+    db.commit()
+    return atualizados
@@ -0,0 +1,86 @@
+# Schemas Pydantic (validação/serialização) do serviço de Estoque.
+#
+# Mantemos as variações usuais:
+# - In: payload de criação
+# - Atualizar: atualização parcial (PATCH)
+# - Out: representação de saída (response)
+#
+# Quantidades de movimento são sempre informadas em valor absoluto; o sinal é
+# definido pelo tipo (`entrada` soma, `uso` subtrai). Só `ajuste` aceita
+# valores negativos, para corrigir o saldo em qualquer direção.
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+TipoMovimento = Literal["entrada", "uso", "ajuste"]
+
+# Limite de movimentos por chamada em lote (um único INSERT).
+LOTE_MAX = 1000
+
+
+class ItemIn(BaseModel):
+    # Dados necessários para cadastrar um item de estoque
+    nome: str = Field(min_length=1, max_length=120)
+    unidade: str = Field(default="un", min_length=1, max_length=20)
+    estoque_minimo: Decimal = Field(default=Decimal(0), ge=0, max_digits=14, decimal_places=3)
+
+
+class ItemAtualizar(BaseModel):
+    # Atualização parcial do cadastro do item (o saldo só muda por movimentos)
+    nome: Optional[str] = Field(default=None, min_length=1, max_length=120)
+    unidade: Optional[str] = Field(default=None, min_length=1, max_length=20)
+    estoque_minimo: Optional[Decimal] = Field(default=None, ge=0, max_digits=14, decimal_places=3)
+
+
+class ItemOut(BaseModel):
+    # Item com o saldo atual (snapshot + cauda do livro-razão)
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    nome: str
+    unidade: str
+    estoque_minimo: Decimal
+    saldo: Decimal = Decimal(0)
+    abaixo_minimo: bool = False
+
+
+class MovimentoIn(BaseModel):
+    # Lançamento para um item (o item vem do path)
+    tipo: TipoMovimento
+    quantidade: Decimal = Field(max_digits=14, decimal_places=3)
+    consulta_id: Optional[int] = Field(default=None, ge=1, description="Consulta que originou o uso")
+    observacao: Optional[str] = Field(default=None, max_length=255)
+
+    @model_validator(mode="after")
+    def _valida_quantidade(self) -> "MovimentoIn":
+        if self.quantidade == 0:
+            raise ValueError("quantidade não pode ser zero")
+        if self.tipo != "ajuste" and self.quantidade < 0:
+            raise ValueError("quantidade deve ser positiva para entrada/uso")
+        return self
+
+    def quantidade_assinada(self) -> Decimal:
+        return -self.quantidade if self.tipo == "uso" else self.quantidade
+
+
+class MovimentoLoteIn(MovimentoIn):
+    # Lançamento dentro de um lote (informa o item explicitamente)
+    item_id: int = Field(ge=1)
+
+
+class MovimentoOut(BaseModel):
+    # Lançamento registrado; `quantidade` já vem com sinal
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    item_id: int
+    tipo: str
+    quantidade: Decimal
+    consulta_id: Optional[int] = None
+    observacao: Optional[str] = None
+    created_at: datetime
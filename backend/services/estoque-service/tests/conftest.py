@@ -0,0 +1,30 @@
+# Fixtures dos testes do serviço de Estoque.
+#
+# Rode a partir da pasta do serviço:
+#   pip install -r requirements-dev.txt && python -m pytest -q
+#
+# Os testes usam um SQLite temporário ou, com `TESTES_DATABASE_URL`, um banco
+# Postgres vazio criado para a execução. As variáveis de ambiente são
+# definidas antes de importar `app`, que lê a configuração no import. A
+# consolidação periódica fica desligada: os testes a chamam explicitamente.
+
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="estoque-testes-")
+os.environ["DATABASE_URL"] = os.getenv("TESTES_DATABASE_URL") or f"sqlite:///{os.path.join(_TMP, 'estoque.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["SNAPSHOT_INTERVALO_S"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,95 @@
+# Saldos pelo snapshot + cauda do livro-razão (`app/saldos.py`).
+
+import itertools
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.models import Movimento, SaldoSnapshot
+from app.saldos import consolidar_saldos
+
+_nomes = itertools.count(1)
+
+
+@pytest.fixture
+def item(cliente) -> int:
+    r = cliente.post("/api/v1/itens", json={"nome": f"Item {next(_nomes)}", "estoque_minimo": "5"})
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def _mover(cliente, item_id, tipo, quantidade):
+    r = cliente.post(f"/api/v1/itens/{item_id}/movimentos", json={"tipo": tipo, "quantidade": quantidade})
+    assert r.status_code == 201, r.text
+
+
+def _saldo(cliente, item_id) -> Decimal:
+    return Decimal(str(cliente.get(f"/api/v1/itens/{item_id}").json()["saldo"]))
+
+
+def _consolidar() -> int:
+    with SessionLocal() as db:
+        return consolidar_saldos(db)
+
+
+def _razao(item_id) -> tuple[Decimal, SaldoSnapshot | None]:
+    with SessionLocal() as db:
+        soma = db.scalar(
+            select(func.coalesce(func.sum(Movimento.quantidade), 0)).where(Movimento.item_id == item_id)
+        )
+        return Decimal(str(soma)), db.get(SaldoSnapshot, item_id)
+
+
+def test_saldo_sem_snapshot_soma_o_livro_razao(cliente, item):
+    assert _saldo(cliente, item) == 0
+    _mover(cliente, item, "entrada", "10")
+    _mover(cliente, item, "uso", "2.5")
+    _mover(cliente, item, "ajuste", "-0.25")
+    assert _saldo(cliente, item) == Decimal("7.25") == _razao(item)[0]
+
+
+def test_snapshot_mais_cauda_igual_a_soma_do_livro_razao(cliente, item):
+    _mover(cliente, item, "entrada", "20")
+    _mover(cliente, item, "uso", "3")
+    assert _consolidar() >= 1
+    soma, snapshot = _razao(item)
+    assert Decimal(str(snapshot.saldo)) == soma == Decimal("17")
+
+    # Depois do snapshot, a cauda cobre os movimentos novos.
+    _mover(cliente, item, "uso", "4")
+    _mover(cliente, item, "ajuste", "1.5")
+    soma, snapshot = _razao(item)
+    assert Decimal(str(snapshot.saldo)) == Decimal("17")
+    assert _saldo(cliente, item) == soma == Decimal("14.5")
+
+    # A nova consolidação alcança o último movimento e não muda o saldo.
+    _consolidar()
+    soma, snapshot = _razao(item)
+    with SessionLocal() as db:
+        ultimo = db.scalar(select(func.max(Movimento.id)).where(Movimento.item_id == item))
+    assert (Decimal(str(snapshot.saldo)), snapshot.ate_movimento_id) == (soma, ultimo)
+    assert _saldo(cliente, item) == soma
+
+
+def test_consolidar_sem_movimentos_novos_nao_atualiza(cliente, item):
+    _mover(cliente, item, "entrada", "1")
+    _consolidar()
+    assert _consolidar() == 0
+
+
+def test_lote_e_abaixo_do_minimo(cliente, item):
+    r = cliente.post(
+        "/api/v1/movimentos",
+        json=[
+            {"item_id": item, "tipo": "entrada", "quantidade": "6"},
+            {"item_id": item, "tipo": "uso", "quantidade": "2"},
+        ],
+    )
+    assert r.status_code == 201, r.text
+    _consolidar()
+    _mover(cliente, item, "uso", "1")
+    abaixo = {i["id"] for i in cliente.get("/api/v1/itens", params={"abaixo_minimo": True}).json()}
+    assert item in abaixo and _saldo(cliente, item) == Decimal("3")
+
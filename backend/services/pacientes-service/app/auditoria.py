@@ -0,0 +1,529 @@
+"""Trilha de auditoria do serviço de Pacientes (gravação assíncrona em lotes).
+
+Toda mudança em `pacientes`, `alergias`, `medicacoes` e `cirurgias` vira uma
+linha na tabela `auditoria`, que só aceita INSERT (triggers recusam UPDATE,
+DELETE e, no Postgres, TRUNCATE):
+
+- quem: `autor` (cabeçalho `X-Usuario` do request) e `origem` (`POST /api/...`
+  ou `job <id>`);
+- o quê: `tabela`, `chave`, `operacao` (I/U/D) e os valores `antes`/`depois`
+  em JSON — num UPDATE, só as colunas que mudaram;
+- quando: `ocorrido_em`, o instante do commit.
+
+Captura por eventos da `Session`, sem código nos handlers:
+`do_orm_execute` para INSERT/UPDATE/DELETE em SQL (ver `app/escrita.py`;
+a imagem "antes" vem no RETURNING do próprio comando — no Postgres, o UPDATE
+junta uma subconsulta `FOR UPDATE`; no SQLite, que não devolve valores
+anteriores, as linhas são lidas antes na mesma transação) e
+`after_flush` para o unit of work (`db.delete(obj)` e cascatas). Os registros
+ficam na sessão até o commit; rollback os descarta.
+
+Gravação: o commit só publica os registros num buffer em memória; a thread do
+`gravador` os grava em lotes (`AUDITORIA_LOTE` linhas ou a cada
+`AUDITORIA_INTERVALO_S`), numa transação própria.
+
+- Backpressure: o buffer é limitado (`AUDITORIA_BUFFER_MAX`). O commit
+  reserva espaço *antes* de confirmar; com o buffer cheio (banco lento ou fora
+  do ar), espera até `AUDITORIA_ESPERA_S` e então falha com 503 — uma mudança
+  confirmada nunca fica sem lugar no buffer.
+- Desligamento: `gravador.encerrar()` (no `lifespan`) grava o buffer até o
+  fim; se o banco recusar, o restante vai para `AUDITORIA_RESERVA` (JSON
+  lines, com fsync) e é gravado no próximo start. Uma queda abrupta do
+  processo perde o que ainda estava no buffer.
+- Multi-clínica (ver `app/db.py`): cada registro vai para a `auditoria` da
+  clínica da sessão (`Session.info["clinica"]`). Há um buffer e uma thread por
+  shard (reserva `AUDITORIA_RESERVA` com o nome do shard, exceto o principal):
+  um shard lento não bloqueia os commits das clínicas dos outros.
+
+Escritas feitas direto por conexão (`engine.begin()`), como as chaves
+fonéticas preenchidas pelo job de duplicidades, não passam pela `Session` e
+não são auditadas.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Index, String, Text, and_, event, insert, inspect, select
+from sqlalchemy.engine import CursorResult, Engine
+from sqlalchemy.orm import Mapped, Mapper, ORMExecuteState, Session, mapped_column
+
+from .db import SHARD_PRINCIPAL, SessionLocal, shard_da_clinica, shards, usar_clinica
+from .models import Alergia, Base, Cirurgia, Medicacao, Paciente
+
+__all__ = ["RegistroAuditoria", "AuditoriaSaturada", "gravador", "instalar_auditoria"]
+
+logger = logging.getLogger(__name__)
+
+BUFFER_MAX = int(os.getenv("AUDITORIA_BUFFER_MAX", "10000"))
+LOTE = int(os.getenv("AUDITORIA_LOTE", "500"))
+INTERVALO_S = float(os.getenv("AUDITORIA_INTERVALO_S", "1"))
+ESPERA_S = float(os.getenv("AUDITORIA_ESPERA_S", "5"))
+RESERVA = os.getenv("AUDITORIA_RESERVA", "auditoria-pendente.jsonl")
+RETRY_AFTER_S = 5
+NOVA_TENTATIVA_MAX_S = 30.0
+
+AUDITADOS = (Paciente, Alergia, Medicacao, Cirurgia)
+# Colunas derivadas (recalculadas a partir do nome): não são mudanças do usuário.
+IGNORADAS = frozenset({"fonetica_nome", "fonetica_sobrenome"})
+
+# Chaves em `Session.info`. Prefixadas pelo módulo: no modo embarcado os dois
+# serviços auditam a mesma sessão, cada um os seus modelos.
+_PENDENTES = f"{__name__}.pendentes"
+_RESERVADOS = f"{__name__}.reservados"
+
+
+class RegistroAuditoria(Base):
+    __tablename__ = "auditoria"
+    __table_args__ = (Index("ix_auditoria_tabela_chave", "tabela", "chave", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    ocorrido_em: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    tabela: Mapped[str] = mapped_column(String(40), nullable=False)
+    chave: Mapped[str | None] = mapped_column(String(60), nullable=True)
+    operacao: Mapped[str] = mapped_column(String(1), nullable=False)  # I | U | D
+    antes: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON
+    depois: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON
+    autor: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    origem: Mapped[str | None] = mapped_column(String(200), nullable=True)
+
+
+class AuditoriaSaturada(HTTPException):
+    """Buffer de auditoria cheio: o commit é recusado (503) em vez de perder registros."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=503,
+            detail="Auditoria sobrecarregada; tente novamente",
+            headers={"Retry-After": str(RETRY_AFTER_S)},
+        )
+
+
+_DDL = {
+    "postgresql": (
+        """
+        CREATE OR REPLACE FUNCTION auditoria_somente_insercao() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION USING MESSAGE = 'auditoria aceita apenas INSERT (' || TG_OP || ')';
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE TRIGGER tr_auditoria_somente_insercao
+            BEFORE UPDATE OR DELETE OR TRUNCATE ON auditoria
+            FOR EACH STATEMENT EXECUTE FUNCTION auditoria_somente_insercao()
+        """,
+    ),
+    "sqlite": (
+        """
+        CREATE TRIGGER IF NOT EXISTS tr_auditoria_sem_update BEFORE UPDATE ON auditoria
+        BEGIN SELECT RAISE(ABORT, 'auditoria aceita apenas INSERT'); END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tr_auditoria_sem_delete BEFORE DELETE ON auditoria
+        BEGIN SELECT RAISE(ABORT, 'auditoria aceita apenas INSERT'); END
+        """,
+    ),
+}
+
+
+def instalar_auditoria(engine: Engine) -> None:
+    """Cria os triggers que tornam `auditoria` somente-inserção (DDL idempotente)."""
+    with engine.begin() as conn:
+        for ddl in _DDL.get(engine.dialect.name, ()):
+            conn.exec_driver_sql(ddl)
+
+
+# ---- captura (eventos da Session) ----
+
+
+def _colunas(mapper: Mapper) -> list[str]:
+    return [p.key for p in mapper.column_attrs if p.key not in IGNORADAS]
+
+
+def _pk(mapper: Mapper) -> list[str]:
+    return [mapper.get_property_by_column(c).key for c in mapper.primary_key]
+
+
+def _de_objeto(obj: Any, colunas: list[str]) -> dict[str, Any]:
+    # Só os atributos carregados: nunca dispara um SELECT (objeto pode ter sido removido).
+    carregados = inspect(obj).dict
+    return {k: carregados[k] for k in colunas if k in carregados}
+
+
+def _registro(
+    mapper: Mapper,
+    chave: tuple,
+    operacao: str,
+    antes: dict[str, Any] | None,
+    depois: dict[str, Any] | None,
+) -> dict[str, Any] | None:
+    if operacao == "U":
+        mudou = [k for k in depois if k in antes and antes[k] != depois[k]]
+        if not mudou:
+            return None
+        antes = {k: antes[k] for k in mudou}
+        depois = {k: depois[k] for k in mudou}
+    return {
+        "tabela": mapper.local_table.name,
+        # INSERT em lote sem RETURNING: o id gerado pelo banco não é conhecido.
+        "chave": None if None in chave else ":".join(str(p) for p in chave),
+        "operacao": operacao,
+        "antes": json.dumps(antes, default=str, ensure_ascii=False) if antes is not None else None,
+        "depois": json.dumps(depois, default=str, ensure_ascii=False) if depois is not None else None,
+    }
+
+
+def _acrescentar(sessao: Session, registros) -> None:
+    sessao.info.setdefault(_PENDENTES, []).extend(r for r in registros if r is not None)
+
+
+# Prefixos das colunas que o hook acrescenta ao RETURNING de UPDATE/DELETE.
+_ANTES, _DEPOIS = "_auditoria_antes_", "_auditoria_depois_"
+
+
+def _linhas(sessao: Session, mapper: Mapper, criterio) -> dict[tuple, dict[str, Any]]:
+    # Linhas atuais por chave primária, travadas até o fim da transação.
+    pk = _pk(mapper)
+    stmt = select(*(getattr(mapper.class_, k) for k in _colunas(mapper)))
+    if criterio is not None:
+        stmt = stmt.where(criterio)
+    linhas = (dict(r._mapping) for r in sessao.execute(stmt.with_for_update()))
+    return {tuple(l[k] for k in pk): l for l in linhas}
+
+
+def _imagens(linhas, mapper: Mapper, prefixo: str) -> dict[tuple, dict[str, Any]]:
+    # Colunas `prefixo + atributo` de cada linha devolvida, por chave primária.
+    colunas, pk = _colunas(mapper), _pk(mapper)
+    imagens = ({k: l._mapping[prefixo + k] for k in colunas} for l in linhas)
+    return {tuple(i[k] for k in pk): i for i in imagens}
+
+
+def _objetos(resultado, mapper: Mapper):
+    # Instâncias devolvidas por `... RETURNING modelo`, sem consumir o resultado do chamador.
+    if isinstance(resultado, CursorResult) and not resultado.returns_rows:
+        return [], resultado
+    congelado = resultado.freeze()
+    objetos = [l[0] for l in congelado().all() if l and isinstance(l[0], mapper.class_)]
+    return objetos, congelado()
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _ao_executar(estado: ORMExecuteState):
+    if not (estado.is_insert or estado.is_update or estado.is_delete):
+        return None
+    mapper = estado.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, AUDITADOS):
+        return None
+    sessao = estado.session
+    colunas = _colunas(mapper)
+
+    if estado.is_insert:
+        objetos, resultado = _objetos(estado.invoke_statement(), mapper)
+        if objetos:
+            _acrescentar(sessao, (
+                _registro(mapper, mapper.primary_key_from_instance(o), "I", None, _de_objeto(o, colunas))
+                for o in objetos
+            ))
+        else:
+            parametros = estado.parameters or estado.statement.compile().params
+            if isinstance(parametros, dict):
+                parametros = [parametros]
+            _acrescentar(sessao, (
+                _registro(mapper, tuple(p.get(k) for k in _pk(mapper)), "I", None,
+                          {k: p[k] for k in colunas if k in p})
+                for p in parametros
+            ))
+        return resultado
+
+    # UPDATE/DELETE: as imagens vêm no RETURNING do próprio comando, sem um
+    # SELECT a mais antes da escrita.
+    stmt = estado.statement
+    depois_cols = [mapper.columns[k].label(_DEPOIS + k) for k in colunas]
+    if estado.is_delete:
+        # DELETE ... RETURNING devolve as linhas removidas: a imagem "antes".
+        stmt = stmt.returning(*(mapper.columns[k].label(_ANTES + k) for k in colunas))
+        antes = None
+    elif sessao.get_bind(mapper=mapper).dialect.name == "postgresql":
+        # A subconsulta lê (e trava) as linhas antes da alteração, no mesmo
+        # comando: UPDATE ... FROM (SELECT ... FOR UPDATE) antes ... RETURNING antes.*, t.*
+        sub = (
+            select(*(mapper.columns[k].label(k) for k in colunas))
+            .where(stmt.whereclause)
+            .with_for_update()
+            .subquery("antes")
+        )
+        juncao = and_(*(mapper.columns[k] == sub.c[k] for k in _pk(mapper)))
+        stmt = stmt.where(juncao).returning(*(sub.c[k].label(_ANTES + k) for k in colunas), *depois_cols)
+        antes = None
+    else:
+        # SQLite: o RETURNING só enxerga a linha já alterada. A leitura prévia
+        # é local (sem round trip de rede) e o banco já está travado para escrita.
+        antes = _linhas(sessao, mapper, stmt.whereclause)
+        stmt = stmt.returning(*depois_cols)
+
+    congelado = estado.invoke_statement(statement=stmt).freeze()
+    linhas = congelado().all()
+    resultado = congelado()
+    resultado.rowcount = len(linhas)  # quem só consulta `rowcount` (ex.: remoção de série)
+    if estado.is_delete:
+        _acrescentar(sessao, (_registro(mapper, k, "D", a, None) for k, a in _imagens(linhas, mapper, _ANTES).items()))
+        return resultado
+    if antes is None:
+        antes = _imagens(linhas, mapper, _ANTES)
+    depois = _imagens(linhas, mapper, _DEPOIS)
+    _acrescentar(sessao, (_registro(mapper, k, "U", antes[k], depois[k]) for k in depois if k in antes))
+    return resultado
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _apos_flush(sessao: Session, _contexto) -> None:
+    # No `after_flush`, `new`/`dirty`/`deleted` e o histórico ainda são os do flush.
+    for obj in sessao.new:
+        if isinstance(obj, AUDITADOS):
+            mapper = inspect(obj).mapper
+            chave = mapper.primary_key_from_instance(obj)
+            _acrescentar(sessao, [_registro(mapper, chave, "I", None, _de_objeto(obj, _colunas(mapper)))])
+    for obj in sessao.dirty:
+        if isinstance(obj, AUDITADOS):
+            estado = inspect(obj)
+            antes, depois = {}, {}
+            for k in _colunas(estado.mapper):
+                historico = estado.attrs[k].history
+                if historico.added:
+                    antes[k] = historico.deleted[0] if historico.deleted else None
+                    depois[k] = historico.added[0]
+            if depois:
+                chave = estado.mapper.primary_key_from_instance(obj)
+                _acrescentar(sessao, [_registro(estado.mapper, chave, "U", antes, depois)])
+    for obj in sessao.deleted:
+        if isinstance(obj, AUDITADOS):
+            mapper = inspect(obj).mapper
+            chave = mapper.primary_key_from_instance(obj)
+            _acrescentar(sessao, [_registro(mapper, chave, "D", _de_objeto(obj, _colunas(mapper)), None)])
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _antes_do_commit(sessao: Session) -> None:
+    sessao.flush()  # o flush final do commit também gera registros
+    n = len(sessao.info.get(_PENDENTES, ()))
+    if n and not gravador.da_clinica(sessao.info.get("clinica")).reservar(n, ESPERA_S):
+        raise AuditoriaSaturada()
+    sessao.info[_RESERVADOS] = n
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apos_commit(sessao: Session) -> None:
+    registros = sessao.info.pop(_PENDENTES, None)
+    reservados = sessao.info.pop(_RESERVADOS, 0)
+    if not registros:
+        return
+    quando = datetime.utcnow()
+    clinica, autor, origem = (sessao.info.get(k) for k in ("clinica", "autor", "origem"))
+    for r in registros:
+        r.update(ocorrido_em=quando, autor=autor, origem=origem, clinica=clinica)
+    gravador.da_clinica(clinica).publicar(registros, reservados)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _apos_rollback(sessao: Session) -> None:
+    sessao.info.pop(_PENDENTES, None)
+    gravador.da_clinica(sessao.info.get("clinica")).liberar(sessao.info.pop(_RESERVADOS, 0))
+
+
+# ---- gravação (buffer + thread) ----
+
+
+class GravadorAuditoria:
+    """Buffer limitado de registros confirmados + thread que os grava em lotes (um shard)."""
+
+    def __init__(self, shard: str = SHARD_PRINCIPAL, capacidade: int = BUFFER_MAX) -> None:
+        self.shard = shard
+        self.capacidade = capacidade
+        raiz, ext = os.path.splitext(RESERVA)
+        self.reserva = RESERVA if shard == SHARD_PRINCIPAL else f"{raiz}.{shard}{ext}"
+        self._itens: deque[dict[str, Any]] = deque()
+        self._reservados = 0
+        self._gravados = 0
+        self._falhas = 0
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---- lado das sessões ----
+
+    def reservar(self, n: int, espera_s: float) -> bool:
+        """Reserva lugar para `n` registros; `False` se o buffer seguiu cheio por `espera_s`."""
+        if self._thread is None:
+            return True  # fora do app (scripts): `publicar` grava na hora
+        with self._cond:
+            # Uma transação maior que o buffer inteiro entra quando ele esvazia.
+            cabe = lambda: (
+                (not self._itens and not self._reservados)
+                or len(self._itens) + self._reservados + n <= self.capacidade
+            )
+            if not self._cond.wait_for(cabe, timeout=espera_s):
+                return False
+            self._reservados += n
+            return True
+
+    def publicar(self, registros: list[dict[str, Any]], reservados: int) -> None:
+        if self._thread is None:
+            self._inserir(registros)
+            return
+        with self._cond:
+            self._reservados -= reservados
+            self._itens.extend(registros)
+            if len(self._itens) >= LOTE:
+                self._cond.notify_all()
+
+    def liberar(self, reservados: int) -> None:
+        if reservados:
+            with self._cond:
+                self._reservados -= reservados
+                self._cond.notify_all()
+
+    def metricas(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "buffer": len(self._itens),
+                "reservados": self._reservados,
+                "capacidade": self.capacidade,
+                "gravados": self._gravados,
+                "falhas": self._falhas,
+            }
+
+    # ---- ciclo de vida ----
+
+    def iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        self._recuperar_reserva()
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._rodar, name=f"auditoria-{self.shard}", daemon=True)
+        self._thread.start()
+
+    def encerrar(self, espera_s: float = 30.0) -> None:
+        """Grava o buffer até o fim (ou o despeja em `RESERVA`) e para a thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._cond:
+            self._parar.set()
+            self._cond.notify_all()
+        thread.join(timeout=espera_s)
+        if thread.is_alive():  # banco travado: não segura o desligamento
+            logger.error("Gravação da auditoria não terminou em %.0fs", espera_s)
+            with self._cond:
+                self._salvar_reserva(list(self._itens))
+                self._itens.clear()
+        self._thread = None
+
+    # ---- thread de gravação ----
+
+    def _rodar(self) -> None:
+        falhas_seguidas = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: len(self._itens) >= LOTE or self._parar.is_set(), timeout=INTERVALO_S
+                )
+                # Só esta thread retira do buffer: o lote sai depois de gravado.
+                lote = list(islice(self._itens, LOTE))
+            if not lote:
+                if self._parar.is_set():
+                    return
+                continue
+            try:
+                self._inserir(lote)
+            except Exception:
+                falhas_seguidas += 1
+                with self._cond:
+                    self._falhas += 1
+                logger.exception("Falha ao gravar %d registros de auditoria", len(lote))
+                if self._parar.is_set():
+                    with self._cond:
+                        self._salvar_reserva(list(self._itens))
+                        self._itens.clear()
+                        self._cond.notify_all()
+                    return
+                self._parar.wait(min(0.5 * 2**falhas_seguidas, NOVA_TENTATIVA_MAX_S))
+                continue
+            falhas_seguidas = 0
+            with self._cond:
+                # `encerrar` pode ter despejado o buffer em `RESERVA` enquanto isso.
+                for _ in range(min(len(lote), len(self._itens))):
+                    self._itens.popleft()
+                self._gravados += len(lote)
+                self._cond.notify_all()
+
+    def _inserir(self, registros: list[dict[str, Any]]) -> None:
+        por_clinica: dict[str | None, list[dict[str, Any]]] = {}
+        for r in registros:
+            linha = dict(r)
+            por_clinica.setdefault(linha.pop("clinica", None), []).append(linha)
+        with shards[self.shard].begin() as conn:
+            for clinica, linhas in por_clinica.items():
+                usar_clinica(conn, clinica)
+                conn.execute(insert(RegistroAuditoria), linhas)
+
+    # ---- reserva em disco (desligamento com o banco fora) ----
+
+    def _salvar_reserva(self, registros: list[dict[str, Any]]) -> None:
+        if not registros:
+            return
+        with open(self.reserva, "a", encoding="utf-8") as f:
+            for r in registros:
+                f.write(json.dumps({**r, "ocorrido_em": r["ocorrido_em"].isoformat()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        logger.error("%d registros de auditoria salvos em %s", len(registros), self.reserva)
+
+    def _recuperar_reserva(self) -> None:
+        if not os.path.exists(self.reserva):
+            return
+        try:
+            with open(self.reserva, encoding="utf-8") as f:
+                registros = [json.loads(l) for l in f if l.strip()]
+            for r in registros:
+                r["ocorrido_em"] = datetime.fromisoformat(r["ocorrido_em"])
+            if registros:
+                self._inserir(registros)  # uma transação: tudo ou nada
+        except Exception:  # fica para o próximo start
+            logger.exception("Falha ao gravar a reserva de auditoria %s", self.reserva)
+            return
+        os.remove(self.reserva)
+        logger.info("%d registros de auditoria recuperados de %s", len(registros), self.reserva)
+
+
+class GravadoresAuditoria:
+    """Um `GravadorAuditoria` por shard, com o ciclo de vida de todos."""
+
+    def __init__(self) -> None:
+        self.por_shard = {shard: GravadorAuditoria(shard) for shard in shards}
+
+    def da_clinica(self, clinica: str | None) -> GravadorAuditoria:
+        return self.por_shard[shard_da_clinica(clinica)]
+
+    def iniciar(self) -> None:
+        for g in self.por_shard.values():
+            g.iniciar()
+
+    def encerrar(self, espera_s: float = 30.0) -> None:
+        for g in self.por_shard.values():
+            g.encerrar(espera_s)
+
+    def metricas(self) -> dict[str, dict[str, int]]:
+        return {shard: g.metricas() for shard, g in self.por_shard.items()}
+
+
+# Gravadores do processo; as threads sobem no `lifespan` (ver `app/main.py`).
+gravador = GravadoresAuditoria()
@@ -0,0 +1,80 @@
+"""Busca textual (full-text) do serviço de Pacientes.
+
+Cirurgias (`nome` + `observacoes`), medicações (`nome`) e alergias (`agente`)
+ganham uma coluna `busca` (tsvector com stemming `portuguese`) gerada pelo
+próprio Postgres, mantida em todo INSERT/UPDATE sem código nas rotas, e
+indexada com GIN. Como o projeto ainda usa `create_all` (sem migrations), a
+instalação é um DDL idempotente executado no start, cobrindo também tabelas
+existentes. Em bancos que não são PostgreSQL a busca fica indisponível.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Session
+
+__all__ = ["instalar_busca_textual", "busca_disponivel", "buscar_registros_clinicos"]
+
+# Marcação do trecho: o termo encontrado vem entre <mark></mark>.
+OPCOES_TRECHO = "StartSel=<mark>, StopSel=</mark>, MaxWords=25, MinWords=8, MaxFragments=2"
+
+# tabela → expressão tsvector (texto principal com peso A, complementar com B)
+_COLUNAS_BUSCA = {
+    "cirurgias": (
+        "setweight(to_tsvector('portuguese', coalesce(nome, '')), 'A') || "
+        "setweight(to_tsvector('portuguese', coalesce(observacoes, '')), 'B')"
+    ),
+    "medicacoes": "setweight(to_tsvector('portuguese', coalesce(nome, '')), 'A')",
+    "alergias": "setweight(to_tsvector('portuguese', coalesce(agente, '')), 'A')",
+}
+
+# Uma única ida ao banco para as três tabelas; o `ts_headline` (caro) só roda
+# para as linhas da página, depois do LIMIT.
+_SQL_BUSCA = text(
+    """
+    WITH q AS (SELECT websearch_to_tsquery('portuguese', :q) AS q)
+    SELECT h.tipo, h.id, h.paciente_cpf, h.rank,
+           ts_headline('portuguese', h.texto, q.q, :opcoes) AS trecho
+    FROM (
+        SELECT 'cirurgia' AS tipo, t.id, t.paciente_cpf,
+               concat_ws(' — ', t.nome, t.observacoes) AS texto,
+               ts_rank_cd(t.busca, q.q) AS rank
+        FROM cirurgias t, q WHERE t.busca @@ q.q
+        UNION ALL
+        SELECT 'medicacao', t.id, t.paciente_cpf, t.nome, ts_rank_cd(t.busca, q.q)
+        FROM medicacoes t, q WHERE t.busca @@ q.q
+        UNION ALL
+        SELECT 'alergia', t.id, t.paciente_cpf, t.agente, ts_rank_cd(t.busca, q.q)
+        FROM alergias t, q WHERE t.busca @@ q.q
+        ORDER BY rank DESC, tipo, id DESC
+        LIMIT :limit OFFSET :offset
+    ) h, q
+    ORDER BY h.rank DESC, h.tipo, h.id DESC
+    """
+)
+
+
+def instalar_busca_textual(engine: Engine) -> None:
+    """Cria (se preciso) as colunas tsvector geradas e os índices GIN."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for tabela, expr in _COLUNAS_BUSCA.items():
+            conn.exec_driver_sql(
+                f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS busca tsvector "
+                f"GENERATED ALWAYS AS ({expr}) STORED"
+            )
+            conn.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{tabela}_busca ON {tabela} USING gin (busca)"
+            )
+
+
+def busca_disponivel(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def buscar_registros_clinicos(db: Session, q: str, limit: int, offset: int) -> list[Row]:
+    """Cirurgias, medicações e alergias que casam com `q`, por relevância."""
+    params = {"q": q, "opcoes": OPCOES_TRECHO, "limit": limit, "offset": offset}
+    return list(db.execute(_SQL_BUSCA, params))
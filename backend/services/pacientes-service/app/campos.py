@@ -0,0 +1,44 @@
+"""Seleção esparsa de campos (`?fields=`) nas listagens do serviço de Pacientes.
+
+`?fields=cpf,nome_completo` reduz tanto a projeção SQL (só as colunas pedidas
+são lidas) quanto a resposta serializada. Os nomes aceitos são os do schema
+de saída da rota.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+
+__all__ = ["colunas_do_schema", "selecionar_campos", "projetar"]
+
+
+def colunas_do_schema(schema: type[BaseModel], modelo: type) -> dict[str, Any]:
+    """Mapeia cada campo de saída (pelo alias, se houver) para a coluna ORM."""
+    return {
+        (info.alias or nome): getattr(modelo, nome)
+        for nome, info in schema.model_fields.items()
+    }
+
+
+def selecionar_campos(fields: str | None, colunas: dict[str, Any]) -> dict[str, Any] | None:
+    """Valida `fields` (lista separada por vírgulas); `None` se não informado."""
+    if not fields:
+        return None
+    nomes = list(dict.fromkeys(n.strip() for n in fields.split(",") if n.strip()))
+    desconhecidos = [n for n in nomes if n not in colunas]
+    if not nomes or desconhecidos:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Campos inválidos em `fields`: {', '.join(desconhecidos) or '(vazio)'}. "
+            f"Permitidos: {', '.join(colunas)}",
+        )
+    return {n: colunas[n] for n in nomes}
+
+
+def projetar(colunas: dict[str, Any]) -> Select:
+    """`SELECT` apenas das colunas indicadas, rotuladas com o nome de saída."""
+    return select(*(col.label(nome) for nome, col in colunas.items()))
@@ -0,0 +1,90 @@
+"""Compressão negociada (brotli/gzip) das respostas do serviço de Pacientes.
+
+Middleware ASGI: respostas com corpo único a partir de `minimo` bytes são
+comprimidas com brotli quando o cliente aceita `br`, senão com gzip. Corpos
+pequenos, respostas em streaming (`more_body`) e respostas já codificadas
+passam intactos.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = ["CompressaoMiddleware", "escolher_codificacao"]
+
+MINIMO_BYTES = int(os.getenv("COMPRESSAO_MINIMO_BYTES", "1024"))
+
+
+def escolher_codificacao(accept_encoding: str) -> str | None:
+    """Escolhe `br` ou `gzip` conforme o `Accept-Encoding` (ignora `q=0`)."""
+    aceitas = set()
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceitas.add(token.strip().lower())
+    if "br" in aceitas:
+        return "br"
+    if "gzip" in aceitas or "*" in aceitas:
+        return "gzip"
+    return None
+
+
+def _comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        # Qualidade 4: boa taxa para JSON com custo de CPU próximo ao gzip 6.
+        return brotli.compress(corpo, quality=4)
+    return gzip.compress(corpo, compresslevel=6)
+
+
+class CompressaoMiddleware:
+    def __init__(self, app: ASGIApp, minimo: int = MINIMO_BYTES) -> None:
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacao = escolher_codificacao(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Message | None = None
+        repassando = False
+
+        async def _send(message: Message) -> None:
+            nonlocal inicio, repassando
+            if repassando:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                inicio = message  # adiado até conhecer o corpo
+                return
+
+            corpo = message.get("body", b"")
+            headers = MutableHeaders(raw=inicio["headers"])
+            if (
+                message.get("more_body", False)
+                or len(corpo) < self.minimo
+                or "content-encoding" in headers
+            ):
+                repassando = True
+                await send(inicio)
+                await send(message)
+                return
+
+            comprimido = _comprimir(corpo, codificacao)
+            headers["Content-Encoding"] = codificacao
+            headers["Content-Length"] = str(len(comprimido))
+            headers.add_vary_header("Accept-Encoding")
+            await send(inicio)
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, _send)
@@ -2,27 +2,270 @@
 #
 # Expõe o `engine` (pool/conexão) e a dependência `get_sessao` para o FastAPI,
 # abrindo uma sessão por request e garantindo o fechamento ao final.
+#
+# Réplicas de leitura (opcional): se `DATABASE_REPLICA_URLS` (URLs separadas
+# por vírgula) estiver definida, requests GET/HEAD (e POSTs só de leitura, como
+# `:batchGet`) usam uma réplica escolhida em round-robin; réplicas que falham
+# ficam fora por `DATABASE_REPLICA_RETRY_S` segundos e a leitura cai no
+# primário. Após uma escrita, o cliente recebe o cookie `le_primario` e lê do
+# primário por `READ_YOUR_WRITES_S` segundos (read-your-writes enquanto a
+# réplica alcança o primário).
+#
+# Multi-clínica (opcional): com `CLINICAS` definida (`clinica=shard,...`), cada
+# request pertence a uma clínica — cabeçalho `X-Clinica` (ou `?clinica=`, para
+# o EventSource do navegador, que não envia cabeçalhos; na falta de ambos,
+# `CLINICA_PADRAO`). Os dados de cada clínica ficam no schema `clinica_<id>`
+# do seu shard, e as chaves (`pacientes.cpf`, ids, `Idempotency-Key`...) valem
+# por clínica. Shards são bancos (`DATABASE_SHARDS`: `nome=url,...`; o
+# `principal` é o `DATABASE_URL`), cada um com seu engine e pool: uma clínica
+# grande num shard não disputa conexões com as dos outros. Nova clínica:
+# acrescentar em `CLINICAS` (schema e tabelas são criados no start); novo nó:
+# acrescentar em `DATABASE_SHARDS`. Réplicas de leitura valem para o principal.
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from __future__ import annotations
+
+import itertools
 import os
+import re
+import threading
+import time
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import HTTPConnection
 
 # Lê a URL do banco do ambiente (docker-compose define `DATABASE_URL`).
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "postgresql+psycopg://pacientes:pacientes@db_pacientes:5432/pacientes_db"
 )
+REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_RETRY_S = float(os.getenv("DATABASE_REPLICA_RETRY_S", "30"))
+READ_YOUR_WRITES_S = int(os.getenv("READ_YOUR_WRITES_S", "5"))
+STICKY_COOKIE = "le_primario"
+_METODOS_LEITURA = {"GET", "HEAD"}
+# POSTs que só leem (a lista de CPFs não cabe na query string): tratados como
+# GET, sem o cookie `le_primario` — a Agenda chama `:batchGet` a cada render.
+_POSTS_LEITURA = (":batchGet",)
+
+
+def _pares(valor: str) -> dict[str, str]:
+    # "a=x,b=y" → {"a": "x", "b": "y"} (o valor pode conter `=`, como numa URL)
+    pares = {}
+    for item in valor.split(","):
+        if item.strip():
+            nome, _, v = item.partition("=")
+            pares[nome.strip()] = v.strip()
+    return pares
+
+
+SHARD_PRINCIPAL = "principal"
+SHARD_URLS = _pares(os.getenv("DATABASE_SHARDS", ""))
+CLINICAS = _pares(os.getenv("CLINICAS", ""))  # clínica → shard
+CLINICA_PADRAO = os.getenv("CLINICA_PADRAO") or None
+CLINICA_CABECALHO = "x-clinica"
+_CLINICA_ID = re.compile(r"^[a-z0-9_]{1,40}$")
 
 # Engine = conexão de baixo nível (pool de conexões)
 engine = create_engine(DATABASE_URL)
 
+
+# SQLite (ex.: modo embarcado, um único processo): WAL deixa leituras
+# concorrentes com a escrita, `busy_timeout` faz escritas simultâneas esperarem
+# a vez em vez de falhar, e `foreign_keys` liga as FKs (desligadas por padrão
+# no SQLite) das quais dependem os 404 e as ações ON DELETE.
+def _pragmas_sqlite(dbapi_conn, _registro):
+    cur = dbapi_conn.cursor()
+    for pragma in ("journal_mode=WAL", "synchronous=NORMAL", "foreign_keys=ON", "busy_timeout=5000"):
+        cur.execute(f"PRAGMA {pragma}")
+    cur.close()
+
+
+# Um engine (e pool) por shard; sem `DATABASE_SHARDS`, só o principal.
+shards: dict[str, Engine] = {SHARD_PRINCIPAL: engine}
+shards.update({nome: create_engine(url) for nome, url in SHARD_URLS.items()})
+
+for _eng in shards.values():
+    if _eng.dialect.name == "sqlite":
+        event.listen(_eng, "connect", _pragmas_sqlite)
+
+# Um engine (e pool) por réplica; vazio quando não há réplicas configuradas.
+replica_engines: list[Engine] = [create_engine(u) for u in REPLICA_URLS]
+
 # SessionLocal = fábrica de sessões (transações)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# `expire_on_commit=False`: as instâncias devolvidas por INSERT/UPDATE ... RETURNING
+# (ver `escrita.py`) seguem válidas após o commit, sem um SELECT de recarga.
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+
+
+def esquema_da_clinica(clinica: str) -> str:
+    return f"clinica_{clinica}"
+
+
+def _search_path(conn: Connection, esquema: str) -> None:
+    # Cursor próprio do driver: alheio às opções da conexão (ex.: `yield_per`
+    # das exportações, que abriria um cursor no servidor para o SET).
+    cur = conn.connection.cursor()
+    try:
+        cur.execute(f'SET LOCAL search_path TO "{esquema}"')
+    finally:
+        cur.close()
+
+
+def _fixar_esquema(conn: Connection) -> None:
+    # Cada transação de uma clínica enxerga só o schema dela. `SET LOCAL` é
+    # desfeito no fim da transação, antes de a conexão voltar ao pool do shard.
+    esquema = conn.get_execution_options().get("esquema")
+    if esquema is not None:
+        _search_path(conn, esquema)
+
+
+def _montar_engine(clinica: str, shard: str) -> Engine:
+    if not _CLINICA_ID.match(clinica):
+        raise RuntimeError(f"CLINICAS: identificador inválido {clinica!r} (use a-z, 0-9 e _)")
+    if shard not in shards:
+        raise RuntimeError(f"CLINICAS: shard {shard!r} da clínica {clinica!r} não está em DATABASE_SHARDS")
+    base = shards[shard]
+    if base.dialect.name == "postgresql":
+        # Mesmo pool do shard; muda só o schema de cada transação.
+        return base.execution_options(esquema=esquema_da_clinica(clinica))
+    if list(CLINICAS.values()).count(shard) > 1:
+        raise RuntimeError(f"CLINICAS: o shard {shard!r} ({base.dialect.name}, sem schemas) comporta uma clínica")
+    return base
+
+
+if CLINICAS:
+    for _eng in [*shards.values(), *replica_engines]:
+        if _eng.dialect.name == "postgresql":
+            event.listen(_eng, "begin", _fixar_esquema)
 
-def get_sessao():
+_engines_clinicas: dict[str, Engine] = {c: _montar_engine(c, s) for c, s in CLINICAS.items()}
+
+
+def clinica_do_request(req: HTTPConnection) -> str | None:
+    """Clínica do request; `None` sem multi-clínica (`CLINICAS` vazia)."""
+    if not CLINICAS:
+        return None
+    clinica = req.headers.get(CLINICA_CABECALHO) or req.query_params.get("clinica") or CLINICA_PADRAO
+    if not clinica:
+        raise HTTPException(status_code=400, detail="Clínica não informada (cabeçalho X-Clinica)")
+    if clinica not in CLINICAS:
+        raise HTTPException(status_code=404, detail="Clínica não encontrada")
+    return clinica
+
+
+def engine_da_clinica(clinica: str | None) -> Engine:
+    return engine if clinica is None else _engines_clinicas[clinica]
+
+
+def shard_da_clinica(clinica: str | None) -> str:
+    return SHARD_PRINCIPAL if clinica is None else CLINICAS[clinica]
+
+
+def engines_das_clinicas() -> dict[str | None, Engine]:
+    """Engine de cada clínica; `{None: engine}` sem multi-clínica."""
+    return dict(_engines_clinicas) if CLINICAS else {None: engine}
+
+
+def usar_clinica(conn: Connection, clinica: str | None) -> None:
+    """Aponta a transação corrente de uma conexão do shard para a clínica."""
+    if clinica is not None and conn.dialect.name == "postgresql":
+        _search_path(conn, esquema_da_clinica(clinica))
+
+
+def criar_esquema(clinica: str | None) -> None:
+    """Cria o schema da clínica no seu shard (idempotente)."""
+    base = shards[shard_da_clinica(clinica)]
+    if clinica is not None and base.dialect.name == "postgresql":
+        with base.begin() as conn:
+            conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{esquema_da_clinica(clinica)}"')
+
+
+# Estado de saúde das réplicas: índice → instante (monotonic) até o qual fica fora.
+_rr = itertools.count()
+_fora_ate: dict[int, float] = {}
+_lock = threading.Lock()
+
+
+def _marcar_fora(i: int) -> None:
+    with _lock:
+        _fora_ate[i] = time.monotonic() + REPLICA_RETRY_S
+
+
+def _monitorar_erros(i: int, eng: Engine) -> None:
+    # Desconexões no meio de um request também tiram a réplica de rotação.
+    @event.listens_for(eng, "handle_error")
+    def _on_error(ctx):  # pragma: no cover - depende de falha real de rede
+        if ctx.is_disconnect:
+            _marcar_fora(i)
+
+
+for _i, _eng in enumerate(replica_engines):
+    _monitorar_erros(_i, _eng)
+
+
+def _conectar_replica(esquema: str | None = None) -> Connection | None:
+    """Obtém uma conexão de réplica saudável em round-robin, ou `None`.
+
+    Réplicas em quarentena são puladas; ao expirar a quarentena a réplica é
+    testada com `SELECT 1` antes de voltar à rotação. `esquema` (multi-clínica)
+    é fixado antes de qualquer comando, para que o `begin` de toda transação
+    da conexão aplique o `search_path` da clínica.
+    """
+    n = len(replica_engines)
+    for _ in range(n):
+        i = next(_rr) % n
+        with _lock:
+            fora_ate = _fora_ate.get(i)
+        if fora_ate is not None and fora_ate > time.monotonic():
+            continue
+        try:
+            conn = replica_engines[i].connect()
+            if esquema is not None:
+                conn.execution_options(esquema=esquema)
+            if fora_ate is not None:
+                conn.exec_driver_sql("SELECT 1")
+                # Encerra a transação do teste: a da sessão começa do zero.
+                conn.rollback()
+                with _lock:
+                    _fora_ate.pop(i, None)
+            return conn
+        except DBAPIError:
+            _marcar_fora(i)
+    return None
+
+
+def _somente_leitura(request: Request) -> bool:
+    if request.method in _METODOS_LEITURA:
+        return True
+    return request.method == "POST" and request.url.path.endswith(_POSTS_LEITURA)
+
+
+def get_sessao(request: Request, response: Response):
     # Dependency do FastAPI: abre uma sessão por request e fecha ao final.
-    db = SessionLocal()
+    # Leituras vão para uma réplica (se houver e o cliente não estiver "grudado"
+    # no primário); escritas vão ao primário e renovam o cookie de stickiness.
+    clinica = clinica_do_request(request)
+    conn = None
+    if _somente_leitura(request):
+        # Réplicas são do shard principal (de onde vêm os schemas das clínicas dele).
+        no_principal = shard_da_clinica(clinica) == SHARD_PRINCIPAL
+        if replica_engines and no_principal and not request.cookies.get(STICKY_COOKIE):
+            conn = _conectar_replica(esquema_da_clinica(clinica) if clinica is not None else None)
+    elif replica_engines:
+        response.set_cookie(STICKY_COOKIE, "1", max_age=READ_YOUR_WRITES_S, httponly=True)
+
+    db = SessionLocal(bind=conn if conn is not None else engine_da_clinica(clinica))
+    db.info["clinica"] = clinica
+    # Quem/de onde, para a trilha de auditoria (ver `app/auditoria.py`).
+    db.info["autor"] = request.headers.get("x-usuario")
+    db.info["origem"] = f"{request.method} {request.url.path}"
     try:
         yield db
     finally:
         db.close()
+        if conn is not None:
+            conn.close()
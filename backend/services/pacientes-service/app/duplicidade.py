@@ -0,0 +1,405 @@
+"""Detecção de pacientes duplicados do serviço de Pacientes.
+
+Como o paciente é identificado só pelo CPF, a mesma pessoa às vezes é
+cadastrada duas vezes (ex.: como dependente, via `responsavel_cpf`, e depois
+com o próprio CPF). Comparar todos os nomes com todos é O(n²); aqui a
+comparação fica restrita a *blocos* de candidatos, definidos por chaves
+fonéticas do nome gravadas no próprio paciente e indexadas:
+
+- bloco `nome`: (fonética do primeiro nome, fonética do último sobrenome);
+- bloco `nascimento`: (data de nascimento, fonética do primeiro nome), que
+  pega sobrenomes trocados ou omitidos.
+
+Só os pares de um mesmo bloco são pontuados (`pontuar`: semelhança dos nomes
+normalizados + proximidade das datas de nascimento). Pares ligados
+diretamente por `responsavel_cpf` (pai/mãe e filho) não contam.
+
+Usos:
+- `candidatos(...)`: no cadastro, uma consulta indexada por bloco; o
+  `POST /api/v1/pacientes` devolve os suspeitos em `possiveis_duplicatas`
+  (aviso; o cadastro não é bloqueado);
+- `detectar_duplicidades(...)`: relatório em lote (job `duplicidades`, ver
+  `app/tarefas.py`). Percorre a tabela na ordem de cada índice de bloco, um
+  bloco por vez em memória, e grava os pares em `duplicidades`
+  (`GET /api/v1/pacientes/duplicidades`).
+
+Pacientes gravados antes destas colunas ficam sem chave até a primeira
+execução do relatório, que as preenche.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Any, Callable, Iterable, Iterator
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    String,
+    bindparam,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from .models import Base, Paciente
+
+__all__ = [
+    "Duplicidade",
+    "Candidato",
+    "chaves_bloqueio",
+    "pontuar",
+    "candidatos",
+    "detectar_duplicidades",
+    "instalar_duplicidade",
+]
+
+LIMIAR = float(os.getenv("DUPLICIDADE_LIMIAR", "0.8"))
+# Blocos grandes (nomes comuns): compara cada paciente só com os `JANELA`
+# vizinhos na ordem (nascimento, nome), em vez de todos os pares. Limita o
+# custo a O(n · JANELA) mesmo com "Maria Silva" repetida milhares de vezes.
+BLOCO_MAX = 60
+JANELA = 20
+# Cadastro: no máximo tantos candidatos do bloco `nome` e tantos suspeitos devolvidos.
+CANDIDATOS_MAX = 200
+SUSPEITOS_MAX = 5
+LOTE = 5000
+
+_CONECTIVOS = {"D", "DA", "DE", "DI", "DO", "DAS", "DOS", "E"}
+_SUFIXOS = {"FILHO", "FILHA", "JUNIOR", "JR", "NETO", "NETA", "SOBRINHO", "SOBRINHA", "SEGUNDO", "II", "III"}
+
+
+class Duplicidade(Base):
+    """Par suspeito encontrado pelo último relatório (`cpf_a` < `cpf_b`)."""
+
+    __tablename__ = "duplicidades"
+
+    cpf_a: Mapped[str] = mapped_column(
+        ForeignKey("pacientes.cpf", ondelete="CASCADE"), primary_key=True
+    )
+    cpf_b: Mapped[str] = mapped_column(
+        ForeignKey("pacientes.cpf", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    pontuacao: Mapped[float] = mapped_column(Float, nullable=False, index=True)
+    motivos: Mapped[str] = mapped_column(String(120), nullable=False)  # separados por vírgula
+    detectado_em: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# ---- normalização e chaves ----
+
+
+def _tokens(nome: str) -> list[str]:
+    """Nome sem acentos, em maiúsculas, sem conectivos (da, de, dos...)."""
+    sem_acento = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    return [t for t in re.findall(r"[A-Z]+", sem_acento.upper()) if t not in _CONECTIVOS]
+
+
+def fonetica(token: str) -> str:
+    """Código fonético simplificado para nomes em português.
+
+    Unifica grafias equivalentes (Souza/Sousa, Thiago/Tiago, Rafael/Raphael,
+    Luiz/Luís, Walter/Valter, Kátia/Cátia) e ignora as vogais internas
+    (Felipe/Filipe). A vogal final fica: distingue Paulo/Paula, Adriano/Adriana.
+    """
+    t = token
+    for de, para in (("PH", "F"), ("TH", "T"), ("LH", "L"), ("NH", "N"), ("CH", "X"), ("SH", "X")):
+        t = t.replace(de, para)
+    t = re.sub(r"SC(?=[EI])", "S", t)
+    t = re.sub(r"C(?=[EI])", "S", t)
+    t = re.sub(r"G(?=[EI])", "J", t)
+    t = t.replace("QU", "K").replace("GU", "G").replace("C", "K").replace("Q", "K")
+    t = t.replace("Z", "S").replace("W", "V").replace("Y", "I").replace("H", "")
+    if not t:
+        return ""
+    if len(t) > 1:
+        t = t[0] + re.sub(r"[AEIOU]", "", t[1:-1]) + t[-1]
+    return re.sub(r"(.)\1+", r"\1", t)
+
+
+def chaves_bloqueio(nome: str) -> dict[str, str]:
+    """Chaves fonéticas a gravar no paciente (colunas `fonetica_*`)."""
+    tokens = _tokens(nome)
+    while len(tokens) > 1 and tokens[-1] in _SUFIXOS:  # "Filho", "Júnior"...
+        tokens.pop()
+    return {
+        "fonetica_nome": fonetica(tokens[0]) if tokens else "",
+        "fonetica_sobrenome": fonetica(tokens[-1]) if len(tokens) > 1 else "",
+    }
+
+
+# ---- pontuação ----
+
+
+@dataclass
+class Candidato:
+    cpf: str
+    nome_completo: str
+    data_nascimento: date | None
+    responsavel_cpf: str | None = None
+    # Calculados uma vez por paciente (o relatório compara cada um várias vezes).
+    tokens: list[str] = field(init=False)
+    nome: str = field(init=False)  # tokens normalizados, unidos
+    fonemas: list[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tokens = _tokens(self.nome_completo)
+        self.nome = " ".join(self.tokens)
+        self.fonemas = [fonetica(t) for t in self.tokens]
+
+
+def _semelhanca_nomes(a: Candidato, b: Candidato) -> float:
+    if a.tokens == b.tokens:
+        return 1.0
+    sm = SequenceMatcher(None, a.nome, b.nome, autojunk=False)
+    sim = sm.ratio() if sm.quick_ratio() >= 0.6 else 0.0
+    if a.fonemas == b.fonemas:  # só grafia diferente (Luiz Sousa × Luís Souza)
+        return max(sim, 0.95)
+    # "Filho"/"Júnior" em só um dos nomes: outra pessoa da família.
+    if bool(_SUFIXOS & set(a.tokens)) != bool(_SUFIXOS & set(b.tokens)):
+        return sim
+    # Nomes do meio omitidos ("Maria Souza" × "Maria Aparecida Souza"): todo
+    # token do nome menor aparece (mesma fonética) no maior.
+    menor, maior = sorted((a.fonemas, b.fonemas), key=len)
+    if len(menor) >= 2 and set(menor) <= set(maior):
+        sim = max(sim, 0.9)
+    return sim
+
+
+def _proximidade_datas(a: date | None, b: date | None) -> tuple[float, str]:
+    if a is None or b is None:
+        return 0.6, "nascimento_ausente"
+    if a == b:
+        return 1.0, "mesmo_nascimento"
+    if _erro_de_digitacao(a.isoformat(), b.isoformat()) or (
+        a.year == b.year and a.month == b.day and a.day == b.month  # dia/mês invertidos
+    ):
+        return 0.5, "nascimento_semelhante"
+    return 0.0, "nascimento_diferente"
+
+
+def _erro_de_digitacao(a: str, b: str) -> bool:
+    """Um dígito trocado (1985 × 1986) ou dois vizinhos invertidos (1985 × 1958)."""
+    difs = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+    if len(difs) == 1:
+        return True
+    i, j = (difs + [0, 0])[:2]
+    return len(difs) == 2 and j == i + 1 and a[i] == b[j] and a[j] == b[i]
+
+
+def pontuar(a: Candidato, b: Candidato, minimo: float = 0.0) -> tuple[float, list[str]]:
+    """Pontuação (0 a 1) de `a` e `b` serem a mesma pessoa, com os motivos.
+
+    Com `minimo`, pares que não podem alcançá-lo só pelas datas voltam com
+    pontuação 0 sem comparar os nomes (a parte cara).
+    """
+    datas, motivo_data = _proximidade_datas(a.data_nascimento, b.data_nascimento)
+    if 0.7 + 0.3 * datas < minimo:
+        return 0.0, []
+    nomes = _semelhanca_nomes(a, b)
+    motivos = ["nome_identico" if nomes == 1.0 else "nome_semelhante", motivo_data]
+    if bool(a.responsavel_cpf) != bool(b.responsavel_cpf):
+        motivos.append("dependente")  # um dos cadastros é de dependente
+    return round(0.7 * nomes + 0.3 * datas, 3), motivos
+
+
+def _parentes(a: Candidato, b: Candidato) -> bool:
+    return a.responsavel_cpf == b.cpf or b.responsavel_cpf == a.cpf
+
+
+# ---- cadastro ----
+
+
+def candidatos(
+    db: Session,
+    nome: str,
+    nascimento: date | None,
+    *,
+    cpf: str | None = None,
+    responsavel_cpf: str | None = None,
+) -> list[tuple[Candidato, float, list[str]]]:
+    """Pacientes suspeitos de serem a mesma pessoa, da maior pontuação à menor."""
+    chaves = chaves_bloqueio(nome)
+    if not chaves["fonetica_nome"]:
+        return []
+    colunas = select(
+        Paciente.cpf, Paciente.nome_completo, Paciente.data_nascimento, Paciente.responsavel_cpf
+    )
+    if cpf:
+        colunas = colunas.where(Paciente.cpf != cpf)
+    # Bloco `nascimento` inteiro (pequeno); do bloco `nome` (pode ter milhares
+    # de "Maria Silva"), no máximo `CANDIDATOS_MAX`. Cada um usa o seu índice.
+    consultas = [
+        colunas.where(
+            Paciente.fonetica_nome == chaves["fonetica_nome"],
+            Paciente.fonetica_sobrenome == chaves["fonetica_sobrenome"],
+        ).limit(CANDIDATOS_MAX)
+    ]
+    if nascimento is not None:
+        consultas.insert(
+            0,
+            colunas.where(
+                Paciente.data_nascimento == nascimento,
+                Paciente.fonetica_nome == chaves["fonetica_nome"],
+            ),
+        )
+    linhas = {linha.cpf: linha for stmt in consultas for linha in db.execute(stmt)}
+    novo = Candidato(cpf or "", nome, nascimento, responsavel_cpf)
+
+    suspeitos = []
+    for linha in linhas.values():
+        outro = Candidato(*linha)
+        if _parentes(novo, outro):
+            continue
+        pontuacao, motivos = pontuar(novo, outro, LIMIAR)
+        if pontuacao >= LIMIAR:
+            suspeitos.append((outro, pontuacao, motivos))
+    suspeitos.sort(key=lambda s: -s[1])
+    return suspeitos[:SUSPEITOS_MAX]
+
+
+# ---- relatório em lote ----
+
+
+def _preencher_chaves(engine: Engine, ao_progresso: Callable[[int], None]) -> int:
+    """Grava as chaves dos pacientes que ainda não as têm (em lotes, por CPF)."""
+    preenchidos, ultimo = 0, ""
+    while True:
+        with engine.begin() as conn:
+            linhas = conn.execute(
+                select(Paciente.cpf, Paciente.nome_completo)
+                .where(Paciente.fonetica_nome.is_(None), Paciente.cpf > ultimo)
+                .order_by(Paciente.cpf)
+                .limit(LOTE)
+            ).all()
+            if not linhas:
+                return preenchidos
+            t = Paciente.__table__
+            conn.execute(
+                update(t)
+                .where(t.c.cpf == bindparam("b_cpf"))
+                .values(fonetica_nome=bindparam("fonetica_nome"), fonetica_sobrenome=bindparam("fonetica_sobrenome")),
+                [{"b_cpf": cpf, **chaves_bloqueio(nome)} for cpf, nome in linhas],
+            )
+        preenchidos += len(linhas)
+        ultimo = linhas[-1].cpf
+        ao_progresso(preenchidos)
+
+
+def _blocos(
+    engine: Engine, ordem: tuple, filtro: Any, chave: Callable[[Any], tuple]
+) -> Iterator[list[Candidato]]:
+    """Percorre os pacientes na ordem de um índice de bloco, um bloco por vez."""
+    stmt = (
+        select(
+            Paciente.cpf,
+            Paciente.nome_completo,
+            Paciente.data_nascimento,
+            Paciente.responsavel_cpf,
+            Paciente.fonetica_nome,
+            Paciente.fonetica_sobrenome,
+        )
+        .where(filtro)
+        .order_by(*ordem)
+    )
+    atual, bloco = None, []
+    with engine.connect() as conn:
+        for linha in conn.execute(stmt, execution_options={"yield_per": LOTE}):
+            k = chave(linha)
+            if k != atual and bloco:
+                yield bloco
+                bloco = []
+            atual = k
+            bloco.append(Candidato(*linha[:4]))
+    if bloco:
+        yield bloco
+
+
+def _pares(bloco: list[Candidato]) -> Iterable[tuple[Candidato, Candidato]]:
+    if len(bloco) <= BLOCO_MAX:
+        return combinations(bloco, 2)
+    # Vizinhança ordenada: cada um contra os `JANELA` seguintes.
+    ordenado = sorted(bloco, key=lambda c: (c.data_nascimento or date.min, c.nome))
+    return (
+        (ordenado[i], ordenado[j])
+        for i in range(len(ordenado))
+        for j in range(i + 1, min(i + 1 + JANELA, len(ordenado)))
+    )
+
+
+def detectar_duplicidades(
+    engine: Engine, ao_progresso: Callable[[int, int | None], None] = lambda n, total: None
+) -> dict[str, Any]:
+    """Relatório completo: grava em `duplicidades` os pares acima de `LIMIAR`."""
+    preenchidos = _preencher_chaves(engine, lambda n: ao_progresso(n, None))
+    with engine.connect() as conn:
+        total = conn.scalar(select(func.count()).select_from(Paciente))
+
+    achados: dict[tuple[str, str], tuple[float, list[str]]] = {}
+    lidos = comparados = 0
+    passagens = (
+        (
+            (Paciente.fonetica_nome, Paciente.fonetica_sobrenome),
+            Paciente.fonetica_nome != "",
+            lambda l: (l.fonetica_nome, l.fonetica_sobrenome),
+        ),
+        (
+            (Paciente.data_nascimento, Paciente.fonetica_nome),
+            Paciente.data_nascimento.is_not(None) & (Paciente.fonetica_nome != ""),
+            lambda l: (l.data_nascimento, l.fonetica_nome),
+        ),
+    )
+    for ordem, filtro, chave in passagens:
+        for bloco in _blocos(engine, ordem, filtro, chave):
+            lidos += len(bloco)
+            for a, b in _pares(bloco):
+                comparados += 1
+                if _parentes(a, b):
+                    continue
+                par = (a.cpf, b.cpf) if a.cpf < b.cpf else (b.cpf, a.cpf)
+                pontuacao, motivos = pontuar(a, b, LIMIAR)
+                if pontuacao >= LIMIAR and pontuacao > achados.get(par, (0.0,))[0]:
+                    achados[par] = (pontuacao, motivos)
+            ao_progresso(lidos, 2 * total)
+
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(delete(Duplicidade))
+        linhas = [
+            {"cpf_a": a, "cpf_b": b, "pontuacao": p, "motivos": ",".join(m), "detectado_em": agora}
+            for (a, b), (p, m) in achados.items()
+        ]
+        for i in range(0, len(linhas), LOTE):
+            conn.execute(insert(Duplicidade), linhas[i : i + LOTE])
+    return {
+        "pacientes": total,
+        "chaves_preenchidas": preenchidos,
+        "pares_comparados": comparados,
+        "duplicidades": len(achados),
+    }
+
+
+# ---- instalação ----
+
+
+def instalar_duplicidade(engine: Engine) -> None:
+    """Adiciona (se preciso) as colunas de chave em bancos existentes e os índices."""
+    with engine.begin() as conn:
+        existentes = {c["name"] for c in inspect(conn).get_columns("pacientes")}
+        for coluna in ("fonetica_nome", "fonetica_sobrenome"):
+            if coluna not in existentes:
+                conn.exec_driver_sql(f"ALTER TABLE pacientes ADD COLUMN {coluna} VARCHAR(30)")
+        for indice in Paciente.__table__.indexes:
+            if indice.name in ("ix_pacientes_bloco_nome", "ix_pacientes_bloco_nascimento"):
+                indice.create(conn, checkfirst=True)
@@ -0,0 +1,273 @@
+"""Exportação analítica (Parquet) do serviço de Pacientes.
+
+Copia `pacientes` e as tabelas filhas para arquivos Parquet particionados por
+data (`<destino>/<tabela>/data_particao=AAAA-MM-DD/*.parquet`). Relatórios podem então
+rodar offline (pandas, DuckDB, Spark...) sem consultar os bancos de produção.
+
+Uso:
+    python -m app.exportacao /caminho/destino [--lote 50000] [--atraso-s 60] [--url URL]
+        [--url-primario URL]
+
+- A leitura é em streaming (cursor no servidor, `--lote` linhas por vez); cada
+  lote vira um arquivo, sem carregar a tabela inteira em memória.
+- Execuções são incrementais: `<destino>/_estado.json` guarda a marca d'água
+  por tabela, gravada após cada lote (uma execução interrompida retoma do
+  último lote gravado).
+- `pacientes` avança por `(created_at, cpf)` e é particionada pela data de
+  criação. As tabelas filhas não têm `created_at`: avançam pelo `id` e são
+  particionadas pela data da execução.
+- Os limites de cada execução são lidos sempre no primário, sob um
+  `LOCK ... IN SHARE MODE` curto, que espera as transações de escrita em
+  curso: o maior `id` das filhas e a hora do banco (`created_at` vem do mesmo
+  relógio, no INSERT; ver `agora_utc` em `app/models.py`). Nada abaixo desses
+  limites ainda pode ser confirmado depois, então a marca d'água não pula
+  linhas, sem depender do relógio da aplicação; `--atraso-s` é só uma margem
+  opcional, que recua o corte de `created_at`.
+- Por padrão lê da primeira réplica configurada (`DATABASE_REPLICA_URLS`), se
+  houver; senão do primário. Lendo de uma réplica, a exportação espera que
+  ela reproduza o WAL até a posição do primário no momento do lock, para que
+  tudo até os limites já esteja visível nela.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Numeric, create_engine, func, literal, select, text, tuple_
+from sqlalchemy.engine import Connection, Engine
+
+from .db import engine as engine_primario, replica_engines
+from .models import Alergia, Cirurgia, Medicacao, Paciente, agora_utc
+
+__all__ = ["Tabela", "TABELAS", "exportar"]
+
+ARQUIVO_ESTADO = "_estado.json"
+# Nome próprio: `cirurgias` já tem uma coluna `data`.
+COLUNA_PARTICAO = "data_particao"
+# Espera máxima para a réplica alcançar o primário antes de exportar.
+ESPERA_REPLICA_S = 60.0
+
+
+@dataclass(frozen=True)
+class Tabela:
+    modelo: type
+    # True: incremental por (created_at, pk) e partição pela data de criação.
+    # False: incremental pelo `id` e partição pela data da execução.
+    por_data: bool
+
+
+TABELAS = [
+    Tabela(Paciente, por_data=True),
+    Tabela(Cirurgia, por_data=False),
+    Tabela(Medicacao, por_data=False),
+    Tabela(Alergia, por_data=False),
+]
+
+
+def _tipo_arrow(coluna) -> pa.DataType:
+    if isinstance(coluna.type, Numeric) and coluna.type.scale is not None:
+        return pa.decimal128(coluna.type.precision, coluna.type.scale)
+    tipo = coluna.type.python_type
+    if tipo is bool:
+        return pa.bool_()
+    if tipo is int:
+        return pa.int64()
+    if tipo is float:
+        return pa.float64()
+    if tipo is datetime:
+        return pa.timestamp("us")
+    if tipo is date:
+        return pa.date32()
+    return pa.string()
+
+
+def _ler_estado(destino: str) -> dict[str, Any]:
+    caminho = os.path.join(destino, ARQUIVO_ESTADO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_estado(destino: str, estado: dict[str, Any]) -> None:
+    # Escrita atômica: um arquivo de estado parcial nunca é lido.
+    caminho = os.path.join(destino, ARQUIVO_ESTADO)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, sort_keys=True)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _em_recuperacao(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql" and bool(conn.scalar(text("SELECT pg_is_in_recovery()")))
+
+
+def _limites(primario: Engine) -> tuple[dict[str, int | None], datetime, str | None]:
+    """Maior `id` das tabelas filhas, hora do banco e posição do WAL, sob `SHARE`.
+
+    O lock (no primário) espera as transações de escrita em curso: todo id até
+    o limite já está confirmado, e todo INSERT ainda por vir terá `created_at`
+    posterior à hora lida. Retorna também `pg_current_wal_lsn()`, que uma
+    réplica precisa ter reproduzido para enxergar essas linhas (`None` fora do
+    Postgres).
+    """
+    por_id = [t.modelo.__table__ for t in TABELAS if not t.por_data]
+    with primario.begin() as conn:
+        lsn = None
+        if conn.dialect.name == "postgresql":
+            if _em_recuperacao(conn):
+                raise RuntimeError(
+                    "Limites da exportação exigem o primário (use --url-primario); a conexão é de uma réplica"
+                )
+            nomes = ", ".join(t.modelo.__table__.name for t in TABELAS)
+            conn.exec_driver_sql(f"LOCK TABLE {nomes} IN SHARE MODE")
+            lsn = conn.scalar(text("SELECT pg_current_wal_lsn()::text"))
+        ids = {t.name: conn.scalar(select(func.max(t.c.id))) for t in por_id}
+        return ids, conn.scalar(select(agora_utc())), lsn
+
+
+def _aguardar_replica(eng: Engine, lsn: str | None) -> None:
+    # Sem isso, uma réplica atrasada não teria parte das linhas até os limites
+    # e a marca d'água passaria por cima delas.
+    if lsn is None:
+        return
+    prazo = time.monotonic() + ESPERA_REPLICA_S
+    with eng.connect() as conn:
+        if not _em_recuperacao(conn):
+            return
+        consulta = text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)")
+        while not conn.scalar(consulta, {"lsn": lsn}):
+            conn.rollback()
+            if time.monotonic() > prazo:
+                raise RuntimeError(f"Réplica não alcançou o primário em {ESPERA_REPLICA_S:.0f}s (WAL {lsn})")
+            time.sleep(0.2)
+
+
+def _exportar_tabela(
+    conn: Connection,
+    tab: Tabela,
+    destino: str,
+    estado: dict[str, Any],
+    lote: int,
+    corte: datetime,
+    limite_id: int | None,
+    execucao: datetime,
+    prefixo: str,
+    ao_gravar_lote: Callable[[int], None] | None,
+) -> int:
+    t = tab.modelo.__table__
+    pk = next(iter(t.primary_key.columns))
+    marca = estado.get(t.name)
+
+    stmt = select(*t.columns)
+    if tab.por_data:
+        stmt = stmt.where(t.c.created_at < corte)
+        if marca:
+            ultimo = (literal(datetime.fromisoformat(marca["created_at"])), literal(marca["pk"]))
+            stmt = stmt.where(tuple_(t.c.created_at, pk) > tuple_(*ultimo))
+        stmt = stmt.order_by(t.c.created_at, pk)
+    else:
+        if limite_id is None:
+            return 0
+        stmt = stmt.where(pk <= limite_id)
+        if marca:
+            stmt = stmt.where(pk > marca["pk"])
+        stmt = stmt.order_by(pk)
+
+    campos = [pa.field(c.name, _tipo_arrow(c)) for c in t.columns]
+    schema = pa.schema(campos + [pa.field(COLUNA_PARTICAO, pa.date32())])
+    pasta = os.path.join(destino, t.name)
+
+    total = 0
+    resultado = conn.execution_options(yield_per=lote).execute(stmt)
+    for n, linhas in enumerate(resultado.partitions()):
+        colunas = [pa.array(valores, type=f.type) for valores, f in zip(zip(*linhas), campos)]
+        if tab.por_data:
+            datas = [linha.created_at.date() for linha in linhas]
+        else:
+            datas = [execucao.date()] * len(linhas)
+        tabela = pa.Table.from_arrays(colunas + [pa.array(datas, pa.date32())], schema=schema)
+        pq.write_to_dataset(
+            tabela,
+            root_path=pasta,
+            partition_cols=[COLUNA_PARTICAO],
+            basename_template=f"{prefixo}-{n:05d}-{{i}}.parquet",
+        )
+
+        ultima = linhas[-1]
+        marca = {"pk": getattr(ultima, pk.name)}
+        if tab.por_data:
+            marca["created_at"] = ultima.created_at.isoformat()
+        estado[t.name] = marca
+        _gravar_estado(destino, estado)
+        total += len(linhas)
+        if ao_gravar_lote is not None:
+            ao_gravar_lote(len(linhas))
+    return total
+
+
+def exportar(
+    destino: str,
+    lote: int = 50_000,
+    atraso_s: int = 60,
+    eng: Engine | None = None,
+    ao_gravar_lote: Callable[[int], None] | None = None,
+    primario: Engine | None = None,
+) -> dict[str, int]:
+    """Exporta as linhas novas de cada tabela; retorna quantas por tabela.
+
+    `ao_gravar_lote(n)` é chamado após cada lote gravado (e com a marca
+    d'água já salva), p.ex. para reportar progresso ou interromper a execução.
+    `primario` é onde os limites da execução são lidos (padrão: `eng`, se
+    informado; senão o primário do serviço).
+    """
+    if primario is None:
+        primario = eng if eng is not None else engine_primario
+    if eng is None:
+        eng = replica_engines[0] if replica_engines else engine_primario
+    os.makedirs(destino, exist_ok=True)
+    estado = _ler_estado(destino)
+    limites, execucao, lsn = _limites(primario)
+    corte = execucao - timedelta(seconds=atraso_s)
+    # Prefixo único por execução: lotes de execuções distintas nunca colidem.
+    prefixo = f"{execucao:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    if eng is not primario:
+        _aguardar_replica(eng, lsn)
+
+    exportadas = {}
+    with eng.connect() as conn:
+        for tab in TABELAS:
+            nome = tab.modelo.__table__.name
+            exportadas[nome] = _exportar_tabela(
+                conn, tab, destino, estado, lote, corte, limites.get(nome), execucao, prefixo, ao_gravar_lote
+            )
+    return exportadas
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporta dados clínicos para Parquet (incremental).")
+    parser.add_argument("destino", help="Diretório de saída (local ou volume montado)")
+    parser.add_argument("--lote", type=int, default=50_000, help="Linhas por lote/arquivo")
+    parser.add_argument("--atraso-s", type=int, default=60, help="Margem: ignora linhas mais novas que isto")
+    parser.add_argument("--url", default=None, help="URL do banco (padrão: réplica, se houver)")
+    parser.add_argument(
+        "--url-primario", default=None, help="URL do primário, para os limites (padrão: --url, se houver)"
+    )
+    args = parser.parse_args(argv)
+
+    eng = create_engine(args.url) if args.url else None
+    primario = create_engine(args.url_primario) if args.url_primario else None
+    for nome, n in exportar(args.destino, args.lote, args.atraso_s, eng, primario=primario).items():
+        print(f"{nome}: {n} linha(s) exportada(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Chaves de idempotência (`Idempotency-Key`) nos POSTs do serviço de Pacientes.
+
+Middleware ASGI: um POST com o cabeçalho `Idempotency-Key` reserva a chave em
+`chaves_idempotencia` antes de executar a rota e grava a resposta ao final.
+Repetições com a mesma chave recebem a resposta original (com
+`Idempotent-Replayed: true`) sem executar a escrita de novo:
+
+- chave concluída: a resposta gravada é devolvida na hora;
+- chave em andamento (duplicata concorrente): o request espera a execução
+  original terminar (até `IDEMPOTENCIA_ESPERA_S`) e devolve a mesma resposta,
+  ou 409 com `Retry-After` se ela demorar demais;
+- mesma chave com outro método/caminho/corpo: 422.
+
+Respostas 3xx/5xx e exceções liberam a chave, para que a nova tentativa
+execute (um redirect não é a resposta da escrita).
+O corpo é guardado comprimido (zlib) e cada chave expira após
+`IDEMPOTENCIA_TTL_S`; uma reserva órfã (processo que caiu no meio) expira
+após `IDEMPOTENCIA_EM_ANDAMENTO_S`. Chaves expiradas são apagadas a cada
+`IDEMPOTENCIA_LIMPEZA_S` segundos.
+
+Com multi-clínica (ver `app/db.py`), as chaves ficam no banco da clínica do
+request: a mesma chave em clínicas diferentes são requisições distintas.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, LargeBinary, String, Text, delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Mapped, mapped_column
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db import clinica_do_request, engine_da_clinica, engines_das_clinicas
+from .models import Base
+
+__all__ = ["ChaveIdempotencia", "IdempotenciaMiddleware"]
+
+TTL_S = int(os.getenv("IDEMPOTENCIA_TTL_S", "86400"))
+EM_ANDAMENTO_S = int(os.getenv("IDEMPOTENCIA_EM_ANDAMENTO_S", "60"))
+ESPERA_S = float(os.getenv("IDEMPOTENCIA_ESPERA_S", "10"))
+LIMPEZA_S = float(os.getenv("IDEMPOTENCIA_LIMPEZA_S", "300"))
+# Respostas maiores não são guardadas (a chave é liberada).
+CORPO_MAX_BYTES = 1024 * 1024
+
+CABECALHO = "idempotency-key"
+CHAVE_MAX = 255
+
+
+class ChaveIdempotencia(Base):
+    __tablename__ = "chaves_idempotencia"
+
+    chave: Mapped[str] = mapped_column(String(CHAVE_MAX), primary_key=True)
+    # sha256 de método + caminho + query + corpo do request original
+    impressao: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+    # Nulos enquanto a execução original está em andamento
+    status_code: Mapped[int | None] = mapped_column(nullable=True)
+    cabecalhos: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON [[nome, valor], ...]
+    corpo: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)  # zlib
+    expira_em: Mapped[datetime] = mapped_column(DateTime, index=True, nullable=False)
+
+
+_t = ChaveIdempotencia.__table__
+
+
+def _reservar(engine: Engine, chave: str, impressao: bytes) -> tuple[bool, Row | None]:
+    """Tenta reservar a chave; senão devolve a linha existente (ou `None`)."""
+    agora = datetime.utcnow()
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(_t).values(
+        chave=chave, impressao=impressao, expira_em=agora + timedelta(seconds=EM_ANDAMENTO_S)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_t.c.chave],
+        set_={
+            "impressao": stmt.excluded.impressao,
+            "status_code": None,
+            "cabecalhos": None,
+            "corpo": None,
+            "expira_em": stmt.excluded.expira_em,
+        },
+        # Só assume uma chave já expirada (resposta vencida ou reserva órfã).
+        where=_t.c.expira_em < agora,
+    ).returning(_t.c.chave)
+    with engine.begin() as conn:
+        if conn.execute(stmt).first() is not None:
+            return True, None
+        return False, conn.execute(select(_t).where(_t.c.chave == chave)).first()
+
+
+def _concluir(
+    engine: Engine, chave: str, status_code: int, cabecalhos: list[list[str]], corpo: bytes
+) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            update(_t)
+            .where(_t.c.chave == chave)
+            .values(
+                status_code=status_code,
+                cabecalhos=json.dumps(cabecalhos),
+                corpo=zlib.compress(corpo),
+                expira_em=datetime.utcnow() + timedelta(seconds=TTL_S),
+            )
+        )
+
+
+def _liberar(engine: Engine, chave: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(delete(_t).where(_t.c.chave == chave, _t.c.status_code.is_(None)))
+
+
+def _limpar() -> None:
+    for engine in engines_das_clinicas().values():
+        with engine.begin() as conn:
+            conn.execute(delete(_t).where(_t.c.expira_em < datetime.utcnow()))
+
+
+def _guardavel(status_code: int) -> bool:
+    # 2xx e 4xx são o resultado da escrita; 3xx/5xx podem mudar numa nova tentativa.
+    return 200 <= status_code < 300 or 400 <= status_code < 500
+
+
+def _erro(status_code: int, detail: str, **headers: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers=headers or None)
+
+
+class IdempotenciaMiddleware:
+    """Aplica `Idempotency-Key` a todo POST que trouxer o cabeçalho."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # Execuções em andamento neste processo: duplicatas esperam o evento
+        # em vez de consultar o banco em laço.
+        self._em_andamento: dict[tuple[str | None, str], tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+        self._proxima_limpeza = 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        chave = Headers(scope=scope).get(CABECALHO)
+        if chave is None:
+            await self.app(scope, receive, send)
+            return
+        if not 1 <= len(chave) <= CHAVE_MAX:
+            resposta = _erro(400, f"Idempotency-Key deve ter de 1 a {CHAVE_MAX} caracteres")
+            await resposta(scope, receive, send)
+            return
+        try:
+            clinica = clinica_do_request(HTTPConnection(scope))
+        except HTTPException:  # a própria rota responde 400/404
+            await self.app(scope, receive, send)
+            return
+        engine = engine_da_clinica(clinica)
+        em_andamento = (clinica, chave)
+
+        corpo = await _ler_corpo(receive)
+        impressao = hashlib.sha256(
+            b"\0".join((scope["method"].encode(), scope["path"].encode(), scope["query_string"], corpo))
+        ).digest()
+
+        if time.monotonic() >= self._proxima_limpeza:
+            self._proxima_limpeza = time.monotonic() + LIMPEZA_S
+            await run_in_threadpool(_limpar)
+
+        prazo = time.monotonic() + ESPERA_S
+        pausa = 0.05
+        while True:
+            reservada, linha = await run_in_threadpool(_reservar, engine, chave, impressao)
+            if reservada:
+                break
+            if linha is None:  # liberada entre o INSERT e o SELECT
+                continue
+            if linha.impressao != impressao:
+                resposta = _erro(422, "Idempotency-Key já usada com outra requisição")
+                await resposta(scope, receive, send)
+                return
+            if linha.status_code is not None:
+                await _repetir(linha, send)
+                return
+
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                resposta = _erro(
+                    409, "Requisição com esta Idempotency-Key em andamento", **{"Retry-After": "1"}
+                )
+                await resposta(scope, receive, send)
+                return
+            loop, evento = self._em_andamento.get(em_andamento, (None, None))
+            try:
+                if loop is asyncio.get_running_loop():
+                    await asyncio.wait_for(evento.wait(), timeout=restante)
+                else:  # execução original em outro processo (ou outro loop)
+                    await asyncio.sleep(min(pausa, restante))
+                    pausa = min(pausa * 2, 0.5)
+            except asyncio.TimeoutError:
+                pass
+
+        evento = asyncio.Event()
+        self._em_andamento[em_andamento] = (asyncio.get_running_loop(), evento)
+        try:
+            await self._executar(scope, corpo, receive, send, engine, chave)
+        finally:
+            self._em_andamento.pop(em_andamento, None)
+            evento.set()
+
+    async def _executar(
+        self, scope: Scope, corpo: bytes, receive: Receive, send: Send, engine: Engine, chave: str
+    ) -> None:
+        lido = False
+
+        async def _receive() -> Message:
+            nonlocal lido
+            if not lido:
+                lido = True
+                return {"type": "http.request", "body": corpo, "more_body": False}
+            return await receive()
+
+        inicio: Message | None = None
+        partes: list[bytes] = []
+        tamanho = 0
+
+        async def _send(message: Message) -> None:
+            nonlocal inicio, tamanho
+            if message["type"] == "http.response.start":
+                inicio = message
+            elif message["type"] == "http.response.body" and tamanho <= CORPO_MAX_BYTES:
+                parte = message.get("body", b"")
+                partes.append(parte)
+                tamanho += len(parte)
+            await send(message)
+
+        try:
+            await self.app(scope, _receive, _send)
+        except BaseException:
+            await run_in_threadpool(_liberar, engine, chave)
+            raise
+
+        if inicio is None or not _guardavel(inicio["status"]) or tamanho > CORPO_MAX_BYTES:
+            await run_in_threadpool(_liberar, engine, chave)
+            return
+        cabecalhos = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in inicio.get("headers", [])]
+        await run_in_threadpool(_concluir, engine, chave, inicio["status"], cabecalhos, b"".join(partes))
+
+
+async def _ler_corpo(receive: Receive) -> bytes:
+    partes = []
+    while True:
+        message = await receive()
+        partes.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(partes)
+
+
+async def _repetir(linha: Row, send: Send) -> None:
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in json.loads(linha.cabecalhos)]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": linha.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": zlib.decompress(linha.corpo)})
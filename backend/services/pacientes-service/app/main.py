@@ -3,14 +3,50 @@
 # Inicializa a app FastAPI, cria as tabelas (apenas para MVP) e registra as rotas.
 # Para produção, recomenda-se usar migrations (Alembic) em vez de `create_all`.
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import pacientes
-from .routers import alergias, medicacoes, cirurgias
-from .db import engine
+from .routers import alergias, medicacoes, cirurgias, busca, jobs, duplicidades, auditoria
+from .busca import instalar_busca_textual
+from .nascimento import instalar_data_nascimento
+from .duplicidade import instalar_duplicidade
+from .admissao import AdmissaoMiddleware, metricas as metricas_admissao
+from .compressao import CompressaoMiddleware
+from .idempotencia import IdempotenciaMiddleware
+from .auditoria import gravador as gravador_auditoria, instalar_auditoria
+from .jobs import executor as executor_jobs
+from . import tarefas  # noqa: F401 - registra os tipos de job
+from .db import criar_esquema, engines_das_clinicas
 from .models import Base
 
-app = FastAPI(title="pacientes-service", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Gravação da trilha de auditoria em lotes (ver `app/auditoria.py`).
+    gravador_auditoria.iniciar()
+    # Executor de jobs em segundo plano (pool limitado; ver `app/jobs.py`).
+    executor_jobs.iniciar()
+    yield
+    executor_jobs.encerrar()
+    # Por último: grava o que jobs e requests deixaram no buffer.
+    gravador_auditoria.encerrar()
+
+
+app = FastAPI(title="pacientes-service", version="0.1.0", lifespan=lifespan)
+
+# Controle de admissão por classe de rota (escrita/leitura/busca): excedentes
+# recebem 503 + Retry-After. Registrado antes do CORS para que as respostas
+# 503 também levem os cabeçalhos CORS.
+app.add_middleware(AdmissaoMiddleware)
+
+# `Idempotency-Key` nos POSTs: repetições devolvem a resposta original sem
+# reexecutar a escrita. Fica fora da admissão: repetições não ocupam vaga.
+app.add_middleware(IdempotenciaMiddleware)
+
+# Compressão negociada (brotli/gzip) para respostas a partir de 1 KiB.
+app.add_middleware(CompressaoMiddleware)
 
 # CORS básico para desenvolvimento (CRA no localhost:3000 ou via proxy)
 app.add_middleware(
@@ -21,16 +57,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Cria as tabelas no primeiro start (MVP). Em produção use Alembic (migrations).
-Base.metadata.create_all(bind=engine)
+# Banco de cada clínica: schema próprio no seu shard (sem multi-clínica, só o
+# banco do serviço; ver `app/db.py`).
+for clinica, eng in engines_das_clinicas().items():
+    criar_esquema(clinica)
+    # Cria as tabelas no primeiro start (MVP). Em produção use Alembic (migrations).
+    Base.metadata.create_all(bind=eng)
+    # `data_nascimento` como DATE + índices demográficos (conversão única de bancos antigos).
+    instalar_data_nascimento(eng)
+    # Chaves fonéticas de bloqueio (detecção de duplicidades) em bancos existentes.
+    instalar_duplicidade(eng)
+    # Colunas tsvector geradas + índices GIN da busca textual (DDL idempotente).
+    instalar_busca_textual(eng)
+    # Triggers que tornam `auditoria` somente-inserção.
+    instalar_auditoria(eng)
 
-# Registra as rotas do domínio de pacientes
+# Registra as rotas do domínio de pacientes (`/pacientes/duplicidades` antes de `/pacientes/{cpf}`)
+app.include_router(duplicidades.router)
 app.include_router(pacientes.router)
 app.include_router(alergias.router)
 app.include_router(medicacoes.router)
 app.include_router(cirurgias.router)
+app.include_router(busca.router)
+app.include_router(jobs.router)
+app.include_router(auditoria.router)
 
 @app.get("/health")
 def health():
     # Endpoint de verificação simples de saúde da aplicação.
     return {"status": "ok"}
+
+@app.get("/metrics/admissao")
+def admissao():
+    # Contadores do controle de admissão por shard (em execução, fila, admitidos, rejeitados).
+    return metricas_admissao()
+
+@app.get("/metrics/auditoria")
+def metricas_auditoria():
+    # Buffer da trilha de auditoria por shard (ocupação, reservas, gravados, falhas).
+    return gravador_auditoria.metricas()
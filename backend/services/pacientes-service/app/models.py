@@ -6,8 +6,29 @@
 
 from __future__ import annotations
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, ForeignKey
-from datetime import datetime
+from sqlalchemy import String, Date, DateTime, ForeignKey, Index, extract
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from datetime import date, datetime
+
+class agora_utc(FunctionElement):
+    # Hora do relógio do banco, em UTC, no momento do comando (não do início da
+    # transação). A exportação (ver `app/exportacao.py`) compara `created_at`
+    # com um corte lido no mesmo relógio, sob lock.
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(agora_utc)
+def _agora_utc(elemento, compilador, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(agora_utc, "sqlite")
+def _agora_utc_sqlite(elemento, compilador, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"  # com milissegundos
+
+@compiles(agora_utc, "postgresql")
+def _agora_utc_pg(elemento, compilador, **kw):
+    return "(clock_timestamp() AT TIME ZONE 'UTC')"
 
 class Base(DeclarativeBase):
     # Base declarativa do SQLAlchemy.
@@ -19,10 +40,16 @@ class Paciente(Base):
     # Identificação e contato
     cpf: Mapped[str] = mapped_column(String(14), primary_key=True)  # PK
     nome_completo: Mapped[str] = mapped_column(String(150), nullable=False)
-    data_nascimento: Mapped[str | None] = mapped_column(String(10))
+    # Indexada: faixas de idade são intervalos de datas (ver `app/nascimento.py`)
+    data_nascimento: Mapped[date | None] = mapped_column(Date, index=True)
     telefone: Mapped[str | None] = mapped_column(String(20))
     email: Mapped[str | None] = mapped_column(String(120))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Preenchida pelo banco no INSERT: é a marca d'água da exportação
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=agora_utc(), nullable=False)
+
+    # Chaves fonéticas do nome para a detecção de duplicidades (ver `app/duplicidade.py`)
+    fonetica_nome: Mapped[str | None] = mapped_column(String(30))
+    fonetica_sobrenome: Mapped[str | None] = mapped_column(String(30))
 
     # Relação autorreferenciada: um paciente pode ter um responsável (outro paciente)
     responsavel_cpf: Mapped[str | None] = mapped_column(ForeignKey("pacientes.cpf"), default=None)
@@ -43,6 +70,18 @@ class Paciente(Base):
     )
 
 
+# Aniversariantes por mês, já na ordem do dia: índice de expressão (mês, dia).
+Index(
+    "ix_pacientes_aniversario",
+    extract("month", Paciente.data_nascimento),
+    extract("day", Paciente.data_nascimento),
+)
+
+# Blocos de candidatos a duplicidade: (primeiro nome, sobrenome) e (nascimento, primeiro nome).
+Index("ix_pacientes_bloco_nome", Paciente.fonetica_nome, Paciente.fonetica_sobrenome)
+Index("ix_pacientes_bloco_nascimento", Paciente.data_nascimento, Paciente.fonetica_nome)
+
+
 class Cirurgia(Base):
     __tablename__ = "cirurgias"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
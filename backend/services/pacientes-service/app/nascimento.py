@@ -0,0 +1,129 @@
+"""Data de nascimento tipada e consultas demográficas do serviço de Pacientes.
+
+`pacientes.data_nascimento` é DATE, com dois índices:
+
+- `ix_pacientes_data_nascimento` (a própria coluna): faixas de idade viram um
+  intervalo de datas (`idade_min`/`idade_max` → `nascido após`/`nascido até`);
+- `ix_pacientes_aniversario` (expressão `(mês, dia)`): aniversariantes de um
+  mês saem do índice já na ordem do dia.
+
+As expressões abaixo são as mesmas dos índices (ver `app/models.py`); o
+planner só usa o índice de expressão se a consulta repetir a expressão.
+
+Bancos criados quando a coluna ainda era texto são convertidos no start por
+`instalar_data_nascimento` (uma vez; DDL idempotente). Valores que não são
+datas `AAAA-MM-DD` válidas viram NULL; o original (se não vazio) fica em
+`pacientes_datas_invalidas` para correção manual.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date
+
+from sqlalchemy import extract, text
+from sqlalchemy.engine import Connection, Engine
+
+from .models import Paciente
+
+__all__ = [
+    "MES_NASCIMENTO",
+    "DIA_NASCIMENTO",
+    "instalar_data_nascimento",
+    "limites_idade",
+]
+
+logger = logging.getLogger(__name__)
+
+MES_NASCIMENTO = extract("month", Paciente.data_nascimento)
+DIA_NASCIMENTO = extract("day", Paciente.data_nascimento)
+
+# Por schema: cada clínica (ver `app/db.py`) converte o seu banco.
+_TRAVA = "hashtext(current_schema() || '.pacientes_data_nascimento')"
+
+_DDL_CONVERSAO = (
+    # Conversão tolerante: só `AAAA-MM-DD` que seja uma data de verdade.
+    r"""
+    CREATE FUNCTION pg_temp.data_ou_nula(v text) RETURNS date AS $$
+    BEGIN
+        IF v !~ '^\d{4}-\d{2}-\d{2}$' THEN
+            RETURN NULL;
+        END IF;
+        RETURN v::date;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pacientes_datas_invalidas (
+        cpf varchar(14) PRIMARY KEY,
+        valor text NOT NULL,
+        registrado_em timestamp NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    INSERT INTO pacientes_datas_invalidas (cpf, valor)
+    SELECT cpf, data_nascimento FROM pacientes
+    WHERE btrim(data_nascimento) <> '' AND pg_temp.data_ou_nula(data_nascimento) IS NULL
+    ON CONFLICT (cpf) DO NOTHING
+    """,
+    """
+    ALTER TABLE pacientes
+        ALTER COLUMN data_nascimento TYPE date USING pg_temp.data_ou_nula(data_nascimento)
+    """,
+)
+
+
+def _tipo_coluna(conn: Connection) -> str | None:
+    return conn.scalar(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() "
+            "AND table_name = 'pacientes' AND column_name = 'data_nascimento'"
+        )
+    )
+
+
+def instalar_data_nascimento(engine: Engine) -> None:
+    """Converte `data_nascimento` para DATE (uma vez) e cria os índices."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        if _tipo_coluna(conn) != "date":
+            conn.execute(text(f"SELECT pg_advisory_xact_lock({_TRAVA})"))
+            if _tipo_coluna(conn) != "date":  # outro processo pode ter convertido
+                logger.info("Convertendo pacientes.data_nascimento para DATE")
+                for ddl in _DDL_CONVERSAO:
+                    conn.exec_driver_sql(ddl)
+                invalidas = conn.scalar(text("SELECT count(*) FROM pacientes_datas_invalidas"))
+                if invalidas:
+                    logger.warning(
+                        "%d datas de nascimento inválidas viraram NULL (ver pacientes_datas_invalidas)",
+                        invalidas,
+                    )
+        for indice in Paciente.__table__.indexes:
+            if indice.name in ("ix_pacientes_data_nascimento", "ix_pacientes_aniversario"):
+                indice.create(conn, checkfirst=True)
+
+
+def _anos_antes(d: date, anos: int) -> date:
+    # 29/02 em ano não bissexto: 28/02.
+    try:
+        return d.replace(year=d.year - anos)
+    except ValueError:
+        return d.replace(year=d.year - anos, day=28)
+
+
+def limites_idade(
+    idade_min: int | None, idade_max: int | None, hoje: date | None = None
+) -> tuple[date | None, date | None]:
+    """Faixa de idade (anos completos) → (nascido após, nascido até).
+
+    `idade_min=N`: nascido até hoje há N anos. `idade_max=M`: nascido após
+    hoje há M+1 anos (ainda não fez M+1). Limite `None` não restringe.
+    """
+    hoje = hoje or date.today()
+    apos = _anos_antes(hoje, idade_max + 1) if idade_max is not None else None
+    ate = _anos_antes(hoje, idade_min) if idade_min is not None else None
+    return apos, ate
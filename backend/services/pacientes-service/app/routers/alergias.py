@@ -9,9 +9,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
 from ..db import get_sessao
+from ..escrita import transacao, inserir, atualizar
 from ..models import Paciente, Alergia
 from ..schemas import AlergiaIn, AlergiaOut, AlergiaAtualizar
 from ..validators import assert_cpf_or_422
@@ -31,20 +31,15 @@ def _get_paciente_or_404(db: Session, cpf: str) -> Paciente:
 @router.post("/pacientes/{cpf}/alergias", response_model=AlergiaOut, status_code=201)
 def criar_alergia_para_paciente(cpf: str, payload: AlergiaIn, db: Session = Depends(get_sessao)):
     # Cria uma alergia vinculada ao paciente informado no path
-    _get_paciente_or_404(db, cpf)
+    assert_cpf_or_422(cpf)
 
     data = payload.model_dump(exclude_none=True)
     # Garante vínculo pelo path param
     data["paciente_cpf"] = cpf
 
-    alergia = Alergia(**data)
-    db.add(alergia)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao criar alergia")
-    db.refresh(alergia)
+    # A FK `paciente_cpf` garante a existência do paciente: violação → 404.
+    with transacao(db, status_code=404, detail="Paciente não encontrado"):
+        alergia = inserir(db, Alergia, data)
     return alergia
 
 
@@ -72,20 +67,14 @@ def obter_alergia(id: int, db: Session = Depends(get_sessao)):
 @router.patch("/alergias/{id}", response_model=AlergiaOut)
 def atualizar_alergia(id: int, payload: AlergiaAtualizar, db: Session = Depends(get_sessao)):
     # Atualização parcial da alergia
-    a = _get_alergia_or_404(db, id)
     data = payload.model_dump(exclude_unset=True)
     if not data:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
 
-    for k, v in data.items():
-        setattr(a, k, v)
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao atualizar alergia")
-    db.refresh(a)
+    with transacao(db, detail="Violação de integridade ao atualizar alergia"):
+        a = atualizar(db, Alergia, id, data)
+    if a is None:
+        raise HTTPException(status_code=404, detail="Alergia não encontrada")
     return a
 
 
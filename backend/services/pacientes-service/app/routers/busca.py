@@ -0,0 +1,30 @@
+# Rotas de busca textual do serviço de Pacientes.
+#
+# Endpoints:
+# - GET /api/v1/busca?q=dipirona&limit=20&offset=0 → cirurgias, medicações e
+#   alergias por relevância
+#
+# A busca usa as colunas tsvector `busca` (stemming em português) e seus
+# índices GIN; ver `app/busca.py`. Aceita a sintaxe websearch do Postgres:
+# "frase exata", OR e -exclusão.
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..busca import busca_disponivel, buscar_registros_clinicos
+from ..db import get_sessao
+from ..schemas import RegistroClinicoBuscaOut
+
+router = APIRouter(prefix="/api/v1", tags=["busca"])
+
+
+@router.get("/busca", response_model=list[RegistroClinicoBuscaOut])
+def buscar(
+    q: str = Query(min_length=2, max_length=200, description="Termos da busca"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_sessao),
+):
+    if not busca_disponivel(db):
+        raise HTTPException(status_code=501, detail="Busca textual requer PostgreSQL")
+    return buscar_registros_clinicos(db, q, limit, offset)
@@ -9,9 +9,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
 from ..db import get_sessao
+from ..escrita import transacao, inserir, atualizar
 from ..models import Paciente, Cirurgia
 from ..schemas import CirurgiaIn, CirurgiaOut, CirurgiaAtualizar
 from ..validators import assert_cpf_or_422
@@ -29,18 +29,13 @@ def _get_paciente_or_404(db: Session, cpf: str) -> Paciente:
 
 @router.post("/pacientes/{cpf}/cirurgias", response_model=CirurgiaOut, status_code=201)
 def criar_cirurgia_para_paciente(cpf: str, payload: CirurgiaIn, db: Session = Depends(get_sessao)):
-    _get_paciente_or_404(db, cpf)
+    assert_cpf_or_422(cpf)
     data = payload.model_dump(exclude_none=True)
     data["paciente_cpf"] = cpf
 
-    c = Cirurgia(**data)
-    db.add(c)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao criar cirurgia")
-    db.refresh(c)
+    # A FK `paciente_cpf` garante a existência do paciente: violação → 404.
+    with transacao(db, status_code=404, detail="Paciente não encontrado"):
+        c = inserir(db, Cirurgia, data)
     return c
 
 
@@ -64,20 +59,14 @@ def obter_cirurgia(id: int, db: Session = Depends(get_sessao)):
 
 @router.patch("/cirurgias/{id}", response_model=CirurgiaOut)
 def atualizar_cirurgia(id: int, payload: CirurgiaAtualizar, db: Session = Depends(get_sessao)):
-    c = _get_cirurgia_or_404(db, id)
     data = payload.model_dump(exclude_unset=True)
     if not data:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
 
-    for k, v in data.items():
-        setattr(c, k, v)
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao atualizar cirurgia")
-    db.refresh(c)
+    with transacao(db, detail="Violação de integridade ao atualizar cirurgia"):
+        c = atualizar(db, Cirurgia, id, data)
+    if c is None:
+        raise HTTPException(status_code=404, detail="Cirurgia não encontrada")
     return c
 
 
@@ -0,0 +1,48 @@
+# Rotas do relatório de pacientes possivelmente duplicados.
+#
+# Endpoints:
+# - GET /api/v1/pacientes/duplicidades?pontuacao_min=0.9&limit=100 → pares do
+#   último relatório, da maior pontuação à menor
+#
+# O relatório é gerado em segundo plano pelo job `duplicidades`
+# (`POST /api/v1/jobs {"tipo": "duplicidades"}`); ver `app/duplicidade.py`.
+# Registrado antes das rotas de pacientes: senão `/{cpf}` captura o caminho.
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from ..db import get_sessao
+from ..duplicidade import Duplicidade
+from ..models import Paciente
+from ..schemas import DuplicidadeOut
+
+router = APIRouter(prefix="/api/v1/pacientes", tags=["pacientes"])
+
+
+@router.get("/duplicidades", response_model=list[DuplicidadeOut])
+def listar_duplicidades(
+    pontuacao_min: float = Query(default=0.0, ge=0, le=1),
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_sessao),
+):
+    a, b = aliased(Paciente), aliased(Paciente)
+    stmt = (
+        select(
+            Duplicidade.cpf_a,
+            a.nome_completo.label("nome_a"),
+            Duplicidade.cpf_b,
+            b.nome_completo.label("nome_b"),
+            Duplicidade.pontuacao,
+            Duplicidade.motivos,
+            Duplicidade.detectado_em,
+        )
+        .join(a, a.cpf == Duplicidade.cpf_a)
+        .join(b, b.cpf == Duplicidade.cpf_b)
+        .where(Duplicidade.pontuacao >= pontuacao_min)
+        .order_by(Duplicidade.pontuacao.desc(), Duplicidade.cpf_a, Duplicidade.cpf_b)
+        .limit(limit)
+        .offset(offset)
+    )
+    return [DuplicidadeOut.model_validate(linha._mapping) for linha in db.execute(stmt)]
@@ -0,0 +1,96 @@
+# Rotas HTTP de jobs em segundo plano do serviço de Pacientes.
+#
+# Endpoints:
+# - POST /api/v1/jobs                → submete um job (202; roda em segundo plano)
+# - GET  /api/v1/jobs                → lista jobs recentes (filtro por estado)
+# - GET  /api/v1/jobs/{id}           → progresso, resultado ou erro
+# - POST /api/v1/jobs/{id}/cancelar  → cancela (pendente: na hora; em execução:
+#                                      no próximo ponto de progresso)
+#
+# Tipos disponíveis e seus parâmetros: ver `app/tarefas.py`.
+
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..db import get_sessao
+from ..escrita import transacao, inserir
+from ..jobs import CANCELADO, ESTADOS_FINAIS, EXECUTANDO, PENDENTE, TAREFAS, Job, executor
+from ..schemas import JobIn, JobOut
+
+router = APIRouter(prefix="/api/v1", tags=["jobs"])
+
+
+def _get_job_or_404(db: Session, id: int) -> Job:
+    j = db.get(Job, id)
+    if not j:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return j
+
+
+@router.post("/jobs", response_model=JobOut, status_code=202)
+def submeter_job(payload: JobIn, db: Session = Depends(get_sessao)):
+    definicao = TAREFAS.get(payload.tipo)
+    if definicao is None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Tipo de job desconhecido: {payload.tipo}. Disponíveis: {', '.join(sorted(TAREFAS))}",
+        )
+    try:
+        params = definicao.parametros.model_validate(payload.parametros)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+    with transacao(db, detail="Violação de integridade ao criar job"):
+        job = inserir(db, Job, {"tipo": payload.tipo, "parametros": params.model_dump_json()})
+    executor.acordar()
+    return job
+
+
+@router.get("/jobs", response_model=list[JobOut])
+def listar_jobs(
+    estado: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_sessao),
+):
+    stmt = select(Job).order_by(Job.id.desc()).limit(limit)
+    if estado:
+        stmt = stmt.where(Job.estado == estado)
+    return db.scalars(stmt).all()
+
+
+@router.get("/jobs/{id}", response_model=JobOut)
+def obter_job(id: int, db: Session = Depends(get_sessao)):
+    return _get_job_or_404(db, id)
+
+
+@router.post("/jobs/{id}/cancelar", response_model=JobOut, status_code=202)
+def cancelar_job(id: int, db: Session = Depends(get_sessao)):
+    agora = datetime.utcnow()
+    # Pendente: cancela já. Em execução: sinaliza; o job para no próximo progresso.
+    job = db.scalars(
+        update(Job)
+        .where(Job.id == id, Job.estado == PENDENTE)
+        .values(estado=CANCELADO, concluido_em=agora, atualizado_em=agora)
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if job is None:
+        job = db.scalars(
+            update(Job)
+            .where(Job.id == id, Job.estado == EXECUTANDO)
+            .values(cancelamento_solicitado=True)
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+    db.commit()
+    if job is not None:
+        return job
+
+    job = _get_job_or_404(db, id)
+    if job.estado in ESTADOS_FINAIS:
+        raise HTTPException(status_code=409, detail=f"Job já finalizado ({job.estado})")
+    return job
@@ -9,9 +9,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
 from ..db import get_sessao
+from ..escrita import transacao, inserir, atualizar
 from ..models import Paciente, Medicacao
 from ..schemas import MedicacaoIn, MedicacaoOut, MedicacaoAtualizar
 from ..validators import assert_cpf_or_422
@@ -29,18 +29,13 @@ def _get_paciente_or_404(db: Session, cpf: str) -> Paciente:
 
 @router.post("/pacientes/{cpf}/medicacoes", response_model=MedicacaoOut, status_code=201)
 def criar_medicacao_para_paciente(cpf: str, payload: MedicacaoIn, db: Session = Depends(get_sessao)):
-    _get_paciente_or_404(db, cpf)
+    assert_cpf_or_422(cpf)
     data = payload.model_dump(exclude_none=True)
     data["paciente_cpf"] = cpf
 
-    med = Medicacao(**data)
-    db.add(med)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao criar medicação")
-    db.refresh(med)
+    # A FK `paciente_cpf` garante a existência do paciente: violação → 404.
+    with transacao(db, status_code=404, detail="Paciente não encontrado"):
+        med = inserir(db, Medicacao, data)
     return med
 
 
@@ -64,20 +59,14 @@ def obter_medicacao(id: int, db: Session = Depends(get_sessao)):
 
 @router.patch("/medicacoes/{id}", response_model=MedicacaoOut)
 def atualizar_medicacao(id: int, payload: MedicacaoAtualizar, db: Session = Depends(get_sessao)):
-    m = _get_medicacao_or_404(db, id)
     data = payload.model_dump(exclude_unset=True)
     if not data:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
 
-    for k, v in data.items():
-        setattr(m, k, v)
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Violação de integridade ao atualizar medicação")
-    db.refresh(m)
+    with transacao(db, detail="Violação de integridade ao atualizar medicação"):
+        m = atualizar(db, Medicacao, id, data)
+    if m is None:
+        raise HTTPException(status_code=404, detail="Medicação não encontrada")
     return m
 
 
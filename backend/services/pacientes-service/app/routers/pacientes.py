@@ -6,17 +6,27 @@
 # SQLAlchemy injetada por request.
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy import select
 
+from ..campos import colunas_do_schema, selecionar_campos, projetar
 from ..db import get_sessao
+from ..duplicidade import candidatos, chaves_bloqueio
+from ..escrita import transacao, inserir, inserir_varios, atualizar
 from ..models import Paciente, Cirurgia, Medicacao, Alergia
+from ..nascimento import DIA_NASCIMENTO, MES_NASCIMENTO, limites_idade
 from ..schemas import (
     PacienteIn,
     PacienteOut,
+    PacienteCriadoOut,
+    DuplicataOut,
     PacienteAtualizar,
     PacienteOutLeve,
+    PacientesBatchGetIn,
+    PacientesBatchGetOut,
     MedicacaoIn,
     CirurgiaIn,
     AlergiaIn,
@@ -28,6 +38,9 @@ router = APIRouter(
     tags=["pacientes"],  # agrupamento no Swagger/Redoc
 )
 
+# Campos selecionáveis via `?fields=` na listagem (os de `PacienteOutLeve`).
+_CAMPOS_LISTAGEM = colunas_do_schema(PacienteOutLeve, Paciente)
+
 
 def _get_paciente_or_404(db: Session, cpf: str) -> Paciente:
     # Busca um paciente pela PK (CPF) ou lança 404.
@@ -40,24 +53,41 @@ def _get_paciente_or_404(db: Session, cpf: str) -> Paciente:
     return p
 
 
+def _paciente_existe(db: Session, cpf: str) -> bool:
+    # Checagem leve de existência (só a PK, sem carregar as coleções selectin).
+    return db.scalar(select(Paciente.cpf).where(Paciente.cpf == cpf)) is not None
+
+
 # Cria um novo paciente com dados básicos e relacionamentos opcionais.
 # Regras de negócio:
 # - Se informado, `responsavel_cpf` não pode ser igual ao CPF do próprio paciente
 #   e deve apontar para um paciente já existente.
 # - As coleções aninhadas (cirurgia, medicacao, alergia) são opcionais.
-@router.post("", response_model=PacienteOut, status_code=201)
+# - Pacientes já cadastrados que podem ser a mesma pessoa (nome foneticamente
+#   igual/semelhante, nascimento próximo) voltam em `possiveis_duplicatas`,
+#   como aviso; o cadastro segue normalmente.
+@router.post("", response_model=PacienteCriadoOut, status_code=201)
 def criar_paciente(payload: PacienteIn, db: Session = Depends(get_sessao)):
     # se veio responsavel_cpf, checa se existe (opcional no MVP)
     if payload.responsavel_cpf:
         if payload.responsavel_cpf == payload.cpf:
             raise HTTPException(status_code=422, detail="responsavel_cpf não pode ser o próprio CPF")
-        if not db.get(Paciente, payload.responsavel_cpf):
+        if not _paciente_existe(db, payload.responsavel_cpf):
             raise HTTPException(status_code=422, detail="CPF do responsável não consta na nossa base de dados")
 
     data = payload.model_dump(
         exclude={"cirurgia", "medicacao", "alergia"},
         exclude_none=True,
     )
+    # Chaves de bloqueio gravadas junto: uma consulta indexada acha os suspeitos.
+    data.update(chaves_bloqueio(payload.nome_completo))
+    suspeitos = candidatos(
+        db,
+        payload.nome_completo,
+        payload.data_nascimento,
+        cpf=payload.cpf,
+        responsavel_cpf=payload.responsavel_cpf,
+    )
 
     # Campos aninhados não pertencem diretamente à tabela pacientes: extraímos.
     # Caso não haja, usamos listas vazias.
@@ -65,28 +95,36 @@ def criar_paciente(payload: PacienteIn, db: Session = Depends(get_sessao)):
     meds = payload.medicacao or []
     ales = payload.alergia or []
 
-    paciente = Paciente(**data)
-
-    # Relacionamentos: criamos instâncias SQLAlchemy e anexamos às coleções.
-    # O SQLAlchemy preencherá `paciente_cpf` via relacionamento (FK) ao persistir.
-    for c in cirs:
-        paciente.cirurgias.append(Cirurgia(**c.model_dump(exclude_none=True)))
-    for m in meds:
-        paciente.medicacoes.append(Medicacao(**m.model_dump(exclude_none=True)))
-    for a in ales:
-        a_data = a.model_dump(exclude_none=True)
-        # Ignoramos paciente_cpf do payload aninhado: o relacionamento define isso.
-        a_data.pop("paciente_cpf", None)
-        paciente.alergias.append(Alergia(**a_data))
-
-    db.add(paciente)
-    try:
-        db.commit()  # pode lançar IntegrityError, ex.: PK (CPF) duplicada
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="CPF já cadastrado")
-    db.refresh(paciente)
-    return paciente
+    # Relacionamentos: cada coleção é gravada com um único INSERT ... RETURNING
+    # em lote, com `paciente_cpf` explícito. As listas retornadas são atribuídas
+    # como já carregadas, evitando os SELECTs `selectin` na serialização.
+    with transacao(db, detail="CPF já cadastrado"):  # ex.: PK (CPF) duplicada
+        paciente = inserir(db, Paciente, data)
+        cirurgias = inserir_varios(
+            db, Cirurgia, [{**c.model_dump(), "paciente_cpf": paciente.cpf} for c in cirs]
+        )
+        medicacoes = inserir_varios(
+            db, Medicacao, [{**m.model_dump(), "paciente_cpf": paciente.cpf} for m in meds]
+        )
+        # Ignoramos paciente_cpf do payload aninhado: vale o do paciente criado.
+        alergias = inserir_varios(
+            db, Alergia, [{**a.model_dump(), "paciente_cpf": paciente.cpf} for a in ales]
+        )
+    set_committed_value(paciente, "cirurgias", cirurgias)
+    set_committed_value(paciente, "medicacoes", medicacoes)
+    set_committed_value(paciente, "alergias", alergias)
+    resposta = PacienteCriadoOut.model_validate(paciente)
+    resposta.possiveis_duplicatas = [
+        DuplicataOut(
+            cpf=c.cpf,
+            nome_completo=c.nome_completo,
+            data_nascimento=c.data_nascimento,
+            pontuacao=pontuacao,
+            motivos=motivos,
+        )
+        for c, pontuacao, motivos in suspeitos
+    ]
+    return resposta
 
 
 # atualiza paciente (PUT parcial)
@@ -99,33 +137,47 @@ def atualizar_paciente_parcial(
     payload: PacienteAtualizar,
     db: Session = Depends(get_sessao)
 ):
-    p = _get_paciente_or_404(db, cpf)
+    assert_cpf_or_422(cpf)
 
-    data = payload.model_dump(exclude_unset=True)
+    # Coleções aninhadas não são colunas de `pacientes`; são editadas pelas
+    # rotas próprias (alergias, medicações, cirurgias).
+    data = payload.model_dump(
+        exclude_unset=True,
+        exclude={"cirurgia", "medicacao", "alergia"},
+    )
     if not data:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
+    if data.get("nome_completo"):
+        data.update(chaves_bloqueio(data["nome_completo"]))
 
     # validações
     if "responsavel_cpf" in data and data["responsavel_cpf"]:
         if data["responsavel_cpf"] == cpf:
             raise HTTPException(status_code=422, detail="responsavel_cpf não pode ser o próprio CPF")
-        if not db.get(Paciente, data["responsavel_cpf"]):
+        if not _paciente_existe(db, data["responsavel_cpf"]):
             raise HTTPException(status_code=422, detail="CPF do responsável não consta na nossa base de dados")
 
-    # Aplica alterações campo a campo de forma segura
-    for k, v in data.items():
-        setattr(p, k, v)
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        # Hoje só afetaria e-mail/telefone se houver constraints; por segurança:
-        raise HTTPException(status_code=409, detail="Violação de unicidade em algum campo")
-    db.refresh(p)
+    # Hoje só afetaria e-mail/telefone se houver constraints; por segurança:
+    with transacao(db, detail="Violação de unicidade em algum campo"):
+        p = atualizar(db, Paciente, cpf, data)
+    if p is None:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado")
     return p
 
 
+# Resolve vários CPFs em uma única consulta (`WHERE cpf IN (...)` pela PK).
+# Usado, por exemplo, para rotular a agenda do dia sem um GET por consulta.
+# Projeta apenas as colunas de `PacienteOutLeve`, sem carregar coleções.
+@router.post(":batchGet", response_model=PacientesBatchGetOut)
+def obter_pacientes_em_lote(payload: PacientesBatchGetIn, db: Session = Depends(get_sessao)):
+    stmt = select(Paciente.cpf, Paciente.nome_completo, Paciente.data_nascimento).where(
+        Paciente.cpf.in_(payload.cpfs)
+    )
+    encontrados = {row.cpf: PacienteOutLeve.model_validate(row) for row in db.execute(stmt)}
+    ausentes = [cpf for cpf in payload.cpfs if cpf not in encontrados]
+    return PacientesBatchGetOut(encontrados=encontrados, ausentes=ausentes)
+
+
 # get paciente
 # Retorna dados básicos do paciente (sem coleções).
 @router.get("/{cpf}", response_model=PacienteOutLeve)
@@ -151,21 +203,49 @@ def excluir_paciente(cpf: str, db: Session = Depends(get_sessao)):
 @router.get("", response_model=list[PacienteOutLeve])
 def listar_pacientes(
     q: str | None = Query(default=None, description="Busca por nome (ilike) ou CPF"),
+    aniversario_mes: int | None = Query(
+        default=None, ge=1, le=12, description="Aniversariantes do mês (1-12), em ordem de dia"
+    ),
+    idade_min: int | None = Query(default=None, ge=0, le=150, description="Idade mínima (anos completos)"),
+    idade_max: int | None = Query(default=None, ge=0, le=150, description="Idade máxima (anos completos)"),
     limit: int | None = Query(default=None, ge=1, le=10000),
+    fields: str | None = Query(
+        default=None, description="Campos a retornar, separados por vírgula (ex.: cpf,nome_completo)"
+    ),
     db: Session = Depends(get_sessao),
 ):
     # Lista pacientes. Se `q` for informado:
     # - Numérico com 11+ dígitos → filtro por prefixo de CPF
     # - Caso contrário → filtro por nome (ilike)
-    stmt = select(Paciente)
+    # Projeta só as colunas da saída (ou as de `fields`), sem carregar coleções.
+    # Filtros demográficos saem dos índices de `data_nascimento` (ver `app/nascimento.py`);
+    # pacientes sem data de nascimento não entram nesses filtros.
+    if idade_min is not None and idade_max is not None and idade_min > idade_max:
+        raise HTTPException(status_code=422, detail="idade_min não pode ser maior que idade_max")
+    campos = selecionar_campos(fields, _CAMPOS_LISTAGEM)
+    stmt = projetar(campos or _CAMPOS_LISTAGEM)
     if q:
         # Busca por nome (ilike) OU por CPF como string (com pontuação)
         stmt = stmt.where(
             (Paciente.nome_completo.ilike(f"%{q}%")) | (Paciente.cpf.ilike(f"%{q}%"))
         )
+    if aniversario_mes is not None:
+        stmt = stmt.where(MES_NASCIMENTO == aniversario_mes).order_by(
+            MES_NASCIMENTO, DIA_NASCIMENTO, Paciente.cpf
+        )
+    if idade_min is not None or idade_max is not None:
+        nascido_apos, nascido_ate = limites_idade(idade_min, idade_max)
+        if nascido_apos is not None:
+            stmt = stmt.where(Paciente.data_nascimento > nascido_apos)
+        if nascido_ate is not None:
+            stmt = stmt.where(Paciente.data_nascimento <= nascido_ate)
     if limit:
         stmt = stmt.limit(limit)
-    return db.execute(stmt).scalars().all()
+    linhas = db.execute(stmt).all()
+    if campos:
+        # Saída parcial: dispensa o `response_model` (que exigiria todos os campos).
+        return JSONResponse(jsonable_encoder([dict(linha._mapping) for linha in linhas]))
+    return linhas
 
 @router.get("/todos", response_model=list[PacienteOutLeve])
 def listar_todos(db: Session = Depends(get_sessao)):
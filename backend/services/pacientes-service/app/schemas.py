@@ -5,9 +5,11 @@
 # (similar ao antigo `orm_mode=True`), permitindo retornar instâncias SQLAlchemy.
 
 from __future__ import annotations
+import json
 from pydantic import BaseModel, Field, EmailStr, ConfigDict, field_validator
-from typing import Optional, List
-from .validators import validar_cpf_formato
+from datetime import date, datetime
+from typing import Any, Optional, List, Dict
+from .validators import validar_cpf_formato, validar_data_nascimento
 
 # ========== CIRURGIA ==========
 class CirurgiaIn(BaseModel):
@@ -90,7 +92,7 @@ class PacienteIn(BaseModel):
     # alergia), permitindo o cadastro completo em uma única requisição.
     cpf: str = Field(min_length=11, max_length=14)
     nome_completo: str = Field(min_length=3, max_length=150)
-    data_nascimento: Optional[str] = Field(default=None, description="YYYY-MM-DD")
+    data_nascimento: Optional[date] = Field(default=None, description="YYYY-MM-DD")
     telefone: Optional[str] = None
     email: Optional[EmailStr] = None
     # Se houver um responsável já existente, informe o CPF dele:
@@ -107,13 +109,20 @@ class PacienteIn(BaseModel):
             return v
         return validar_cpf_formato(v)
 
+    @field_validator("data_nascimento")
+    @classmethod
+    def _valida_nascimento(cls, v: date | None) -> date | None:
+        if v is None:
+            return v
+        return validar_data_nascimento(v)
+
 
 class PacienteAtualizar(BaseModel):
     # Atualização parcial (PATCH) do paciente.
     # Somente os campos enviados serão considerados, mantendo os demais.
     # update “completo” (MVP), se preferir faça campos todos opcionais
     nome_completo: Optional[str] = Field(default=None, min_length=3, max_length=150)
-    data_nascimento: Optional[str] = Field(default=None, description="YYYY-MM-DD")
+    data_nascimento: Optional[date] = Field(default=None, description="YYYY-MM-DD")
     telefone: Optional[str] = None
     email: Optional[EmailStr] = None
     responsavel_cpf: Optional[str] = Field(default=None, min_length=11, max_length=14)
@@ -129,12 +138,19 @@ class PacienteAtualizar(BaseModel):
             return v
         return validar_cpf_formato(v)
 
+    @field_validator("data_nascimento")
+    @classmethod
+    def _valida_nascimento(cls, v: date | None) -> date | None:
+        if v is None:
+            return v
+        return validar_data_nascimento(v)
+
 class PacienteOut(BaseModel):
     # Representação de saída completa do paciente (com coleções).
     model_config = ConfigDict(from_attributes=True)
     cpf: str = Field(min_length=11, max_length=14)
     nome_completo: str = Field(min_length=3, max_length=150)
-    data_nascimento: Optional[str] = Field(default=None, description="YYYY-MM-DD")
+    data_nascimento: Optional[date] = Field(default=None, description="YYYY-MM-DD")
     telefone: Optional[str] = None
     email: Optional[EmailStr] = None
     # Se houver um responsável já existente, informe o CPF dele:
@@ -149,4 +165,120 @@ class PacienteOutLeve(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     cpf: str
     nome_completo: str
-    data_nascimento: Optional[str] = None
+    data_nascimento: Optional[date] = None
+
+
+# ========== DUPLICIDADES ==========
+class DuplicataOut(BaseModel):
+    # Paciente já cadastrado que pode ser a mesma pessoa (ver `app/duplicidade.py`).
+    cpf: str
+    nome_completo: str
+    data_nascimento: Optional[date] = None
+    pontuacao: float
+    motivos: List[str]
+
+
+class PacienteCriadoOut(PacienteOut):
+    # Resposta do cadastro: o paciente criado e, como aviso (o cadastro não é
+    # bloqueado), os já cadastrados que podem ser a mesma pessoa.
+    possiveis_duplicatas: List[DuplicataOut] = Field(default_factory=list)
+
+
+class DuplicidadeOut(BaseModel):
+    # Par suspeito do relatório em lote (job `duplicidades`).
+    cpf_a: str
+    nome_a: str
+    cpf_b: str
+    nome_b: str
+    pontuacao: float
+    motivos: List[str]
+    detectado_em: datetime
+
+    @field_validator("motivos", mode="before")
+    @classmethod
+    def _motivos_lista(cls, v: Any) -> Any:
+        return v.split(",") if isinstance(v, str) else v
+
+
+# ========== BATCH GET ==========
+# Limite de CPFs por chamada: cobre a agenda de um dia com folga e mantém o
+# `IN (...)` em uma única consulta indexada pela PK.
+BATCH_GET_MAX = 500
+
+
+class PacientesBatchGetIn(BaseModel):
+    # CPFs a resolver de uma vez (duplicatas são ignoradas, ordem preservada).
+    cpfs: List[str] = Field(min_length=1, max_length=BATCH_GET_MAX)
+
+    @field_validator("cpfs")
+    @classmethod
+    def _valida_cpfs(cls, v: List[str]) -> List[str]:
+        return list(dict.fromkeys(validar_cpf_formato(c) for c in v))
+
+
+class PacientesBatchGetOut(BaseModel):
+    # Resultado indexado por CPF; os não encontrados são listados explicitamente.
+    encontrados: Dict[str, PacienteOutLeve] = Field(default_factory=dict)
+    ausentes: List[str] = Field(default_factory=list)
+
+
+# ========== BUSCA TEXTUAL ==========
+class RegistroClinicoBuscaOut(BaseModel):
+    # Resultado da busca textual: origem (`cirurgia`, `medicacao`, `alergia`),
+    # id do registro, paciente, relevância e trecho com termos em <mark>…</mark>.
+    model_config = ConfigDict(from_attributes=True)
+    tipo: str
+    id: int
+    paciente_cpf: str
+    rank: float
+    trecho: str
+
+
+# ========== JOBS ==========
+class JobIn(BaseModel):
+    # Submissão de um job em segundo plano; `parametros` depende do `tipo`
+    # (ver `app/tarefas.py`).
+    tipo: str = Field(min_length=1, max_length=40)
+    parametros: Dict[str, Any] = Field(default_factory=dict)
+
+
+class JobOut(BaseModel):
+    # Estado de um job: pendente → executando → concluido | falhou | cancelado.
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    tipo: str
+    estado: str
+    processados: int
+    total: Optional[int] = None
+    resultado: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+    cancelamento_solicitado: bool
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    @field_validator("resultado", mode="before")
+    @classmethod
+    def _resultado_json(cls, v: Any) -> Any:
+        return json.loads(v) if isinstance(v, str) else v
+
+
+# ========== AUDITORIA ==========
+class AuditoriaOut(BaseModel):
+    # Uma mudança registrada: operação I/U/D e valores antes/depois (num
+    # UPDATE, só as colunas alteradas).
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    ocorrido_em: datetime
+    tabela: str
+    chave: Optional[str] = None
+    operacao: str
+    antes: Optional[Dict[str, Any]] = None
+    depois: Optional[Dict[str, Any]] = None
+    autor: Optional[str] = None
+    origem: Optional[str] = None
+
+    @field_validator("antes", "depois", mode="before")
+    @classmethod
+    def _valores_json(cls, v: Any) -> Any:
+        return json.loads(v) if isinstance(v, str) else v
@@ -0,0 +1,141 @@
+"""Tipos de job do serviço de Pacientes (ver `app/jobs.py`).
+
+- `exportacao`: exportação analítica incremental em Parquet (`app/exportacao.py`)
+  para um subdiretório de `JOBS_EXPORTACAO_DIR` (com multi-clínica, de
+  `JOBS_EXPORTACAO_DIR/<clínica>`).
+- `importacao`: cadastro em massa de pacientes (com coleções aninhadas), em
+  lotes; CPFs já cadastrados são ignorados e linhas inválidas são relatadas
+  no resultado sem abortar o restante.
+- `duplicidades`: relatório de possíveis pacientes duplicados
+  (`app/duplicidade.py`), gravado em `duplicidades`.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import List
+
+from pydantic import BaseModel, Field
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .duplicidade import chaves_bloqueio, detectar_duplicidades
+from .exportacao import exportar
+from .jobs import ContextoJob, tarefa
+from .models import Alergia, Cirurgia, Medicacao, Paciente
+from .schemas import PacienteIn
+
+EXPORTACAO_DIR = os.getenv("JOBS_EXPORTACAO_DIR", "/tmp/exportacoes")
+IMPORTACAO_MAX = 50_000
+IMPORTACAO_LOTE = 500
+
+
+class ExportacaoParams(BaseModel):
+    # Subdiretório (um nome simples, sem `.` inicial: nem `.`, nem `..`) de
+    # JOBS_EXPORTACAO_DIR; execuções para o mesmo destino continuam de onde a
+    # anterior parou.
+    destino: str = Field(default="analitico", pattern=r"^[\w-][\w.-]*$", max_length=100)
+    lote: int = Field(default=50_000, ge=100, le=1_000_000)
+    atraso_s: int = Field(default=60, ge=0)
+
+
+class ImportacaoParams(BaseModel):
+    pacientes: List[PacienteIn] = Field(min_length=1, max_length=IMPORTACAO_MAX)
+
+
+class DuplicidadesParams(BaseModel):
+    pass
+
+
+def _diretorio_exportacao(clinica: str | None, nome: str) -> str:
+    """Diretório do destino `nome`, que precisa ficar dentro do da clínica."""
+    base = os.path.realpath(os.path.join(EXPORTACAO_DIR, clinica or ""))
+    destino = os.path.realpath(os.path.join(base, nome))
+    if os.path.commonpath([base, destino]) != base or destino == base:
+        raise ValueError(f"Destino fora do diretório de exportação: {nome!r}")
+    return destino
+
+
+@tarefa("exportacao", ExportacaoParams)
+def exportar_em_segundo_plano(ctx: ContextoJob, params: ExportacaoParams) -> dict:
+    exportadas = 0
+
+    def _lote(n: int) -> None:
+        nonlocal exportadas
+        exportadas += n
+        ctx.progresso(exportadas)  # cancelamento: a marca d'água já está salva
+
+    destino = _diretorio_exportacao(ctx.clinica, params.destino)
+    # Sem clínica, `exportar` lê de uma réplica (se houver).
+    eng = ctx.engine if ctx.clinica is not None else None
+    por_tabela = exportar(destino, params.lote, params.atraso_s, eng, ao_gravar_lote=_lote)
+    ctx.progresso(exportadas, exportadas, forcar=True)
+    return {"destino": destino, "exportadas": por_tabela}
+
+
+def _inserir_pacientes(db: Session, pacientes: list[PacienteIn]) -> None:
+    if not pacientes:
+        return
+    linhas = [
+        {**p.model_dump(exclude={"cirurgia", "medicacao", "alergia"}), **chaves_bloqueio(p.nome_completo)}
+        for p in pacientes
+    ]
+    db.execute(insert(Paciente), linhas)
+    for modelo, campo in ((Cirurgia, "cirurgia"), (Medicacao, "medicacao"), (Alergia, "alergia")):
+        filhos = [
+            {**f.model_dump(), "paciente_cpf": p.cpf} for p in pacientes for f in (getattr(p, campo) or [])
+        ]
+        if filhos:
+            db.execute(insert(modelo), filhos)
+
+
+@tarefa("importacao", ImportacaoParams)
+def importar_pacientes(ctx: ContextoJob, params: ImportacaoParams) -> dict:
+    total = len(params.pacientes)
+    importados, ignorados, falhas = 0, 0, []
+    ctx.progresso(0, total, forcar=True)
+
+    db = SessionLocal(bind=ctx.engine, info={"origem": f"job {ctx.job_id}", "clinica": ctx.clinica})
+    try:
+        for inicio in range(0, total, IMPORTACAO_LOTE):
+            lote = params.pacientes[inicio : inicio + IMPORTACAO_LOTE]
+            existentes = set(
+                db.scalars(select(Paciente.cpf).where(Paciente.cpf.in_([p.cpf for p in lote])))
+            )
+            novos, vistos = [], set()
+            for p in lote:
+                if p.cpf in existentes or p.cpf in vistos:
+                    ignorados += 1
+                else:
+                    vistos.add(p.cpf)
+                    novos.append(p)
+
+            try:
+                _inserir_pacientes(db, novos)
+                db.commit()
+                importados += len(novos)
+            except IntegrityError:
+                # Ex.: responsável inexistente ou CPF criado em paralelo: refaz
+                # o lote linha a linha para isolar as que falham.
+                db.rollback()
+                for p in novos:
+                    try:
+                        _inserir_pacientes(db, [p])
+                        db.commit()
+                        importados += 1
+                    except IntegrityError as e:
+                        db.rollback()
+                        falhas.append({"cpf": p.cpf, "erro": str(e.orig).splitlines()[0]})
+
+            ctx.progresso(inicio + len(lote), total, forcar=inicio + len(lote) >= total)
+    finally:
+        db.close()
+    return {"importados": importados, "ignorados": ignorados, "falhas": falhas}
+
+
+@tarefa("duplicidades", DuplicidadesParams)
+def relatorio_duplicidades(ctx: ContextoJob, params: DuplicidadesParams) -> dict:
+    # Cancelável entre blocos; o relatório anterior só é substituído no fim.
+    return detectar_duplicidades(ctx.engine, ctx.progresso)
@@ -1,14 +1,17 @@
 """Validações utilitárias do serviço de Pacientes.
 
-Inclui validação de CPF no formato XXX.XXX.XXX-XX.
+Inclui validação de CPF no formato XXX.XXX.XXX-XX e de data de nascimento.
 """
 
 from __future__ import annotations
 
 import re
+from datetime import date
+
 from fastapi import HTTPException
 
 CPF_REGEX = re.compile(r"^\d{3}\.\d{3}\.\d{3}-\d{2}$")
+NASCIMENTO_MIN = date(1900, 1, 1)
 
 
 def validar_cpf_formato(valor: str) -> str:
@@ -28,3 +31,14 @@ def assert_cpf_or_422(cpf: str) -> None:
     if not CPF_REGEX.fullmatch(cpf or ""):
         raise HTTPException(status_code=422, detail="CPF deve seguir o padrão XXX.XXX.XXX-XX")
 
+
+def validar_data_nascimento(valor: date) -> date:
+    """Valida a data de nascimento: nem futura, nem anterior a 1900.
+
+    Lança ValueError caso inválida.
+    """
+    if valor > date.today():
+        raise ValueError("Data de nascimento não pode estar no futuro")
+    if valor < NASCIMENTO_MIN:
+        raise ValueError(f"Data de nascimento anterior a {NASCIMENTO_MIN.isoformat()}")
+    return valor
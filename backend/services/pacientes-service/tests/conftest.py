@@ -0,0 +1,57 @@
+# Fixtures dos testes do serviço de Pacientes.
+#
+# Rode a partir da pasta do serviço:
+#   pip install -r requirements-dev.txt && python -m pytest -q
+#
+# Os testes usam um SQLite temporário (mesmo caminho do modo embarcado) ou,
+# com `TESTES_DATABASE_URL`, um banco Postgres vazio criado para a execução.
+# As variáveis de ambiente são definidas antes de importar `app`, que lê a
+# configuração no import. O executor de jobs e a gravação da auditoria ficam
+# parados: assim só os comandos do próprio request chegam ao banco.
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+_TMP = tempfile.mkdtemp(prefix="pacientes-testes-")
+os.environ["DATABASE_URL"] = os.getenv("TESTES_DATABASE_URL") or f"sqlite:///{os.path.join(_TMP, 'pacientes.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["CLINICAS"] = ""
+os.environ["JOBS_WORKERS"] = "0"
+os.environ["AUDITORIA_INTERVALO_S"] = "3600"
+os.environ["AUDITORIA_RESERVA"] = os.path.join(_TMP, "auditoria-pendente.jsonl")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def comandos():
+    """`with comandos() as sql:` → lista dos comandos SQL emitidos no bloco."""
+
+    @contextmanager
+    def contar():
+        sql: list[str] = []
+
+        def _registrar(conn, cursor, statement, parameters, context, executemany):
+            sql.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _registrar)
+        try:
+            yield sql
+        finally:
+            event.remove(engine, "before_cursor_execute", _registrar)
+
+    return contar
@@ -0,0 +1,40 @@
+# Controle de admissão (`app/admissao.py`). A classe `ClasseAdmissao` é a
+# mesma do serviço de Consultas, testada lá; aqui, o middleware deste serviço.
+
+import threading
+
+from app import admissao
+from app.admissao import ClasseAdmissao
+from app.db import SHARD_PRINCIPAL
+from app.routers import pacientes as rotas
+
+
+def test_503_com_retry_after_e_contadores(cliente, monkeypatch):
+    escrita = ClasseAdmissao("escrita", limite=1, fila_max=0, espera_max_s=0.05)
+    monkeypatch.setitem(admissao.CLASSES[SHARD_PRINCIPAL], "escrita", escrita)
+    entrou, liberar = threading.Event(), threading.Event()
+    inserir = rotas.inserir
+
+    def inserir_devagar(*args, **kwargs):
+        entrou.set()
+        liberar.wait(5)
+        return inserir(*args, **kwargs)
+
+    monkeypatch.setattr(rotas, "inserir", inserir_devagar)
+    payload = {"cpf": "900.300.001-00", "nome_completo": "Lara Mendes"}
+    primeira = threading.Thread(target=cliente.post, args=("/api/v1/pacientes",), kwargs={"json": payload})
+    primeira.start()
+    try:
+        assert entrou.wait(5)
+        r = cliente.post("/api/v1/pacientes", json={"cpf": "900.300.002-00", "nome_completo": "Lucas Mendes"})
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == str(admissao.RETRY_AFTER_S)
+        # Sondas e leituras não disputam a vaga da escrita.
+        assert cliente.get("/health").status_code == 200
+        assert cliente.get("/api/v1/pacientes/900.300.002-00").status_code == 404
+    finally:
+        liberar.set()
+        primeira.join(5)
+
+    m = cliente.get("/metrics/admissao").json()[SHARD_PRINCIPAL]["escrita"]
+    assert (m["admitidos"], m["rejeitados_fila_cheia"], m["em_execucao"]) == (1, 1, 0)
@@ -0,0 +1,53 @@
+# Conteúdo dos registros da trilha de auditoria (`app/auditoria.py`).
+#
+# A gravação fica parada nos testes (ver `conftest.py`): os registros
+# confirmados ficam no buffer do gravador, lidos aqui diretamente.
+
+import json
+
+import pytest
+
+from app.auditoria import gravador
+
+
+@pytest.fixture
+def auditoria():
+    """`auditoria()` → registros publicados desde o início do teste."""
+    buffer = gravador.da_clinica(None)._itens
+    inicio = len(buffer)
+    return lambda: list(buffer)[inicio:]
+
+
+def _json(valor):
+    return json.loads(valor) if valor is not None else None
+
+
+def test_update_registra_antes_e_depois_das_colunas_alteradas(cliente, auditoria):
+    cpf = "900.000.001-00"
+    assert cliente.post("/api/v1/pacientes", json={"cpf": cpf, "nome_completo": "Carla Dias"}).status_code == 201
+    alergia = cliente.post(f"/api/v1/pacientes/{cpf}/alergias", json={"agente": "Pólen"}).json()
+
+    r = cliente.patch(f"/api/v1/alergias/{alergia['id']}", json={"agente": "Pólen", "severidade": "leve"},
+                      headers={"X-Usuario": "ana"})
+    assert r.status_code == 200, r.text
+
+    [registro] = [r for r in auditoria() if r["operacao"] == "U"]
+    assert (registro["tabela"], registro["chave"], registro["autor"]) == ("alergias", str(alergia["id"]), "ana")
+    # Só o que mudou: `agente` foi reenviado igual.
+    assert _json(registro["antes"]) == {"severidade": None}
+    assert _json(registro["depois"]) == {"severidade": "leve"}
+
+
+def test_update_do_paciente_ignora_colunas_derivadas(cliente, auditoria):
+    cpf = "900.000.002-00"
+    assert cliente.post("/api/v1/pacientes", json={"cpf": cpf, "nome_completo": "Davi Rocha"}).status_code == 201
+    assert cliente.patch(f"/api/v1/pacientes/{cpf}", json={"nome_completo": "Davi Rocha Lima"}).status_code == 200
+
+    [registro] = [r for r in auditoria() if r["operacao"] == "U"]
+    assert _json(registro["antes"]) == {"nome_completo": "Davi Rocha"}
+    assert _json(registro["depois"]) == {"nome_completo": "Davi Rocha Lima"}
+
+
+def test_update_sem_linha_nao_registra(cliente, auditoria):
+    assert cliente.patch("/api/v1/alergias/999999", json={"agente": "x"}).status_code == 404
+    assert auditoria() == []
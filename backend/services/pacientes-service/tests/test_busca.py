@@ -0,0 +1,35 @@
+# Busca textual nos registros clínicos (`app/busca.py`). A busca é do
+# Postgres: no SQLite só a resposta 501 é verificada (rode com
+# `TESTES_DATABASE_URL` para o resto).
+
+import pytest
+
+from app.db import engine
+
+postgres = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="busca textual requer PostgreSQL")
+
+
+@pytest.mark.skipif(engine.dialect.name == "postgresql", reason="só fora do PostgreSQL")
+def test_sem_postgres_responde_501(cliente):
+    assert cliente.get("/api/v1/busca", params={"q": "dipirona"}).status_code == 501
+
+
+@postgres
+def test_busca_nas_tres_tabelas(cliente):
+    cpf = "900.700.011-00"
+    payload = {
+        "cpf": cpf,
+        "nome_completo": "Olívia Prates",
+        "cirurgia": [{"nome": "Artroscopia", "observacoes": "Reação à metamizol no pós-operatório"}],
+        "medicacao": [{"nome": "Metamizol sódico"}],
+        "alergia": [{"agente": "Metamizol"}, {"agente": "Látex"}],
+    }
+    assert cliente.post("/api/v1/pacientes", json=payload).status_code == 201
+
+    r = cliente.get("/api/v1/busca", params={"q": "metamizol"})
+    assert r.status_code == 200, r.text
+    achados = [(h["tipo"], h["paciente_cpf"]) for h in r.json() if h["paciente_cpf"] == cpf]
+    assert sorted(achados) == [("alergia", cpf), ("cirurgia", cpf), ("medicacao", cpf)]
+    # Na cirurgia o termo só aparece nas observações (peso B): vem por último.
+    assert [h["tipo"] for h in r.json() if h["paciente_cpf"] == cpf][-1] == "cirurgia"
+    assert all("<mark>" in h["trecho"] for h in r.json())
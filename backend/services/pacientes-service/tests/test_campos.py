@@ -0,0 +1,19 @@
+# `?fields=` na listagem de pacientes (`app/campos.py`).
+
+
+def test_fields_projeta_a_resposta_e_o_sql(cliente, comandos):
+    payload = {"cpf": "900.600.001-00", "nome_completo": "Norma Vieira", "data_nascimento": "1970-01-02"}
+    assert cliente.post("/api/v1/pacientes", json=payload).status_code == 201
+
+    with comandos() as sql:
+        r = cliente.get("/api/v1/pacientes", params={"q": "900.600.001", "fields": "cpf,data_nascimento"})
+    assert r.status_code == 200, r.text
+    assert r.json() == [{"cpf": "900.600.001-00", "data_nascimento": "1970-01-02"}]
+    [consulta] = sql
+    assert "nome_completo" not in consulta.split("WHERE")[0]
+
+
+def test_fields_invalidos(cliente):
+    r = cliente.get("/api/v1/pacientes", params={"fields": "cpf,telefone"})
+    assert r.status_code == 422
+    assert "telefone" in r.json()["detail"]
@@ -0,0 +1,76 @@
+# Multi-clínica (`app/db.py`): roteamento de cada request para o banco da
+# clínica.
+#
+# `CLINICAS` é lida no import de `app`, e a sessão de testes roda sem ela (ver
+# `conftest.py`); o cenário com clínicas roda num processo à parte. Duas
+# clínicas: `norte` no shard principal e `sul` num segundo shard. No
+# PostgreSQL o segundo shard é o mesmo banco (cada clínica no seu schema); no
+# SQLite, outro arquivo (sem schemas, uma clínica por shard).
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from app.db import engine
+
+_CENARIO = textwrap.dedent(
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    CPF = "529.982.247-25"
+    norte, sul = {"X-Clinica": "norte"}, {"X-Clinica": "sul"}
+
+    with TestClient(app) as c:
+        # O mesmo CPF nas duas clínicas: a unicidade vale por clínica.
+        r = c.post("/api/v1/pacientes", json={"cpf": CPF, "nome_completo": "Ana Norte"}, headers=norte)
+        assert r.status_code == 201, r.text
+        r = c.post("/api/v1/pacientes", json={"cpf": CPF, "nome_completo": "Ana Sul"}, headers=sul)
+        assert r.status_code == 201, r.text
+
+        assert c.get(f"/api/v1/pacientes/{CPF}", headers=sul).json()["nome_completo"] == "Ana Sul"
+        r = c.get(f"/api/v1/pacientes/{CPF}", params={"clinica": "norte"})
+        assert r.json()["nome_completo"] == "Ana Norte", r.text
+
+        assert c.get(f"/api/v1/pacientes/{CPF}").status_code == 400
+        assert c.get(f"/api/v1/pacientes/{CPF}", headers={"X-Clinica": "leste"}).status_code == 404
+
+        # A mesma Idempotency-Key em clínicas diferentes são chaves diferentes.
+        chave = {"Idempotency-Key": "mesma-chave"}
+        novo = {"cpf": "111.444.777-35", "nome_completo": "Bruno Lima"}
+        a = c.post("/api/v1/pacientes", json=novo, headers={**norte, **chave})
+        b = c.post("/api/v1/pacientes", json=novo, headers={**sul, **chave})
+        assert (a.status_code, b.status_code) == (201, 201), (a.text, b.text)
+        assert a.headers.get("Idempotent-Replayed") is None and b.headers.get("Idempotent-Replayed") is None
+    """
+)
+
+
+@pytest.fixture
+def segundo_shard(tmp_path):
+    if engine.dialect.name != "postgresql":
+        yield f"sqlite:///{tmp_path / 'sul.db'}"
+        return
+    yield engine.url.render_as_string(hide_password=False)
+    with engine.begin() as conn:
+        for esquema in ("clinica_norte", "clinica_sul"):
+            conn.exec_driver_sql(f'DROP SCHEMA IF EXISTS "{esquema}" CASCADE')
+
+
+def test_dados_de_cada_clinica_ficam_no_seu_banco(segundo_shard, tmp_path):
+    env = {
+        **os.environ,
+        "CLINICAS": "norte=principal,sul=outro",
+        "DATABASE_SHARDS": f"outro={segundo_shard}",
+    }
+    if engine.dialect.name != "postgresql":
+        env["DATABASE_URL"] = f"sqlite:///{tmp_path / 'norte.db'}"
+    servico = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    r = subprocess.run(
+        [sys.executable, "-c", _CENARIO], cwd=servico, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert r.returncode == 0, r.stderr
+
@@ -0,0 +1,95 @@
+# Quantos comandos SQL cada rota de escrita emite (ver `app/escrita.py`).
+#
+# Cada escrita é um único INSERT/UPDATE ... RETURNING, sem `refresh` depois do
+# commit. As leituras que sobram são conhecidas e estão listadas por teste:
+# - criar paciente: a busca de possíveis duplicatas (`app/duplicidade.py`);
+# - atualizar paciente: as três coleções de `PacienteOut`;
+# - atualizar, só no SQLite: a imagem "antes" da auditoria (`app/auditoria.py`),
+#   que no Postgres vem no RETURNING do próprio UPDATE.
+# Um comando a mais (ex.: um `refresh` ou um `selectin` reintroduzido) quebra
+# o teste.
+
+import itertools
+
+import pytest
+
+from app.db import engine
+
+ANTES = [] if engine.dialect.name == "postgresql" else ["SELECT"]
+
+_seq = itertools.count(1)
+
+
+def _cpf() -> str:
+    n = next(_seq)
+    return f"{n:03d}.{n:03d}.{n:03d}-00"
+
+
+def _verbos(sql: list[str]) -> list[str]:
+    return [s.lstrip().split(None, 1)[0].upper() for s in sql]
+
+
+@pytest.fixture
+def paciente(cliente) -> str:
+    cpf = _cpf()
+    r = cliente.post("/api/v1/pacientes", json={"cpf": cpf, "nome_completo": f"Paciente {cpf}"})
+    assert r.status_code == 201, r.text
+    return cpf
+
+
+def test_criar_paciente(cliente, comandos):
+    with comandos() as sql:
+        r = cliente.post("/api/v1/pacientes", json={"cpf": _cpf(), "nome_completo": "Ana Souza"})
+    assert r.status_code == 201, r.text
+    assert _verbos(sql) == ["SELECT", "INSERT"]
+
+
+def test_criar_paciente_com_colecoes(cliente, comandos):
+    payload = {
+        "cpf": _cpf(),
+        "nome_completo": "Bruno Lima",
+        "cirurgia": [{"nome": "Apendicectomia"}],
+        "medicacao": [{"nome": "Losartana"}, {"nome": "Metformina"}],
+        "alergia": [{"agente": "Dipirona"}],
+    }
+    with comandos() as sql:
+        r = cliente.post("/api/v1/pacientes", json=payload)
+    assert r.status_code == 201, r.text
+    assert len(r.json()["medicacoes"]) == 2
+    # Um INSERT em lote por coleção, qualquer que seja o tamanho dela.
+    assert _verbos(sql) == ["SELECT", "INSERT", "INSERT", "INSERT", "INSERT"]
+
+
+def test_atualizar_paciente(cliente, comandos, paciente):
+    with comandos() as sql:
+        r = cliente.patch(f"/api/v1/pacientes/{paciente}", json={"telefone": "11999990000"})
+    assert r.status_code == 200, r.text
+    assert _verbos(sql) == ANTES + ["UPDATE", "SELECT", "SELECT", "SELECT"]
+
+
+@pytest.mark.parametrize(
+    "rota, criacao, alteracao",
+    [
+        ("alergias", {"agente": "Penicilina"}, {"severidade": "alta"}),
+        ("medicacoes", {"nome": "Losartana"}, {"dosagem": "50mg"}),
+        ("cirurgias", {"nome": "Apendicectomia"}, {"data": "2020-05-01"}),
+    ],
+)
+def test_criar_e_atualizar_filho(cliente, comandos, paciente, rota, criacao, alteracao):
+    with comandos() as sql:
+        r = cliente.post(f"/api/v1/pacientes/{paciente}/{rota}", json=criacao)
+    assert r.status_code == 201, r.text
+    assert _verbos(sql) == ["INSERT"]
+
+    with comandos() as sql:
+        r = cliente.patch(f"/api/v1/{rota}/{r.json()['id']}", json=alteracao)
+    assert r.status_code == 200, r.text
+    assert _verbos(sql) == ANTES + ["UPDATE"]
+
+
+def test_criar_filho_de_paciente_inexistente(cliente, comandos):
+    # O 404 vem da FK, sem SELECT prévio do paciente.
+    with comandos() as sql:
+        r = cliente.post(f"/api/v1/pacientes/{_cpf()}/alergias", json={"agente": "Látex"})
+    assert r.status_code == 404
+    assert _verbos(sql) == ["INSERT"]
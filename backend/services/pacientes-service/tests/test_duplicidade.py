@@ -0,0 +1,127 @@
+# Detecção de pacientes duplicados (`app/duplicidade.py`).
+
+from datetime import date
+
+import pytest
+
+from app.db import engine
+from app.duplicidade import Candidato, candidatos, chaves_bloqueio, detectar_duplicidades, pontuar
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("Luiz Sousa", "Luís Souza"),
+        ("Thiago Guimarães", "Tiago Guimaraes"),
+        ("Rafael Kátia", "Raphael Cátia"),
+        ("Walter Felipe", "Valter Filipe"),
+        # Nome do meio e conectivos não entram nas chaves.
+        ("Maria Aparecida da Silva", "Maria Silva"),
+        # Sufixo de família sai do sobrenome.
+        ("José Carlos Filho", "José Carlos"),
+    ],
+)
+def test_chaves_iguais_para_grafias_equivalentes(a, b):
+    assert chaves_bloqueio(a) == chaves_bloqueio(b)
+
+
+@pytest.mark.parametrize("a, b", [("Paulo Lima", "Paula Lima"), ("Adriano Reis", "Adriana Reis")])
+def test_chaves_distinguem_genero(a, b):
+    assert chaves_bloqueio(a) != chaves_bloqueio(b)
+
+
+def test_chaves_de_nome_unico_ou_vazio():
+    assert chaves_bloqueio("Ana") == {"fonetica_nome": "ANA", "fonetica_sobrenome": ""}
+    assert chaves_bloqueio("  ") == {"fonetica_nome": "", "fonetica_sobrenome": ""}
+
+
+def _c(nome, nascimento=None, cpf="", responsavel=None):
+    return Candidato(cpf, nome, date.fromisoformat(nascimento) if nascimento else None, responsavel)
+
+
+def test_pontuar_mesmo_nome_e_nascimento():
+    assert pontuar(_c("Ana Lima", "1990-05-10"), _c("ANA LIMA", "1990-05-10")) == (
+        1.0, ["nome_identico", "mesmo_nascimento"],
+    )
+
+
+@pytest.mark.parametrize(
+    "b, motivo",
+    [
+        ("1990-05-11", "nascimento_semelhante"),  # um dígito
+        ("1990-10-05", "nascimento_semelhante"),  # dia e mês invertidos
+        ("1909-05-10", "nascimento_semelhante"),  # dígitos vizinhos trocados
+        ("1975-01-01", "nascimento_diferente"),
+        (None, "nascimento_ausente"),
+    ],
+)
+def test_pontuar_proximidade_das_datas(b, motivo):
+    pontuacao, motivos = pontuar(_c("Ana Lima", "1990-05-10"), _c("Ana Lima", b))
+    assert motivos == ["nome_identico", motivo]
+    # 0,7 · nomes (idênticos) + 0,3 · datas
+    datas = {"nascimento_semelhante": 0.5, "nascimento_diferente": 0.0, "nascimento_ausente": 0.6}[motivo]
+    assert pontuacao == round(0.7 + 0.3 * datas, 3)
+
+
+def test_pontuar_nomes():
+    grafia, _ = pontuar(_c("Luiz Sousa", "1980-01-01"), _c("Luís Souza", "1980-01-01"))
+    meio, _ = pontuar(_c("Maria Silva", "1980-01-01"), _c("Maria Aparecida Silva", "1980-01-01"))
+    filho, _ = pontuar(_c("José Carlos", "1980-01-01"), _c("José Carlos Filho", "1980-01-01"))
+    assert grafia >= 0.96 and meio >= 0.93
+    assert filho < meio
+
+
+def test_pontuar_com_minimo_descarta_sem_comparar_nomes():
+    assert pontuar(_c("Ana Lima", "1990-05-10"), _c("Ana Lima", "1975-01-01"), minimo=0.8) == (0.0, [])
+
+
+def test_pontuar_marca_dependente():
+    _, motivos = pontuar(_c("Ana Lima", "1990-05-10"), _c("Ana Lima", "1990-05-10", responsavel="1"))
+    assert "dependente" in motivos
+
+
+def _criar(cliente, cpf, nome, nascimento=None, responsavel=None):
+    payload = {"cpf": cpf, "nome_completo": nome, "data_nascimento": nascimento, "responsavel_cpf": responsavel}
+    r = cliente.post("/api/v1/pacientes", json={k: v for k, v in payload.items() if v is not None})
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_cadastro_avisa_possiveis_duplicatas(cliente):
+    _criar(cliente, "900.400.001-00", "Heitor Quaresma Bittencourt", "1971-03-09")
+    novo = _criar(cliente, "900.400.002-00", "Eitor Quaresma Bitencourt", "1971-03-09")
+    [suspeito] = novo["possiveis_duplicatas"]
+    assert suspeito["cpf"] == "900.400.001-00"
+    assert suspeito["pontuacao"] >= 0.8 and "mesmo_nascimento" in suspeito["motivos"]
+
+    # Sobrenome omitido: achado pelo bloco (nascimento, primeiro nome).
+    omitido = _criar(cliente, "900.400.003-00", "Heitor Quaresma", "1971-03-09")
+    assert "900.400.001-00" in {s["cpf"] for s in omitido["possiveis_duplicatas"]}
+
+
+def test_candidatos_ignoram_responsavel(cliente):
+    _criar(cliente, "900.400.011-00", "Otaviano Werneck Sampaio", "1960-02-02")
+    filho = _criar(
+        cliente, "900.400.012-00", "Otaviano Werneck Sampaio", "1960-02-02", responsavel="900.400.011-00"
+    )
+    assert filho["possiveis_duplicatas"] == []
+
+
+def test_candidatos_usam_as_chaves_gravadas(cliente):
+    from app.db import SessionLocal
+
+    _criar(cliente, "900.400.021-00", "Quitéria Bragança Pimentel", "1955-12-24")
+    with SessionLocal() as db:
+        achados = candidatos(db, "Kiteria Braganca Pimentel", date(1955, 12, 24))
+    assert [c.cpf for c, _, _ in achados] == ["900.400.021-00"]
+
+
+def test_relatorio_em_lote(cliente):
+    _criar(cliente, "900.400.031-00", "Genoveva Albuquerque Tavares", "1948-07-30")
+    _criar(cliente, "900.400.032-00", "Jenoveva Albuquerque Tavares", "1948-07-30")
+    resumo = detectar_duplicidades(engine)
+    assert resumo["duplicidades"] >= 1
+
+    pares = cliente.get("/api/v1/pacientes/duplicidades", params={"limit": 1000}).json()
+    par = next(p for p in pares if p["cpf_a"] == "900.400.031-00")
+    assert par["cpf_b"] == "900.400.032-00" and par["pontuacao"] >= 0.8
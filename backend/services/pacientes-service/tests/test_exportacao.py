@@ -0,0 +1,28 @@
+# Exportação incremental para Parquet (`app/exportacao.py`).
+
+import pyarrow.parquet as pq
+
+from app.exportacao import exportar
+
+
+def _cpfs(destino) -> set[str]:
+    return set(pq.read_table(destino / "pacientes", columns=["cpf"]).column("cpf").to_pylist())
+
+
+def test_exportacao_incremental_pela_hora_do_banco(cliente, tmp_path):
+    cliente.post("/api/v1/pacientes", json={"cpf": "900.100.001-00", "nome_completo": "Elisa Prado"})
+    exportar(str(tmp_path), atraso_s=0)
+    assert "900.100.001-00" in _cpfs(tmp_path)
+
+    cliente.post("/api/v1/pacientes", json={"cpf": "900.100.002-00", "nome_completo": "Fábio Prado"})
+    cliente.post("/api/v1/pacientes/900.100.002-00/alergias", json={"agente": "Iodo"})
+    novas = exportar(str(tmp_path), atraso_s=0)
+    assert novas["pacientes"] == 1 and novas["alergias"] == 1
+    assert exportar(str(tmp_path), atraso_s=0) == {"pacientes": 0, "cirurgias": 0, "medicacoes": 0, "alergias": 0}
+
+
+def test_atraso_adia_linhas_recentes(cliente, tmp_path):
+    exportar(str(tmp_path), atraso_s=0)
+    cliente.post("/api/v1/pacientes", json={"cpf": "900.100.003-00", "nome_completo": "Gil Prado"})
+    assert exportar(str(tmp_path), atraso_s=3600)["pacientes"] == 0
+    assert exportar(str(tmp_path), atraso_s=0)["pacientes"] == 1
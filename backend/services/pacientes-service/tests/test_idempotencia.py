@@ -0,0 +1,75 @@
+# `Idempotency-Key` nos POSTs (`app/idempotencia.py`).
+
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.routers import pacientes as rotas
+
+
+@pytest.fixture
+def chave():
+    return str(uuid.uuid4())
+
+
+def test_repeticao_devolve_o_201_original_e_nao_o_409_do_cpf(cliente, chave):
+    payload = {"cpf": "900.200.001-00", "nome_completo": "Helena Castro"}
+    primeira = cliente.post("/api/v1/pacientes", json=payload, headers={"Idempotency-Key": chave})
+    segunda = cliente.post("/api/v1/pacientes", json=payload, headers={"Idempotency-Key": chave})
+
+    assert primeira.status_code == segunda.status_code == 201
+    assert segunda.json() == primeira.json()
+    assert segunda.headers["idempotent-replayed"] == "true"
+    # Sem a chave, a mesma requisição executa de novo e esbarra na PK.
+    assert cliente.post("/api/v1/pacientes", json=payload).status_code == 409
+
+
+def test_mesma_chave_com_outra_requisicao(cliente, chave):
+    payload = {"cpf": "900.200.002-00", "nome_completo": "Igor Castro"}
+    assert cliente.post("/api/v1/pacientes", json=payload, headers={"Idempotency-Key": chave}).status_code == 201
+
+    outro = {"cpf": "900.200.003-00", "nome_completo": "Igor Castro"}
+    r = cliente.post("/api/v1/pacientes", json=outro, headers={"Idempotency-Key": chave})
+    assert r.status_code == 422
+    assert cliente.get("/api/v1/pacientes/900.200.003-00").status_code == 404
+
+
+def test_chave_invalida(cliente):
+    r = cliente.post("/api/v1/pacientes", json={}, headers={"Idempotency-Key": "x" * 256})
+    assert r.status_code == 400
+
+
+def test_duplicatas_concorrentes_executam_uma_vez(cliente, chave, monkeypatch):
+    entrou, liberar = threading.Event(), threading.Event()
+    chamadas = []
+    inserir = rotas.inserir
+
+    def inserir_devagar(*args, **kwargs):
+        chamadas.append(1)
+        entrou.set()
+        liberar.wait(5)
+        return inserir(*args, **kwargs)
+
+    monkeypatch.setattr(rotas, "inserir", inserir_devagar)
+    payload = {"cpf": "900.200.004-00", "nome_completo": "Joana Castro"}
+    respostas = {}
+
+    def enviar(nome):
+        respostas[nome] = cliente.post("/api/v1/pacientes", json=payload, headers={"Idempotency-Key": chave})
+
+    original = threading.Thread(target=enviar, args=("original",))
+    original.start()
+    assert entrou.wait(5)
+    duplicata = threading.Thread(target=enviar, args=("duplicata",))
+    duplicata.start()
+    time.sleep(0.2)  # a duplicata chega com a original ainda em andamento
+    liberar.set()
+    original.join(5)
+    duplicata.join(5)
+
+    assert len(chamadas) == 1
+    assert respostas["original"].status_code == respostas["duplicata"].status_code == 201
+    assert respostas["duplicata"].json() == respostas["original"].json()
+    assert respostas["duplicata"].headers["idempotent-replayed"] == "true"
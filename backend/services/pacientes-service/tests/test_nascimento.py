@@ -0,0 +1,95 @@
+# Data de nascimento tipada e filtros demográficos (`app/nascimento.py`).
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.nascimento import limites_idade
+
+
+@pytest.mark.parametrize(
+    "idade_min, idade_max, esperado",
+    [
+        # 18 a 30 anos completos: fez 18 até hoje, ainda não fez 31.
+        (18, 30, (date(1995, 10, 19), date(2008, 10, 19))),
+        (0, 0, (date(2025, 10, 19), date(2026, 10, 19))),
+        (65, None, (None, date(1961, 10, 19))),
+        (None, 12, (date(2013, 10, 19), None)),
+        (None, None, (None, None)),
+    ],
+)
+def test_limites_idade(idade_min, idade_max, esperado):
+    assert limites_idade(idade_min, idade_max, hoje=date(2026, 10, 19)) == esperado
+
+
+def test_limites_idade_em_29_de_fevereiro():
+    # Em ano não bissexto, "há N anos" de 29/02 é 28/02.
+    assert limites_idade(1, 1, hoje=date(2028, 2, 29)) == (date(2026, 2, 28), date(2027, 2, 28))
+    assert limites_idade(4, None, hoje=date(2028, 2, 29)) == (None, date(2024, 2, 29))
+
+
+def _anos_antes(d: date, anos: int) -> date:
+    try:
+        return d.replace(year=d.year - anos)
+    except ValueError:
+        return d.replace(year=d.year - anos, day=28)
+
+
+def _criar(cliente, cpf, nascimento):
+    payload = {"cpf": cpf, "nome_completo": f"Paciente {cpf}", "data_nascimento": nascimento}
+    return cliente.post("/api/v1/pacientes", json=payload)
+
+
+@pytest.mark.parametrize(
+    "valor",
+    ["2999-01-01", "1899-12-31", "1990-02-30", "31/12/1990", "1990-1-5", "ontem"],
+)
+def test_data_invalida_recusada(cliente, valor):
+    assert _criar(cliente, "900.500.001-00", valor).status_code == 422
+
+
+def test_data_invalida_recusada_no_patch(cliente):
+    assert _criar(cliente, "900.500.002-00", "1990-05-10").status_code == 201
+    r = cliente.patch("/api/v1/pacientes/900.500.002-00", json={"data_nascimento": "2999-01-01"})
+    assert r.status_code == 422
+    assert cliente.get("/api/v1/pacientes/900.500.002-00").json()["data_nascimento"] == "1990-05-10"
+
+
+def test_limites_da_validacao_aceitos(cliente):
+    assert _criar(cliente, "900.500.003-00", "1900-01-01").status_code == 201
+    assert _criar(cliente, "900.500.004-00", date.today().isoformat()).status_code == 201
+
+
+def test_filtro_por_faixa_de_idade(cliente):
+    hoje = date.today()
+    nascimentos = {
+        "900.500.011-00": _anos_antes(hoje, 40),  # fez 40 hoje
+        "900.500.012-00": _anos_antes(hoje, 40) + timedelta(days=1),  # 39 até amanhã
+        "900.500.013-00": _anos_antes(hoje, 41) + timedelta(days=1),  # 40, faz 41 amanhã
+        "900.500.014-00": _anos_antes(hoje, 41),  # fez 41 hoje
+        "900.500.015-00": None,
+    }
+    for cpf, nascimento in nascimentos.items():
+        assert _criar(cliente, cpf, nascimento and nascimento.isoformat()).status_code == 201
+
+    def cpfs(**params):
+        pacientes = cliente.get("/api/v1/pacientes", params={"q": "900.500.01", **params}).json()
+        return {p["cpf"] for p in pacientes}
+
+    assert cpfs(idade_min=40, idade_max=40) == {"900.500.011-00", "900.500.013-00"}
+    assert cpfs(idade_min=41) == {"900.500.014-00"}
+    assert cpfs(idade_max=39) == {"900.500.012-00"}
+    assert cliente.get("/api/v1/pacientes", params={"idade_min": 50, "idade_max": 40}).status_code == 422
+
+
+def test_aniversariantes_do_mes_em_ordem_de_dia(cliente):
+    nascimentos = [
+        ("900.500.021-00", "1980-11-30"),
+        ("900.500.022-00", "2001-11-02"),
+        ("900.500.023-00", "1995-11-15"),
+        ("900.500.024-00", "1995-12-15"),
+    ]
+    for cpf, nascimento in nascimentos:
+        assert _criar(cliente, cpf, nascimento).status_code == 201
+    pacientes = cliente.get("/api/v1/pacientes", params={"q": "900.500.02", "aniversario_mes": 11}).json()
+    assert [p["cpf"] for p in pacientes] == ["900.500.022-00", "900.500.023-00", "900.500.021-00"]
@@ -0,0 +1,33 @@
+# Parâmetros da exportação em segundo plano (`app/tarefas.py`).
+
+import os
+
+import pytest
+
+from app import tarefas
+
+
+@pytest.mark.parametrize("destino", [".", "..", ".oculto", "../outra", "a/b", ""])
+def test_destino_invalido_recusado_na_submissao(cliente, destino):
+    r = cliente.post("/api/v1/jobs", json={"tipo": "exportacao", "parametros": {"destino": destino}})
+    assert r.status_code == 422
+
+
+@pytest.mark.parametrize("destino", ["analitico", "bi-2030.01", "a..b"])
+def test_destino_simples_aceito(destino):
+    assert tarefas.ExportacaoParams(destino=destino).destino == destino
+
+
+def test_destino_fica_no_diretorio_da_clinica(tmp_path, monkeypatch):
+    monkeypatch.setattr(tarefas, "EXPORTACAO_DIR", str(tmp_path))
+    assert tarefas._diretorio_exportacao("norte", "bi") == str(tmp_path / "norte" / "bi")
+    assert tarefas._diretorio_exportacao(None, "bi") == str(tmp_path / "bi")
+
+
+def test_destino_por_link_para_fora_recusado(tmp_path, monkeypatch):
+    monkeypatch.setattr(tarefas, "EXPORTACAO_DIR", str(tmp_path))
+    (tmp_path / "norte").mkdir()
+    (tmp_path / "sul").mkdir()
+    os.symlink(tmp_path / "sul", tmp_path / "norte" / "bi")
+    with pytest.raises(ValueError):
+        tarefas._diretorio_exportacao("norte", "bi")
@@ -1,9 +1,20 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import { formatApiError } from '../../utils/formatError';
+import { postIdempotente } from '../../utils/idempotencia';
 
 // Base do serviço de Consultas (porta 8002 exposta no docker-compose)
 const API_BASE = (process.env.REACT_APP_CONSULTAS_URL || 'http://localhost:8002/api/v1');
 
+// Ocorrências de séries ainda não editadas vêm sem `id`: a chave é série + dia
+const chaveConsulta = (c) => (c.id ?? `serie-${c.serieId}-${c.dia}`);
+
+const ordenarPorHora = (state, dia) => {
+  state.byDay[dia].sort((a, b) => (state.byId[a].hora || '').localeCompare(state.byId[b].hora || ''));
+};
+
+// Stream SSE com as alterações da agenda de um dia (ver `Agenda.jsx`)
+export const urlEventos = (dia) => `${API_BASE}/consultas/eventos?dia=${encodeURIComponent(dia)}`;
+
 export const fetchConsultasPorDia = createAsyncThunk(
   'consultas/fetchPorDia',
   async (dia, { rejectWithValue }) => {
@@ -27,11 +38,7 @@ export const criarConsulta = createAsyncThunk(
     const url = `${API_BASE}/pacientes/${cpf}/consultas`;
     const payload = { cpfPaciente: cpf, dia, hora, descricao, estado, observacoes };
     try {
-      const res = await fetch(url, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload),
-      });
+      const res = await postIdempotente(url, payload);
       if (!res.ok) {
         const err = await res.json().catch(() => ({}));
         return rejectWithValue(err.detail || `Erro ${res.status}`);
@@ -72,6 +79,20 @@ const consultasSlice = createSlice({
   reducers: {
     setCurrentDay(state, action) {
       state.currentDay = action.payload;
+    },
+    // Eventos do stream: consulta criada/alterada (por esta ou outra recepção)
+    consultaRecebida(state, action) {
+      const c = action.payload;
+      const dia = c.dia;
+      if (!state.byDay[dia]) return; // dia ainda não carregado: virá no fetch
+      state.byId[c.id] = c;
+      if (!state.byDay[dia].includes(c.id)) state.byDay[dia].push(c.id);
+      ordenarPorHora(state, dia);
+    },
+    consultaRemovida(state, action) {
+      const { id, dia } = action.payload;
+      state.byDay[dia] = (state.byDay[dia] || []).filter((x) => x !== id);
+      if (state.byId[id]?.dia === dia) delete state.byId[id];
     }
   },
   extraReducers: (builder) => {
@@ -86,8 +107,9 @@ const consultasSlice = createSlice({
         const arr = action.payload || [];
         const ids = [];
         for (const c of arr) {
-          state.byId[c.id] = c;
-          ids.push(c.id);
+          const chave = chaveConsulta(c);
+          state.byId[chave] = c;
+          ids.push(chave);
         }
         // Ordena por hora ascendente (string HH:MM funciona lexicograficamente)
         ids.sort((a, b) => (state.byId[a].hora || '').localeCompare(state.byId[b].hora || ''));
@@ -108,7 +130,7 @@ const consultasSlice = createSlice({
         const dia = c.dia;
         if (!state.byDay[dia]) state.byDay[dia] = [];
         if (!state.byDay[dia].includes(c.id)) state.byDay[dia].push(c.id);
-        state.byDay[dia].sort((a, b) => (state.byId[a].hora || '').localeCompare(state.byId[b].hora || ''));
+        ordenarPorHora(state, dia);
       })
       .addCase(criarConsulta.rejected, (state, action) => {
         state.status = 'failed';
@@ -126,5 +148,5 @@ const consultasSlice = createSlice({
   }
 });
 
-export const { setCurrentDay } = consultasSlice.actions;
+export const { setCurrentDay, consultaRecebida, consultaRemovida } = consultasSlice.actions;
 export default consultasSlice.reducer;
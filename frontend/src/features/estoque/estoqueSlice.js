@@ -0,0 +1,98 @@
+import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
+import { formatApiError } from '../../utils/formatError';
+
+// Base do serviço de Estoque (porta 8003 exposta no docker-compose)
+const API_BASE = (process.env.REACT_APP_ESTOQUE_URL || 'http://localhost:8003/api/v1');
+
+const requestJson = async (url, options, rejectWithValue) => {
+  try {
+    const res = await fetch(url, options);
+    if (!res.ok) {
+      const err = await res.json().catch(() => ({}));
+      return rejectWithValue(err.detail || `Erro ${res.status}`);
+    }
+    return await res.json();
+  } catch (e) {
+    return rejectWithValue(e.message);
+  }
+};
+
+export const fetchItens = createAsyncThunk(
+  'estoque/fetchItens',
+  async (_, { rejectWithValue }) => requestJson(`${API_BASE}/itens`, undefined, rejectWithValue)
+);
+
+export const criarItem = createAsyncThunk(
+  'estoque/criarItem',
+  async ({ nome, unidade, estoque_minimo }, { rejectWithValue }) => requestJson(
+    `${API_BASE}/itens`,
+    {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ nome, unidade, estoque_minimo }),
+    },
+    rejectWithValue,
+  )
+);
+
+// Registra entrada/uso/ajuste e recarrega o item para refletir o novo saldo
+export const registrarMovimento = createAsyncThunk(
+  'estoque/registrarMovimento',
+  async ({ itemId, tipo, quantidade, consulta_id, observacao }, { dispatch, rejectWithValue }) => {
+    const mov = await requestJson(
+      `${API_BASE}/itens/${itemId}/movimentos`,
+      {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ tipo, quantidade, consulta_id, observacao }),
+      },
+      rejectWithValue,
+    );
+    dispatch(fetchItem(itemId));
+    return mov;
+  }
+);
+
+export const fetchItem = createAsyncThunk(
+  'estoque/fetchItem',
+  async (id, { rejectWithValue }) => requestJson(`${API_BASE}/itens/${id}`, undefined, rejectWithValue)
+);
+
+const estoqueSlice = createSlice({
+  name: 'estoque',
+  initialState: {
+    byId: {},   // { [id]: item com saldo }
+    ids: [],    // ordem da listagem (por nome)
+    status: 'idle',
+    error: null,
+  },
+  reducers: {},
+  extraReducers: (builder) => {
+    builder
+      .addCase(fetchItens.pending, (state) => {
+        state.status = 'loading';
+        state.error = null;
+      })
+      .addCase(fetchItens.fulfilled, (state, action) => {
+        state.status = 'succeeded';
+        const arr = action.payload || [];
+        state.ids = arr.map((i) => i.id);
+        for (const i of arr) state.byId[i.id] = i;
+      })
+      .addCase(fetchItens.rejected, (state, action) => {
+        state.status = 'failed';
+        state.error = formatApiError(action.payload || action.error.message);
+      })
+      .addCase(criarItem.fulfilled, (state, action) => {
+        const i = action.payload;
+        state.byId[i.id] = i;
+        if (!state.ids.includes(i.id)) state.ids.push(i.id);
+      })
+      .addCase(fetchItem.fulfilled, (state, action) => {
+        const i = action.payload;
+        state.byId[i.id] = i;
+      });
+  }
+});
+
+export default estoqueSlice.reducer;
@@ -1,4 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
+import { postIdempotente } from '../../utils/idempotencia';
 
 // Base path proxied pelo CRA para o serviço de pacientes (definido em package.json)
 const base = '/api/v1/pacientes';
@@ -39,11 +40,7 @@ export const createPatient = createAsyncThunk(
   'patients/create',
   async (payload, { rejectWithValue }) => {
     try {
-      const res = await fetch(base, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload),
-      });
+      const res = await postIdempotente(base, payload);
       if (!res.ok) {
         const err = await res.json().catch(() => ({}));
         return rejectWithValue(err.detail || `Erro ${res.status}`);
@@ -80,11 +77,7 @@ export const createCirurgia = createAsyncThunk(
   'patients/createCirurgia',
   async ({ cpf, data }, { rejectWithValue }) => {
     try {
-      const res = await fetch(`/api/v1/pacientes/${cpf}/cirurgias`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(data),
-      });
+      const res = await postIdempotente(`/api/v1/pacientes/${cpf}/cirurgias`, data);
       if (!res.ok) {
         const err = await res.json().catch(() => ({}));
         return rejectWithValue(err.detail || `Erro ${res.status}`);
@@ -137,11 +130,7 @@ export const createMedicacao = createAsyncThunk(
   'patients/createMedicacao',
   async ({ cpf, data }, { rejectWithValue }) => {
     try {
-      const res = await fetch(`/api/v1/pacientes/${cpf}/medicacoes`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(data),
-      });
+      const res = await postIdempotente(`/api/v1/pacientes/${cpf}/medicacoes`, data);
       if (!res.ok) {
         const err = await res.json().catch(() => ({}));
         return rejectWithValue(err.detail || `Erro ${res.status}`);
@@ -194,11 +183,7 @@ export const createAlergia = createAsyncThunk(
   'patients/createAlergia',
   async ({ cpf, data }, { rejectWithValue }) => {
     try {
-      const res = await fetch(`/api/v1/pacientes/${cpf}/alergias`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(data),
-      });
+      const res = await postIdempotente(`/api/v1/pacientes/${cpf}/alergias`, data);
       if (!res.ok) {
         const err = await res.json().catch(() => ({}));
         return rejectWithValue(err.detail || `Erro ${res.status}`);
@@ -262,6 +247,27 @@ export const deletePatient = createAsyncThunk(
   }
 );
 
+// Resolve vários CPFs em uma chamada (ex.: nomes dos pacientes da agenda do dia)
+export const fetchPatientsByCpfs = createAsyncThunk(
+  'patients/fetchByCpfs',
+  async (cpfs, { rejectWithValue }) => {
+    try {
+      const res = await fetch(`${base}:batchGet`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ cpfs }),
+      });
+      if (!res.ok) {
+        const err = await res.json().catch(() => ({}));
+        return rejectWithValue(err.detail || `Erro ${res.status}`);
+      }
+      return await res.json();
+    } catch (e) {
+      return rejectWithValue(e.message);
+    }
+  }
+);
+
 export const fetchPatients = createAsyncThunk(
   'patients/fetchList',
   async (q = '', { rejectWithValue }) => {
@@ -336,6 +342,13 @@ const patientsSlice = createSlice({
         state.status = 'failed';
         state.error = action.payload || action.error.message;
       })
+      .addCase(fetchPatientsByCpfs.fulfilled, (state, action) => {
+        const { encontrados = {} } = action.payload || {};
+        for (const p of Object.values(encontrados)) {
+          // mescla dados leves sem alterar `status` (carga auxiliar)
+          state.byCpf[p.cpf] = { ...(state.byCpf[p.cpf] || {}), ...p };
+        }
+      })
       .addCase(createPatient.fulfilled, (state, action) => {
         const p = action.payload;
         state.byCpf[p.cpf] = p;
@@ -1,7 +1,8 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import styles from './Agenda.module.scss';
 import { useDispatch, useSelector } from 'react-redux';
-import { fetchConsultasPorDia } from '../features/consultas/consultasSlice';
+import { consultaRecebida, consultaRemovida, fetchConsultasPorDia, urlEventos } from '../features/consultas/consultasSlice';
+import { fetchPatientsByCpfs } from '../features/patients/patientsSlice';
 import NewConsultaModal from '../components/NewConsultaModal';
 import ConsultaDetailsModal from '../components/ConsultaDetailsModal';
 
@@ -24,6 +25,7 @@ const fmtTitle = (iso) => {
 export default function AgendaPage() {
   const dispatch = useDispatch();
   const { byDay, byId } = useSelector((s) => s.consultas);
+  const pacientes = useSelector((s) => s.patients.byCpf);
   const [dia, setDia] = useState(() => new Date().toISOString().slice(0,10));
   const [createOpen, setCreateOpen] = useState(false);
   const [createHora, setCreateHora] = useState('');
@@ -31,6 +33,23 @@ export default function AgendaPage() {
 
   useEffect(() => { dispatch(fetchConsultasPorDia(dia)); }, [dia, dispatch]);
 
+  // Alterações feitas por outras recepções chegam pelo stream do dia, sem polling.
+  // Reconexões (queda de rede, fim do stream) recarregam o dia: eventos do
+  // intervalo podem ter se perdido.
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return undefined;
+    const es = new EventSource(urlEventos(dia));
+    let conectado = false;
+    es.addEventListener('pronto', () => {
+      if (conectado) dispatch(fetchConsultasPorDia(dia));
+      conectado = true;
+    });
+    es.addEventListener('consulta', (e) => dispatch(consultaRecebida(JSON.parse(e.data))));
+    es.addEventListener('removida', (e) => dispatch(consultaRemovida(JSON.parse(e.data))));
+    es.addEventListener('recarregar', () => dispatch(fetchConsultasPorDia(dia)));
+    return () => es.close();
+  }, [dia, dispatch]);
+
   const slots = useMemo(() => slotsBetween('07:00', '19:00', 30), []);
   const ids = byDay[dia] || [];
   const porHora = useMemo(() => {
@@ -45,6 +64,22 @@ export default function AgendaPage() {
     return map;
   }, [ids, byId]);
 
+  // Nomes dos pacientes do dia: uma única chamada em lote para os CPFs ainda não conhecidos
+  const cpfsDoDia = useMemo(() => {
+    const set = new Set();
+    for (const id of ids) {
+      const cpf = byId[id]?.cpfPaciente || byId[id]?.cpf_paciente;
+      if (cpf) set.add(cpf);
+    }
+    return [...set];
+  }, [ids, byId]);
+
+  useEffect(() => {
+    const faltando = cpfsDoDia.filter((cpf) => !pacientes[cpf]);
+    if (faltando.length) dispatch(fetchPatientsByCpfs(faltando));
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [cpfsDoDia, dispatch]);
+
   const go = (days) => {
     const d = new Date(dia+'T00:00:00');
     d.setDate(d.getDate()+days);
@@ -101,9 +136,9 @@ export default function AgendaPage() {
               <div className={styles.slot} onClick={()=>{ setCreateHora(h); setCreateOpen(true); }}>
                 <div className={styles.events}>
                   {(porHora[h] || []).map((c) => (
-                    <div key={c.id} className={styles.event} onClick={(e)=>{ e.stopPropagation(); setDetailsId(c.id); }}>
+                    <div key={c.id ?? `serie-${c.serieId}`} className={styles.event} onClick={(e)=>{ e.stopPropagation(); if (c.id != null) setDetailsId(c.id); }}>
                       <div className={styles.eventTitle}>{c.descricao}</div>
-                      <div className={styles.eventMeta}>{h} · CPF {c.cpfPaciente || c.cpf_paciente}</div>
+                      <div className={styles.eventMeta}>{h} · {pacientes[c.cpfPaciente || c.cpf_paciente]?.nome_completo || `CPF ${c.cpfPaciente || c.cpf_paciente}`}</div>
                     </div>
                   ))}
                 </div>
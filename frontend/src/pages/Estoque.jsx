@@ -1,3 +1,88 @@
+// Página de Estoque: itens com saldo atual, cadastro e movimentações
+import { useEffect, useState } from 'react';
+import { useDispatch, useSelector } from 'react-redux';
+import { criarItem, fetchItens, registrarMovimento } from '../features/estoque/estoqueSlice';
+import { formatApiError } from '../utils/formatError';
+
+const MovimentoForm = ({ item }) => {
+  const dispatch = useDispatch();
+  const [tipo, setTipo] = useState('uso');
+  const [quantidade, setQuantidade] = useState('');
+  const [erro, setErro] = useState('');
+
+  const onSubmit = async (e) => {
+    e.preventDefault();
+    setErro('');
+    const action = await dispatch(registrarMovimento({ itemId: item.id, tipo, quantidade }));
+    if (registrarMovimento.fulfilled.match(action)) setQuantidade('');
+    else setErro(formatApiError(action.payload) || 'Erro ao registrar movimento');
+  };
+
+  return (
+    <form className="d-flex gap-2 align-items-center" onSubmit={onSubmit}>
+      <select className="form-select form-select-sm" style={{ width: 'auto' }} value={tipo} onChange={(e)=>setTipo(e.target.value)}>
+        <option value="entrada">Entrada</option>
+        <option value="uso">Uso</option>
+        <option value="ajuste">Ajuste</option>
+      </select>
+      <input className="form-control form-control-sm" style={{ width: '7rem' }} type="number" step="0.001" value={quantidade} onChange={(e)=>setQuantidade(e.target.value)} placeholder="Qtd." />
+      <button type="submit" className="btn btn-sm btn-outline-primary" disabled={!quantidade}>Lançar</button>
+      {erro && <span className="text-danger small">{erro}</span>}
+    </form>
+  );
+};
+
 export default function EstoquePage(){
-  return <h1>Estoque</h1>;
+  const dispatch = useDispatch();
+  const { byId, ids, status, error } = useSelector((s) => s.estoque);
+  const [nome, setNome] = useState('');
+  const [unidade, setUnidade] = useState('un');
+  const [minimo, setMinimo] = useState('0');
+
+  useEffect(() => { dispatch(fetchItens()); }, [dispatch]);
+
+  const onCreate = async (e) => {
+    e.preventDefault();
+    const action = await dispatch(criarItem({ nome, unidade, estoque_minimo: minimo || '0' }));
+    if (criarItem.fulfilled.match(action)) { setNome(''); setMinimo('0'); }
+  };
+
+  return (
+    <div className="container-fluid">
+      <header className="row align-items-center g-2 mb-3">
+        <div className="col">
+          <h1 className="m-0" style={{fontSize:'clamp(2rem,4.5vw,3.5rem)',fontWeight:800}}>Estoque</h1>
+        </div>
+      </header>
+
+      <form className="row g-2 mb-3" onSubmit={onCreate}>
+        <div className="col-12 col-md-5"><input className="form-control" value={nome} onChange={(e)=>setNome(e.target.value)} placeholder="Novo item (ex.: Luva de procedimento)" /></div>
+        <div className="col-6 col-md-2"><input className="form-control" value={unidade} onChange={(e)=>setUnidade(e.target.value)} placeholder="Unidade" /></div>
+        <div className="col-6 col-md-2"><input className="form-control" type="number" step="0.001" value={minimo} onChange={(e)=>setMinimo(e.target.value)} placeholder="Mínimo" /></div>
+        <div className="col-12 col-md-3"><button type="submit" className="btn btn-primary w-100" disabled={!nome.trim()}>+ Adicionar Item</button></div>
+      </form>
+
+      {status==='loading' && <div>Carregando…</div>}
+      {error && <div className="alert alert-danger">Erro: {formatApiError(error)}</div>}
+
+      <table className="table align-middle">
+        <thead>
+          <tr><th>Item</th><th>Saldo</th><th>Mínimo</th><th>Movimentar</th></tr>
+        </thead>
+        <tbody>
+          {ids.map((id) => {
+            const item = byId[id];
+            return (
+              <tr key={id} className={item.abaixo_minimo ? 'table-warning' : undefined}>
+                <td>{item.nome}</td>
+                <td>{Number(item.saldo)} {item.unidade}</td>
+                <td>{Number(item.estoque_minimo)} {item.unidade}</td>
+                <td><MovimentoForm item={item} /></td>
+              </tr>
+            );
+          })}
+        </tbody>
+      </table>
+    </div>
+  );
 }
@@ -1,10 +1,12 @@
 import { configureStore } from '@reduxjs/toolkit';
 import patientsReducer from '../features/patients/patientsSlice';
 import consultasReducer from '../features/consultas/consultasSlice';
+import estoqueReducer from '../features/estoque/estoqueSlice';
 
 export const store = configureStore({
   reducer: {
     patients: patientsReducer,
     consultas: consultasReducer,
+    estoque: estoqueReducer,
   },
 });
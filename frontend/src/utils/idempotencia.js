@@ -0,0 +1,35 @@
+// POST com `Idempotency-Key`: a mesma chave vale para todas as tentativas,
+// então uma repetição após falha de rede (Wi-Fi instável) recebe do backend
+// a resposta original em vez de criar o registro de novo.
+
+const novaChave = () => (
+  (typeof crypto !== 'undefined' && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+);
+
+const esperar = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export async function postIdempotente(url, payload, { tentativas = 3 } = {}) {
+  const chave = novaChave();
+  let ultimoErro;
+  for (let i = 0; i < tentativas; i += 1) {
+    try {
+      const res = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': chave },
+        body: JSON.stringify(payload),
+      });
+      // 409 + Retry-After: a tentativa anterior ainda está em execução
+      if (res.status === 409 && res.headers.get('Retry-After') && i < tentativas - 1) {
+        await esperar(1000);
+        continue;
+      }
+      return res;
+    } catch (e) {
+      ultimoErro = e; // falha de rede: tenta de novo com a mesma chave
+      if (i < tentativas - 1) await esperar(300 * 2 ** i);
+    }
+  }
+  throw ultimoErro;
+}